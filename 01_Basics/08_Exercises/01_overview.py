@@ -20,7 +20,7 @@ TOPICS: list[tuple[str, str]] = [
     ("05_Input/01_overview.py", "05 输入练习索引（每题一个文件）"),
     ("06_Variables/01_overview.py", "06 变量（入门）练习索引（每题一个文件）"),
     ("07_Data_Types/01_overview.py", "07 数据类型练习索引（每题一个文件）"),
-    ("08_mini_project_expense_report.py", "小项目：解析“记账 CSV”，分组统计并输出对齐报表/JSON"),
+    ("08_mini_project_expense_report.py", "小项目：解析“记账 CSV”，分组统计并输出对齐报表/JSON（流式/多进程并行汇总，金额精确合并）"),
 ]
 
 
@@ -15,8 +15,13 @@ Author: Lambert
    - 对齐的纯文本报表（列：category/amount）
    - 一行 JSON 汇总（`sort_keys=True`，便于 diff）
 5) 支持两种输入来源：
-   - stdin 管道输入
+   - stdin 管道输入 / 文件路径参数
    - 交互终端下用内置 sample 数据演示
+6) 进阶：大账本
+   - 流式模式：逐行解析、边读边累加，不把输入读进列表，内存与输入大小无关
+   - 并行模式：按字节切分文件（切点对齐到行首），多进程各自汇总，再精确合并
+   - 精确合并：金额按“整数 + 小数位数”累加（Python int 无精度上限），
+     不经过 float，也不受 Decimal 上下文 28 位精度的舍入影响
 
 参考答案：
 - 本文件即为参考实现；直接运行会打印报表与 JSON。
@@ -26,15 +31,29 @@ Author: Lambert
 
 也支持从 stdin 读取（例如）：
     cat expenses.csv | python3 01_Basics/08_Exercises/08_mini_project_expense_report.py
+
+大文件（先生成 100 万行样例，再用 4 个进程并行汇总）：
+    python3 01_Basics/08_Exercises/08_mini_project_expense_report.py --generate 1000000 /tmp/ledger.csv
+    python3 01_Basics/08_Exercises/08_mini_project_expense_report.py /tmp/ledger.csv --workers 4
+
+注意：并行模式按“行”切分，要求每条记录独占一行（字段里不能有换行）。
 """
 
 from __future__ import annotations
 
+import argparse
 import csv
 import json
+import random
 import sys
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
 from decimal import Decimal, InvalidOperation
+from pathlib import Path
+from typing import Iterable, Iterator
+
+# category -> (units, scale)：金额 = units / 10**scale，例如 12.50 -> (1250, 2)
+Totals = dict[str, tuple[int, int]]
 
 
 @dataclass(frozen=True)
@@ -52,32 +71,143 @@ def parse_decimal(text: str) -> Decimal:
         raise ValueError(f"invalid amount: {text!r}") from e
 
 
-def parse_expenses(lines: list[str]) -> list[Expense]:
-    cleaned: list[str] = []
-    for line in lines:
-        if not line.strip():
-            continue
-        if line.lstrip().startswith("#"):
-            continue
-        cleaned.append(line)
+def parse_units(text: str) -> tuple[int, int]:
+    """把金额解析成 (units, scale)；常见的 "12.50" 走 int() 快路径，其余交给 Decimal。"""
+    whole, _, frac = text.strip().partition(".")
+    if frac.isdigit() or not frac:
+        try:
+            return int(whole + frac), len(frac)
+        except ValueError:
+            pass
+    amount = parse_decimal(text)
+    if not amount.is_finite():
+        raise ValueError(f"invalid amount: {text!r}")
+    exponent = amount.as_tuple().exponent
+    if exponent >= 0:
+        return int(amount), 0
+    return int(amount.scaleb(-exponent)), -exponent
+
+
+def units_to_decimal(units: int, scale: int) -> Decimal:
+    # 用字符串构造 Decimal 是精确的，不受上下文精度影响
+    return Decimal(f"{units}E-{scale}")
+
+
+def add_units(totals: Totals, category: str, units: int, scale: int) -> None:
+    """把一笔金额精确加到 totals[category]，小数位数不同时先对齐到较大的 scale。"""
+    current = totals.get(category)
+    if current is None:
+        totals[category] = (units, scale)
+        return
+    total, total_scale = current
+    if scale > total_scale:
+        total *= 10 ** (scale - total_scale)
+        total_scale = scale
+    elif scale < total_scale:
+        units *= 10 ** (total_scale - scale)
+    totals[category] = (total + units, total_scale)
+
+
+def merge_totals(into: Totals, other: Totals) -> Totals:
+    for category, (units, scale) in other.items():
+        add_units(into, category, units, scale)
+    return into
 
-    reader = csv.reader(cleaned)
-    out: list[Expense] = []
-    for row in reader:
+
+def totals_to_decimal(totals: Totals) -> dict[str, Decimal]:
+    return {category: units_to_decimal(units, scale) for category, (units, scale) in totals.items()}
+
+
+def grand_total(totals: Totals) -> Decimal:
+    merged: Totals = {}
+    for units, scale in totals.values():
+        add_units(merged, "", units, scale)
+    return units_to_decimal(*merged.get("", (0, 0)))
+
+
+def iter_rows(lines: Iterable[str]) -> Iterator[list[str]]:
+    """惰性过滤空行/注释行后交给 csv.reader，逐行产出已校验列数的记录。"""
+    meaningful = (line for line in lines if line.strip() and not line.lstrip().startswith("#"))
+    for row in csv.reader(meaningful):
         if len(row) != 4:
             raise ValueError(f"bad row (need 4 columns): {row!r}")
-        date, category, amount, note = row
-        out.append(Expense(date=date.strip(), category=category.strip(), amount=parse_decimal(amount), note=note.strip()))
-    return out
+        yield row
+
+
+def iter_expenses(lines: Iterable[str]) -> Iterator[Expense]:
+    for date, category, amount, note in iter_rows(lines):
+        yield Expense(date=date.strip(), category=category.strip(), amount=parse_decimal(amount), note=note.strip())
+
 
+def parse_expenses(lines: Iterable[str]) -> list[Expense]:
+    return list(iter_expenses(lines))
 
-def summarize_by_category(items: list[Expense]) -> dict[str, Decimal]:
+
+def summarize_by_category(items: Iterable[Expense]) -> dict[str, Decimal]:
     totals: dict[str, Decimal] = {}
     for it in items:
         totals[it.category] = totals.get(it.category, Decimal("0")) + it.amount
     return totals
 
 
+def stream_totals(lines: Iterable[str]) -> tuple[Totals, int]:
+    """流式汇总：不构造 Expense，也不保留任何行，返回 (totals, 记录数)。"""
+    # 热循环里按 (category, scale) 直接做整数加法，小数位对齐留到最后只做一次
+    sums: dict[tuple[str, int], int] = {}
+    count = 0
+    for _, category, amount, _ in iter_rows(lines):
+        units, scale = parse_units(amount)
+        key = (category.strip(), scale)
+        sums[key] = sums.get(key, 0) + units
+        count += 1
+    totals: Totals = {}
+    for (category, scale), units in sums.items():
+        add_units(totals, category, units, scale)
+    return totals, count
+
+
+def split_on_lines(path: Path, parts: int) -> list[tuple[int, int]]:
+    """按字节数把文件均分成 parts 段，每个切点向后挪到下一行行首。"""
+    size = path.stat().st_size
+    offsets = [0]
+    with path.open("rb") as f:
+        for i in range(1, parts):
+            f.seek(size * i // parts)
+            f.readline()
+            offsets.append(max(f.tell(), offsets[-1]))
+    offsets.append(size)
+    return [(start, end) for start, end in zip(offsets, offsets[1:]) if end > start]
+
+
+def _iter_range_lines(path: Path, start: int, end: int) -> Iterator[str]:
+    with path.open("rb") as f:
+        f.seek(start)
+        position = start
+        for raw in f:
+            if position >= end:
+                break
+            position += len(raw)
+            yield raw.decode("utf-8")
+
+
+def _totals_for_range(path: Path, start: int, end: int) -> tuple[Totals, int]:
+    return stream_totals(_iter_range_lines(path, start, end))
+
+
+def parallel_totals(path: Path, workers: int) -> tuple[Totals, int]:
+    """并行汇总：每个进程处理一段文件，部分结果按 (units, scale) 精确合并。"""
+    ranges = split_on_lines(path, workers)
+    totals: Totals = {}
+    count = 0
+    with ProcessPoolExecutor(max_workers=len(ranges) or 1) as pool:
+        futures = [pool.submit(_totals_for_range, path, start, end) for start, end in ranges]
+        for future in futures:
+            part, part_count = future.result()
+            merge_totals(totals, part)
+            count += part_count
+    return totals, count
+
+
 def render_report(totals: dict[str, Decimal]) -> str:
     rows = sorted(totals.items(), key=lambda kv: (-kv[1], kv[0]))
     header_cat = "category"
@@ -91,35 +221,70 @@ def render_report(totals: dict[str, Decimal]) -> str:
     return "\n".join(lines)
 
 
-def load_input_lines() -> list[str]:
+SAMPLE_LINES = [
+    "# sample data (you can pipe your own file via stdin)\n",
+    '2025-12-15,food,12.50,"lunch"\n',
+    '2025-12-15,transport,3.20,"bus"\n',
+    '2025-12-16,food,7.80,"coffee"\n',
+    " \n",
+    "# end\n",
+]
+
+
+def load_input_lines() -> Iterable[str]:
+    """stdin 有管道输入时直接返回 sys.stdin（逐行迭代，不一次性读入）。"""
     if not sys.stdin.isatty():
-        return sys.stdin.read().splitlines()
+        return sys.stdin
+    return SAMPLE_LINES
+
+
+def generate_ledger(path: Path, rows: int, seed: int = 0) -> None:
+    """生成一个大账本样例，便于体验流式/并行模式。"""
+    rng = random.Random(seed)
+    categories = ["food", "transport", "rent", "books", "travel", "health", "gifts", "utilities"]
+    with path.open("w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        for i in range(rows):
+            cents = rng.randrange(1, 500_000)
+            writer.writerow([f"2025-{i % 12 + 1:02d}-{i % 28 + 1:02d}", rng.choice(categories), f"{cents // 100}.{cents % 100:02d}", f"item {i}"])
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="记账 CSV 分类汇总")
+    parser.add_argument("path", nargs="?", type=Path, help="账本文件；不传则读 stdin（终端下用内置样例）")
+    parser.add_argument("--workers", type=int, default=1, help="并行进程数（需要文件路径，>1 时启用并行模式）")
+    parser.add_argument("--generate", type=int, metavar="ROWS", help="生成 ROWS 行样例账本写入 path 后退出")
+    return parser.parse_args(argv)
 
-    return [
-        "# sample data (you can pipe your own file via stdin)\n",
-        '2025-12-15,food,12.50,"lunch"\n',
-        '2025-12-15,transport,3.20,"bus"\n',
-        '2025-12-16,food,7.80,"coffee"\n',
-        " \n",
-        "# end\n",
-    ]
 
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    if args.generate is not None:
+        if args.path is None:
+            raise SystemExit("--generate 需要指定输出文件 path")
+        generate_ledger(args.path, args.generate)
+        print(f"已生成 {args.generate} 行: {args.path}")
+        return
 
-def main() -> None:
-    lines = load_input_lines()
-    expenses = parse_expenses(lines)
-    totals = summarize_by_category(expenses)
+    if args.path is not None and args.workers > 1:
+        totals, _ = parallel_totals(args.path, args.workers)
+    elif args.path is not None:
+        with args.path.open(encoding="utf-8", newline="") as f:
+            totals, _ = stream_totals(f)
+    else:
+        totals, _ = stream_totals(load_input_lines())
+    by_category = totals_to_decimal(totals)
 
     print("=== Expense Report ===")
-    print(render_report(totals))
+    print(render_report(by_category))
     print()
 
     summary = {
-        "total": f"{sum(totals.values(), Decimal('0')):.2f}",
-        "by_category": {k: f"{v:.2f}" for k, v in sorted(totals.items())},
+        "total": f"{grand_total(totals):.2f}",
+        "by_category": {k: f"{v:.2f}" for k, v in sorted(by_category.items())},
     }
     print(json.dumps(summary, ensure_ascii=False, sort_keys=True, separators=(",", ":")))
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -23,7 +23,7 @@ TOPICS: list[tuple[str, str]] = [
     ("13_builtin_functions_reference.py", "内置函数全覆盖：完整清单 + 关键用法示例"),
     ("10_recursive_functions.py", "递归：基线与收敛、调用栈限制、阶乘/斐波那契/树深度"),
     ("11_chapter_summary.py", "本章总结：规则清单与常见误区"),
-    ("12_card_management_system.py", "综合示例：函数化的名片管理（增删改查、格式化输出）"),
+    ("12_card_management_system.py", "综合示例：函数化的名片管理（增删改查、格式化输出；姓名/标签/n-gram 索引、CSV 批量导入）"),
     ("Exercises/01_overview.py", "练习题索引（每题一个文件）"),
 ]
 
@@ -4,77 +4,281 @@
 示例 12：函数化的名片管理系统（简化版）。
 Author: Lambert
 
-- 数据存储：内存 list[dict]，字段包含 name/phone/email/tags
-- 功能：新增、查询（精确/模糊）、更新、删除、格式化打印
-- 重点展示“用函数拆分职责与复用”，而不是交互细节
+- 数据存储：CardBook 引擎，名片记录使用 __slots__，并维护三种索引
+  - 姓名哈希索引：精确查找 / 重名检查 / 删除都是 O(1)
+  - 标签倒排索引：tag -> 名片 id 集合
+  - n-gram（三元组）索引：关键字模糊搜索只检查候选名片，而不是扫描全部
+- 功能：新增、查询（精确/模糊/按标签）、更新、删除、CSV 批量导入、格式化打印
+- 重点展示“用函数拆分职责与复用”：对外仍是一组函数，索引细节封装在 CardBook 里
+
+运行方式：
+    python3 01_Basics/14_Functions/12_card_management_system.py
 """
 
 from __future__ import annotations
 
-from typing import Any, Iterable, Optional
+import csv
+import io
+import random
+import string
+import time
+from array import array
+from collections import defaultdict
+from functools import partial
+from itertools import islice
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional, TextIO
+
+NGRAM = 3  # 三元组：关键字长度 >= 3 时走索引，更短的关键字退化为扫描预先小写好的搜索键
+COMPACT_MIN_DEAD = 4096  # 失效倒排项少于这个数时不重建，避免小库频繁整理
+
+
+class Card:
+    """一张名片；__slots__ 去掉每条记录的 __dict__，百万条记录时省下大量内存。"""
+
+    __slots__ = ("name", "phone", "email", "tags", "card_id", "search_key", "book")
+
+    def __init__(self, name: str, phone: str, email: str, tags: Optional[list[str]] = None) -> None:
+        self.name = name
+        self.phone = phone
+        self.email = email
+        self.tags = tags or []
+        self.card_id = -1  # 加入 CardBook 时分配
+        self.search_key = ""  # 小写的 "name\x00email"，查询时不再重复 lower()
+        self.book: Optional[CardBook] = None  # 所属 CardBook；update_card(card, ...) 经由它同步索引
+
+    def __repr__(self) -> str:
+        return f"Card(name={self.name!r}, phone={self.phone!r}, email={self.email!r}, tags={self.tags!r})"
+
+
+def ngrams(text: str, n: int = NGRAM) -> set[str]:
+    """文本的全部 n 元子串（去重）。"""
+    return {text[i : i + n] for i in range(len(text) - n + 1)}
+
+
+class CardBook:
+    """带索引的内存名片库。
+
+    n-gram 倒排表用 array('I') 只追加不删除：删除/更新后残留的旧 id 会在
+    “候选校验”这一步被过滤掉（名片已不存在或搜索键不再包含关键字），
+    省去维护集合的内存与删除成本。失效项单独计数，超过倒排项总数一半
+    （且不少于 COMPACT_MIN_DEAD）时整体重建，增删频繁的长期运行也不会无限增长。
+    """
+
+    def __init__(self) -> None:
+        self._cards: dict[int, Card] = {}
+        self._by_name: dict[str, int] = {}
+        self._by_tag: dict[str, set[int]] = {}
+        self._grams: defaultdict[str, array] = defaultdict(partial(array, "I"))
+        self._next_id = 0
+        self._postings = 0  # 倒排项总数（含失效项）
+        self._dead_postings = 0  # 已失效的倒排项数
+
+    def __len__(self) -> int:
+        return len(self._cards)
+
+    def __iter__(self) -> Iterator[Card]:
+        return iter(self._cards.values())
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._by_name
+
+    # 写入
+    def add(self, card: Card) -> None:
+        if card.name in self._by_name:
+            raise ValueError(f"name '{card.name}' already exists")
+        card.card_id = self._next_id
+        self._next_id += 1
+        self._cards[card.card_id] = card
+        self._by_name[card.name] = card.card_id
+        card.book = self
+        self._index_tags(card)
+        self._index_text(card)
+
+    def remove(self, name: str) -> bool:
+        card_id = self._by_name.pop(name, None)
+        if card_id is None:
+            return False
+        card = self._cards.pop(card_id)
+        card.book = None
+        self._unindex_tags(card)
+        self._dead_postings += len(ngrams(card.search_key))
+        self._maybe_compact()
+        return True
+
+    def update(
+        self,
+        card: Card,
+        *,
+        phone: Optional[str] = None,
+        email: Optional[str] = None,
+        tags: Optional[Iterable[str]] = None,
+    ) -> None:
+        if self._cards.get(card.card_id) is not card:
+            raise KeyError(f"card '{card.name}' is not in this book")
+        if phone is not None:
+            card.phone = phone
+        if email is not None:
+            card.email = email
+            self._dead_postings += len(ngrams(card.search_key))
+            self._index_text(card)
+            self._maybe_compact()
+        if tags is not None:
+            self._unindex_tags(card)
+            card.tags = list(tags)
+            self._index_tags(card)
+
+    # 查询
+    def get(self, name: str) -> Optional[Card]:
+        card_id = self._by_name.get(name)
+        return None if card_id is None else self._cards[card_id]
+
+    def by_tag(self, tag: str, limit: Optional[int] = None) -> list[Card]:
+        cards = self._cards
+        return [cards[card_id] for card_id in islice(self._by_tag.get(tag, ()), limit)]
+
+    def search(self, keyword: str, limit: Optional[int] = None) -> list[Card]:
+        """姓名或邮箱包含 keyword（不区分大小写）的名片。"""
+        keyword_lower = keyword.lower()
+        if len(keyword_lower) < NGRAM:
+            candidates: Iterable[Card] = self._cards.values()
+        else:
+            postings = []
+            for gram in ngrams(keyword_lower):
+                posting = self._grams.get(gram)
+                if posting is None:
+                    return []
+                postings.append(posting)
+            # 只遍历最短的倒排表，其余条件交给下面的子串校验
+            cards = self._cards
+            candidates = (cards[i] for i in min(postings, key=len) if i in cards)
+
+        matches: list[Card] = []
+        seen: set[int] = set()
+        for card in candidates:
+            if keyword_lower in card.search_key and card.card_id not in seen:
+                seen.add(card.card_id)
+                matches.append(card)
+                if limit is not None and len(matches) >= limit:
+                    break
+        return matches
+
+    # 索引维护
+    def _index_tags(self, card: Card) -> None:
+        for tag in card.tags:
+            self._by_tag.setdefault(tag, set()).add(card.card_id)
 
-Card = dict[str, Any]
-CardBook = list[Card]
+    def _unindex_tags(self, card: Card) -> None:
+        for tag in card.tags:
+            ids = self._by_tag.get(tag)
+            if ids is not None:
+                ids.discard(card.card_id)
+                if not ids:
+                    del self._by_tag[tag]
+
+    def _index_text(self, card: Card) -> None:
+        card.search_key = f"{card.name}\x00{card.email}".lower()
+        grams, card_id = self._grams, card.card_id
+        card_grams = ngrams(card.search_key)
+        for gram in card_grams:
+            grams[gram].append(card_id)
+        self._postings += len(card_grams)
+
+    def _maybe_compact(self) -> None:
+        """失效项过半时按现存名片重建 n-gram 倒排表（摊还到每次删除/更新是 O(1)）。"""
+        if self._dead_postings < COMPACT_MIN_DEAD or self._dead_postings * 2 < self._postings:
+            return
+        self._grams = defaultdict(partial(array, "I"))
+        self._postings = self._dead_postings = 0
+        for card in self._cards.values():
+            self._index_text(card)
+
+    @property
+    def posting_stats(self) -> tuple[int, int]:
+        """(倒排项总数, 其中失效项数)"""
+        return self._postings, self._dead_postings
 
 
 def create_card(name: str, phone: str, email: str, *, tags: Optional[list[str]] = None) -> Card:
     """构造一张名片（不会写入 book）。"""
-    return {"name": name, "phone": phone, "email": email, "tags": tags or []}
+    return Card(name, phone, email, tags)
 
 
 def add_card(book: CardBook, card: Card) -> None:
-    """添加名片，避免重复姓名。"""
-    if any(existing["name"] == card["name"] for existing in book):
-        raise ValueError(f"name '{card['name']}' already exists")
-    book.append(card)
+    """添加名片，避免重复姓名（哈希索引，O(1)）。"""
+    book.add(card)
+
+
+def import_csv(book: CardBook, source: Path | TextIO, *, skip_duplicates: bool = True) -> int:
+    """从 CSV 批量导入（表头 name,phone,email,tags；多个标签用 ; 分隔），返回导入条数。
+
+    逐行读取、逐条建索引，不会把整个文件读进内存；重名行默认跳过。
+    """
+    if isinstance(source, Path):
+        with source.open(newline="", encoding="utf-8") as f:
+            return import_csv(book, f, skip_duplicates=skip_duplicates)
 
+    imported = 0
+    for row in csv.DictReader(source):
+        name = row["name"]
+        if name in book:
+            if skip_duplicates:
+                continue
+            raise ValueError(f"name '{name}' already exists")
+        tags = [tag for tag in (row.get("tags") or "").split(";") if tag]
+        book.add(Card(name, row.get("phone", ""), row.get("email", ""), tags))
+        imported += 1
+    return imported
 
-def list_cards(book: CardBook) -> None:
+
+def list_cards(cards: Iterable[Card]) -> None:
     """打印表格视图。"""
-    if not book:
+    rows = [(card.name, card.phone, card.email, ", ".join(card.tags)) for card in cards]
+    if not rows:
         print("[EMPTY] card book is empty.")
         return
 
     headers = ("Name", "Phone", "Email", "Tags")
-    rows = [
-        (
-            card["name"],
-            card["phone"],
-            card["email"],
-            ", ".join(card.get("tags", [])),
-        )
-        for card in book
-    ]
     print_table(headers, rows)
 
 
+def get_card(book: CardBook, name: str) -> Optional[Card]:
+    """按姓名精确查找。"""
+    return book.get(name)
+
+
 def find_cards(book: CardBook, keyword: str) -> list[Card]:
     """模糊查找（姓名或邮箱包含 keyword）。"""
-    keyword_lower = keyword.lower()
-    return [
-        card
-        for card in book
-        if keyword_lower in card["name"].lower() or keyword_lower in card["email"].lower()
-    ]
+    return book.search(keyword)
 
 
-def update_card(card: Card, *, phone: Optional[str] = None, email: Optional[str] = None, tags: Optional[Iterable[str]] = None) -> None:
-    """原地更新字段；None 表示保持不变。"""
+def find_by_tag(book: CardBook, tag: str, limit: Optional[int] = None) -> list[Card]:
+    """按标签查找（倒排索引）；热门标签命中很多时用 limit 只取前几张。"""
+    return book.by_tag(tag, limit)
+
+
+def update_card(
+    card: Card,
+    *,
+    phone: Optional[str] = None,
+    email: Optional[str] = None,
+    tags: Optional[Iterable[str]] = None,
+) -> None:
+    """原地更新字段；None 表示保持不变（已加入 book 的名片经由 book 更新，索引才能同步）。"""
+    if card.book is not None:
+        card.book.update(card, phone=phone, email=email, tags=tags)
+        return
     if phone is not None:
-        card["phone"] = phone
+        card.phone = phone
     if email is not None:
-        card["email"] = email
+        card.email = email
     if tags is not None:
-        card["tags"] = list(tags)
+        card.tags = list(tags)
 
 
 def remove_card(book: CardBook, name: str) -> bool:
     """按姓名删除，返回是否删除成功。"""
-    for idx, card in enumerate(book):
-        if card["name"] == name:
-            del book[idx]
-            return True
-    return False
+    return book.remove(name)
 
 
 def print_table(headers: tuple[str, ...], rows: list[tuple[str, ...]]) -> None:
@@ -96,10 +300,9 @@ def print_table(headers: tuple[str, ...], rows: list[tuple[str, ...]]) -> None:
 
 def demo_flow() -> None:
     """演示一次完整增删改查流程（非交互）。"""
-    book: CardBook = [
-        create_card("Alice", "123-456", "alice@example.com", tags=["friend"]),
-        create_card("Bob", "555-000", "bob@example.com", tags=["work"]),
-    ]
+    book = CardBook()
+    add_card(book, create_card("Alice", "123-456", "alice@example.com", tags=["friend"]))
+    add_card(book, create_card("Bob", "555-000", "bob@example.com", tags=["work"]))
     print("初始数据：")
     list_cards(book)
 
@@ -111,8 +314,11 @@ def demo_flow() -> None:
     matches = find_cards(book, "ali")
     list_cards(matches)
 
+    print("\n按标签 'friend' 查找：")
+    list_cards(find_by_tag(book, "friend"))
+
     print("\n更新 Bob 电话与标签：")
-    bob = find_cards(book, "bob")[0]
+    bob = get_card(book, "Bob")
     update_card(bob, phone="010-0000", tags=["work", "team"])
     list_cards(book)
 
@@ -121,10 +327,73 @@ def demo_flow() -> None:
     print("删除成功?", removed)
     list_cards(book)
 
+    print("\n从 CSV 批量导入（重名的 Bob 被跳过）：")
+    csv_text = "name,phone,email,tags\nDiana,321-000,diana@example.com,vip;work\nBob,000,bob2@example.com,\n"
+    print("导入条数:", import_csv(book, io.StringIO(csv_text)))
+    list_cards(book)
+
+
+def demo_scale(count: int = 200_000) -> None:
+    """批量构造大名片库，对比索引查询与线性扫描的耗时。"""
+    rng = random.Random(0)
+    tags = ["friend", "work", "vip", "family", "team", "client"]
+
+    def random_name(idx: int) -> str:
+        return "".join(rng.choices(string.ascii_lowercase, k=6)).capitalize() + str(idx)
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["name", "phone", "email", "tags"])
+    for idx in range(count):
+        name = random_name(idx)
+        writer.writerow([name, f"{idx:010d}", f"{name.lower()}@example.com", ";".join(rng.sample(tags, 2))])
+    buffer.seek(0)
+
+    book = CardBook()
+    started = time.perf_counter()
+    imported = import_csv(book, buffer)
+    print(f"导入 {imported} 张名片（含建索引）耗时 {time.perf_counter() - started:.2f}s")
+
+    probe = random_name(count // 2)  # 不存在的姓名，只为取一个随机关键字
+    target = list(book)[count // 2]
+    keyword = target.name[1:5].lower()
+    plain = [(card.name, card.email) for card in book]
+
+    def timed(label: str, func: Callable[[], object], repeat: int = 100) -> None:
+        begin = time.perf_counter()
+        for _ in range(repeat):
+            result = func()
+        per_call = (time.perf_counter() - begin) / repeat
+        size = len(result) if isinstance(result, list) else int(result is not None)
+        print(f"  {label:<28} {per_call * 1e6:>10.1f} µs  命中 {size}")
+
+    print(f"查询（关键字 {keyword!r}）：")
+    timed("精确查找（哈希索引）", lambda: get_card(book, target.name))
+    timed("精确查找未命中", lambda: get_card(book, probe))
+    timed("模糊搜索（n-gram 索引）", lambda: find_cards(book, keyword))
+    timed("按标签取前 10 张", lambda: find_by_tag(book, "vip", limit=10))
+    timed(
+        "模糊搜索（逐条 lower 扫描）",
+        lambda: [n for n, e in plain if keyword in n.lower() or keyword in e.lower()],
+        repeat=3,
+    )
+
+    # 增删频繁：删掉一半再改一批邮箱，失效倒排项被定期整理，不会无限累积
+    for card in list(book)[: count // 2]:
+        remove_card(book, card.name)
+    for card in islice(book, count // 10):
+        update_card(card, email=f"{card.name.lower()}@corp.example.com")
+    postings, dead = book.posting_stats
+    assert dead * 2 < postings or dead < COMPACT_MIN_DEAD
+    assert {c.name for c in find_cards(book, keyword)} == {c.name for c in book if keyword in c.search_key}
+    print(f"删除 {count // 2} 张、改邮箱 {count // 10} 张后：倒排项 {postings}，其中失效 {dead}")
+
 
 def main() -> None:
     demo_flow()
+    print("\n" + "=" * 60)
+    demo_scale()
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
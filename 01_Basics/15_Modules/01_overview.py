@@ -32,7 +32,7 @@ TOPICS: list[tuple[str, str]] = [
     ("19_socket_nonblocking.py", "非阻塞 Socket 与 select I/O 多路复用基础"),
     ("20_socket_shutdown.py", "Socket 优雅关闭：shutdown() 三种模式与半关闭"),
     ("21_tcp_connection_states.py", "TCP 连接状态：三次握手、四次挥手详解"),
-    ("22_socket_advanced_io.py", "Socket 高级 I/O：getpeername/makefile/recv_into/sendfile"),
+    ("22_socket_advanced_io.py", "Socket 高级 I/O：recv_into/sendfile + 静态文件服务器（Range/fd 缓存/TLS 回退）"),
     ("Exercises/01_overview.py", "练习题索引（每题一个文件）"),
 ]
 
@@ -16,7 +16,7 @@ TOPICS: list[tuple[str, str]] = [
     ("03_tasks_create_and_gather.py", "create_task、gather、as_completed，返回值与异常"),
     ("04_taskgroup_structured_concurrency.py", "TaskGroup（3.11+）结构化并发与异常传播"),
     ("05_timeout_and_cancel.py", "wait_for/asyncio.timeout、task.cancel、CancelledError"),
-    ("06_asyncio_queue_and_sync_primitives.py", "asyncio.Queue 生产消费；Lock/Event/Semaphore 对比"),
+    ("06_asyncio_queue_and_sync_primitives.py", "asyncio.Queue 生产消费；Lock/Event/Semaphore 对比；PriorityQueue"),
     ("07_to_thread_and_blocking_calls.py", "asyncio.to_thread 包装阻塞函数，避免卡住事件循环"),
     ("08_tcp_echo_server_client.py", "本地 TCP echo server/client（不访问外网）"),
     ("09_async_context_and_iter.py", "async with 与 async for 示例"),
@@ -25,10 +25,10 @@ TOPICS: list[tuple[str, str]] = [
     ("12_asyncio_vs_threads_brief.py", "协程 vs 线程选择指南"),
     ("13_chapter_summary.py", "本章总结：规则清单与常见坑"),
     ("14_asyncio_event_and_condition.py", "Event 和 Condition：同步原语与等待/通知模式"),
-    ("15_task_status_management.py", "Task 状态管理：done()/cancelled()/result()/exception()"),
-    ("16_queue_sync_patterns.py", "Queue 同步模式：task_done()/join() 与生产者-消费者"),
+    ("15_task_status_management.py", "Task 状态管理：done()/cancelled()/result()/exception()；优先级+截止时间调度器"),
+    ("16_queue_sync_patterns.py", "Queue 同步模式：task_done()/join()；MonitoredQueue 延迟直方图；AdaptiveBatcher 批处理"),
     ("17_asyncio_subprocess.py", "asyncio.subprocess：子进程管理与交互"),
-    ("18_asyncio_streams_advanced.py", "asyncio Streams 高级API：StreamReader/Writer详解"),
+    ("18_asyncio_streams_advanced.py", "asyncio Streams 高级API：StreamReader/Writer；BufferedProtocol 高吞吐帧协议"),
     ("Exercises/01_overview.py", "练习题索引（每题一个文件）"),
 ]
 
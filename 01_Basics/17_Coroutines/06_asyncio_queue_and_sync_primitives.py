@@ -58,6 +58,18 @@ async def demo_semaphore() -> None:
     await asyncio.gather(*(task(i) for i in range(5)))
 
 
+async def demo_priority_queue() -> None:
+    # (优先级, 序号, 任务)：数字越小越先出队；序号保证同优先级 FIFO，且避免比较任务本身
+    q: asyncio.PriorityQueue[tuple[int, int, str]] = asyncio.PriorityQueue()
+    for seq, (prio, name) in enumerate([(2, "batch-1"), (0, "login"), (2, "batch-2"), (1, "search")]):
+        q.put_nowait((prio, seq, name))
+    while not q.empty():
+        prio, _, name = await q.get()
+        print(f"[priority] {prio} {name}")
+    # 带截止时间、并发分类限流、租户公平与过载丢弃的完整版本：
+    # 15_task_status_management.py 的 DeadlineScheduler
+
+
 async def main_async() -> None:
     print("== asyncio.Queue ==")
     q: asyncio.Queue[object] = asyncio.Queue()
@@ -69,6 +81,9 @@ async def main_async() -> None:
     print("\n== Semaphore ==")
     await demo_semaphore()
 
+    print("\n== PriorityQueue ==")
+    await demo_priority_queue()
+
 
 def main() -> None:
     asyncio.run(main_async())
@@ -17,12 +17,20 @@ Author: Lambert
 - 处理任务取消
 - 获取任务结果或异常
 - 实现超时和重试逻辑
+
+示例 13 的 DeadlineScheduler 把这些手工 cancel/超时集中起来：按优先级 + 截止时间
+派发协程，按工作类别限流，租户间加权轮转，并提前丢弃注定赶不上截止时间的任务。
 """
 
 from __future__ import annotations
 
 import asyncio
-from typing import Any
+import heapq
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, TypeVar
+
+T = TypeVar("T")
 
 # ExceptionGroup 是 Python 3.11+ 内置的
 # Python 3.10 或更早版本需要安装 exceptiongroup 库
@@ -442,6 +450,384 @@ async def demo_best_practices() -> None:
     print("   - 使用 try/finally 确保清理")
 
 
+# =============================================================================
+# 综合示例：优先级 + 截止时间调度器
+# =============================================================================
+#
+# 前面的示例都是"每个任务各自 cancel / wait_for 超时"，过载时所有请求一起
+# 排队、一起变慢、一起超时。DeadlineScheduler 把"先跑谁、能不能跑"集中决策：
+#
+#   工作类别 (klass，各自并发上限) → 优先级档 (数字越小越重要)
+#       → 租户 (按权重轮转，防止大租户刷屏) → 租户内按截止时间最早优先 (EDF)
+#
+# - 提交的是协程函数而不是协程对象：被丢弃的任务连协程都不会创建，零浪费；
+# - 派发前预估：now + 该类任务的平均耗时 > deadline → 直接丢弃（shed），
+#   不占用并发名额去做注定超时的工作；
+# - 每个任务挂一个 call_at 定时器：排队中到期 → 丢弃，运行中到期 → cancel；
+# - 调用方取消返回的 Future，排队中的任务会被移除，运行中的任务会被 cancel。
+
+
+class DeadlineMissed(Exception):
+    """任务因截止时间无法满足而被丢弃或取消。reason: admit / queue / running。"""
+
+    def __init__(self, reason: str) -> None:
+        super().__init__(f"deadline missed ({reason})")
+        self.reason = reason
+
+
+@dataclass(order=True)
+class _Job:
+    sort_key: tuple[float, int]
+    fn: Callable[[], Awaitable[Any]] = field(compare=False)
+    priority: int = field(compare=False)
+    klass: str = field(compare=False)
+    tenant: str = field(compare=False)
+    deadline: float = field(compare=False)
+    submitted: float = field(compare=False)
+    future: asyncio.Future[Any] = field(compare=False)
+    estimate: float | None = field(compare=False, default=None)
+    state: str = field(compare=False, default="queued")
+    task: asyncio.Task[Any] | None = field(compare=False, default=None)
+    timer: asyncio.TimerHandle | None = field(compare=False, default=None)
+
+
+class _ClassQueue:
+    """单个工作类别内的队列：优先级档 → 租户加权轮转 → 租户内 EDF 堆。"""
+
+    def __init__(self, limit: int, weights: dict[str, int]) -> None:
+        self.limit = limit
+        self.running = 0
+        self.estimate = 0.0  # 该类任务运行时间的 EWMA
+        self._weights = weights
+        self._heaps: dict[int, dict[str, list[_Job]]] = {}
+        self._rings: dict[int, deque[str]] = {}
+        self._credits: dict[tuple[int, str], int] = {}
+
+    def push(self, job: _Job) -> None:
+        band = self._heaps.setdefault(job.priority, {})
+        if job.tenant not in band:
+            band[job.tenant] = []
+            self._rings.setdefault(job.priority, deque()).append(job.tenant)
+        heapq.heappush(band[job.tenant], job)
+
+    def peek(self) -> _Job | None:
+        """返回下一个该派发的任务（不取出），顺带清理已失效的条目。"""
+        for priority in sorted(self._heaps):
+            band, ring = self._heaps[priority], self._rings[priority]
+            while ring:
+                tenant = ring[0]
+                heap = band[tenant]
+                while heap and heap[0].state != "queued":
+                    heapq.heappop(heap)  # 惰性删除：已丢弃 / 已取消
+                if heap:
+                    return heap[0]
+                ring.popleft()
+                del band[tenant]
+                self._credits.pop((priority, tenant), None)
+            del self._heaps[priority], self._rings[priority]
+        return None
+
+    def take(self, job: _Job) -> None:
+        """取出 peek() 返回的任务，并推进租户轮转。"""
+        heapq.heappop(self._heaps[job.priority][job.tenant])
+        key = (job.priority, job.tenant)
+        credits = self._credits.get(key, self._weights.get(job.tenant, 1)) - 1
+        if credits <= 0:
+            self._rings[job.priority].rotate(-1)
+            self._credits.pop(key, None)
+        else:
+            self._credits[key] = credits
+
+
+@dataclass
+class SchedulerStats:
+    """按 (优先级, 租户) 统计结果与端到端延迟（提交 → 完成，秒）。
+
+    延迟按优先级各保留最近 latency_window 条，长时间运行的调度器内存不会无限增长。
+    """
+
+    submitted: Counter[tuple[int, str]] = field(default_factory=Counter)
+    completed: Counter[tuple[int, str]] = field(default_factory=Counter)
+    failed: Counter[tuple[int, str]] = field(default_factory=Counter)
+    missed: Counter[tuple[int, str, str]] = field(default_factory=Counter)
+    latencies: dict[int, deque[float]] = field(default_factory=dict)
+    latency_window: int = 4096
+
+    def record_latency(self, priority: int, seconds: float) -> None:
+        window = self.latencies.get(priority)
+        if window is None:
+            window = self.latencies[priority] = deque(maxlen=self.latency_window)
+        window.append(seconds)
+
+    def percentile(self, priority: int, q: float) -> float:
+        values = sorted(self.latencies.get(priority, ()))
+        if not values:
+            return 0.0
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+    def missed_total(self, priority: int | None = None) -> int:
+        return sum(n for (p, _, _), n in self.missed.items() if priority is None or p == priority)
+
+
+class DeadlineScheduler:
+    """按优先级 + 截止时间派发协程，每个工作类别独立限流。
+
+    Args:
+        class_limits: 每个工作类别的并发上限，如 {"db": 4, "http": 16}
+        default_limit: 未声明类别的并发上限
+        max_concurrency: 所有类别合计的并发上限（None 表示不限）
+        tenant_weights: 租户权重，轮转时一次最多连续派发 weight 个任务
+        alpha: 运行时间 EWMA 的平滑系数
+    """
+
+    def __init__(
+        self,
+        class_limits: dict[str, int] | None = None,
+        *,
+        default_limit: int = 4,
+        max_concurrency: int | None = None,
+        tenant_weights: dict[str, int] | None = None,
+        alpha: float = 0.2,
+    ) -> None:
+        self._weights = dict(tenant_weights or {})
+        self._classes = {
+            name: _ClassQueue(limit, self._weights) for name, limit in (class_limits or {}).items()
+        }
+        self._default_limit = default_limit
+        self._max_concurrency = max_concurrency
+        self._running = 0
+        self._alpha = alpha
+        self._seq = 0
+        self.stats = SchedulerStats()
+
+    def submit(
+        self,
+        fn: Callable[[], Awaitable[T]],
+        *,
+        timeout: float,
+        priority: int = 1,
+        klass: str = "default",
+        tenant: str = "default",
+        estimate: float | None = None,
+    ) -> asyncio.Future[T]:
+        """提交任务，返回 Future；无法按时完成时 Future 抛 DeadlineMissed。
+
+        Args:
+            fn: 无参协程函数（需要参数请用 functools.partial 或 lambda）
+            timeout: 从现在起的截止时间预算（秒），包含排队与运行
+            estimate: 预计运行时间；默认使用该类别的实测 EWMA
+        """
+        loop = asyncio.get_running_loop()
+        now = loop.time()
+        queue = self._classes.get(klass)
+        if queue is None:
+            queue = self._classes[klass] = _ClassQueue(self._default_limit, self._weights)
+        self._seq += 1
+        job = _Job(
+            (now + timeout, self._seq), fn, priority, klass, tenant,
+            now + timeout, now, loop.create_future(), estimate,
+        )
+        self.stats.submitted[priority, tenant] += 1
+
+        if now + self._estimate(job, queue) > job.deadline:
+            self._miss(job, "admit")
+            return job.future
+        job.timer = loop.call_at(job.deadline, self._on_deadline, job)
+        job.future.add_done_callback(lambda _, job=job: self._on_future_done(job))
+        queue.push(job)
+        self._pump()
+        return job.future
+
+    def _estimate(self, job: _Job, queue: _ClassQueue) -> float:
+        return job.estimate if job.estimate is not None else queue.estimate
+
+    def _pump(self) -> None:
+        """在有空闲名额时，跨类别挑选 (优先级, 截止时间) 最小的任务派发。"""
+        loop = asyncio.get_running_loop()
+        while self._max_concurrency is None or self._running < self._max_concurrency:
+            best: _Job | None = None
+            best_queue: _ClassQueue | None = None
+            for queue in self._classes.values():
+                if queue.running >= queue.limit:
+                    continue
+                job = queue.peek()
+                if job is not None and (
+                    best is None or (job.priority, job.deadline) < (best.priority, best.deadline)
+                ):
+                    best, best_queue = job, queue
+            if best is None or best_queue is None:
+                return
+            best_queue.take(best)
+            if loop.time() + self._estimate(best, best_queue) > best.deadline:
+                # 跑完也来不及：不占名额，直接丢弃
+                self._miss(best, "queue")
+                continue
+            best.state = "running"
+            best_queue.running += 1
+            self._running += 1
+            best.task = asyncio.create_task(self._run(best, best_queue))
+
+    async def _run(self, job: _Job, queue: _ClassQueue) -> None:
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        key = (job.priority, job.tenant)
+        try:
+            result = await job.fn()
+        except asyncio.CancelledError:
+            if job.state == "expired":
+                self._miss(job, "running")
+            elif not job.future.done():
+                job.future.cancel()
+            if job.state not in ("expired", "cancelled"):
+                raise  # 调度器之外的取消（如事件循环关闭）继续向上传播
+        except Exception as exc:
+            self.stats.failed[key] += 1
+            if not job.future.done():
+                job.future.set_exception(exc)
+        else:
+            finished = loop.time()
+            queue.estimate += self._alpha * (finished - started - queue.estimate)
+            self.stats.completed[key] += 1
+            self.stats.record_latency(job.priority, finished - job.submitted)
+            if not job.future.done():
+                job.future.set_result(result)
+        finally:
+            if job.state == "running":
+                job.state = "done"
+            if job.timer is not None:
+                job.timer.cancel()
+            queue.running -= 1
+            self._running -= 1
+            self._pump()
+
+    def _on_deadline(self, job: _Job) -> None:
+        if job.state == "queued":
+            self._miss(job, "queue")
+        elif job.state == "running" and job.task is not None:
+            job.state = "expired"
+            job.task.cancel()
+
+    def _on_future_done(self, job: _Job) -> None:
+        # 调用方取消了 Future：排队中的任务惰性删除，运行中的任务 cancel
+        if not job.future.cancelled():
+            return
+        if job.state == "queued":
+            job.state = "cancelled"
+            if job.timer is not None:
+                job.timer.cancel()
+        elif job.state == "running" and job.task is not None:
+            job.state = "cancelled"
+            job.task.cancel()
+
+    def _miss(self, job: _Job, reason: str) -> None:
+        if job.state == "queued":
+            job.state = "shed"
+        if job.timer is not None:
+            job.timer.cancel()
+        self.stats.missed[job.priority, job.tenant, reason] += 1
+        if not job.future.done():
+            job.future.set_exception(DeadlineMissed(reason))
+
+
+async def demo_deadline_scheduler() -> None:
+    """示例 13：过载下的优先级 + 截止时间调度 vs FIFO 信号量。"""
+    print("\n\n== 优先级 + 截止时间调度器 ==\n")
+
+    service_time = 0.02   # 每个任务占用 20ms 的 db 连接
+    slots = 4             # db 并发上限 4 → 容量约 200 个/秒
+    duration = 1.5
+    # (名称, 优先级, 租户, 每秒到达数, 截止时间预算)
+    workload = [
+        ("交互", 0, "web", 100, 0.2),
+        ("批量", 2, "tenant-A", 250, 1.0),
+        ("批量", 2, "tenant-B", 50, 1.0),
+    ]
+    offered = sum(rate for _, _, _, rate, _ in workload)
+    print(f"容量约 {slots / service_time:.0f}/s，到达 {offered}/s（{offered * service_time / slots:.1f} 倍过载），"
+          f"持续 {duration}s\n")
+
+    async def db_query() -> str:
+        await asyncio.sleep(service_time)
+        return "ok"
+
+    async def drive(submit: Callable[[int, str, float], Awaitable[None]]) -> None:
+        """按固定速率为每类流量提交请求，等待全部结束。"""
+        loop = asyncio.get_running_loop()
+        pending: list[asyncio.Task[None]] = []
+
+        async def stream(priority: int, tenant: str, rate: int, budget: float) -> None:
+            start = loop.time()
+            for i in range(int(rate * duration)):
+                # 按绝对时间排程，避免 sleep 误差累积
+                await asyncio.sleep(max(0.0, start + i / rate - loop.time()))
+                pending.append(asyncio.create_task(submit(priority, tenant, budget)))
+
+        await asyncio.gather(*(stream(p, t, r, b) for _, p, t, r, b in workload))
+        await asyncio.gather(*pending)
+
+    # --- 基线：一个 FIFO 信号量 + 每个请求自己 wait_for ---
+    sem = asyncio.Semaphore(slots)
+    fifo_ok: Counter[str] = Counter()
+    fifo_lat: dict[int, list[float]] = {0: [], 2: []}
+
+    async def fifo_submit(priority: int, tenant: str, budget: float) -> None:
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+
+        async def guarded() -> None:
+            async with sem:
+                await db_query()
+
+        try:
+            await asyncio.wait_for(guarded(), budget)
+        except asyncio.TimeoutError:
+            return
+        fifo_ok[tenant] += 1
+        fifo_lat[priority].append(loop.time() - start)
+
+    await drive(fifo_submit)
+
+    # --- DeadlineScheduler ---
+    scheduler = DeadlineScheduler({"db": slots}, tenant_weights={"tenant-A": 1, "tenant-B": 1})
+
+    async def sched_submit(priority: int, tenant: str, budget: float) -> None:
+        future = scheduler.submit(
+            db_query, timeout=budget, priority=priority, klass="db", tenant=tenant
+        )
+        try:
+            await future
+        except DeadlineMissed:
+            pass
+
+    await drive(sched_submit)
+    stats = scheduler.stats
+
+    def pct(values: list[float], q: float) -> float:
+        values = sorted(values)
+        return values[min(len(values) - 1, int(q * len(values)))] * 1000 if values else 0.0
+
+    print(f"{'流量':<4} {'租户':<9} {'FIFO 完成率':>11} {'调度器完成率':>12}")
+    for name, priority, tenant, rate, _ in workload:
+        total = int(rate * duration)
+        sched_ok = stats.completed[priority, tenant]
+        print(f"{name:<4} {tenant:<9} {fifo_ok[tenant] / total:>11.0%} {sched_ok / total:>12.0%}")
+
+    print("\n端到端延迟 p50 / p99（仅成功请求）:")
+    for name, priority in (("交互", 0), ("批量", 2)):
+        print(f"  {name}: FIFO {pct(fifo_lat[priority], 0.5):5.0f} / {pct(fifo_lat[priority], 0.99):5.0f} ms"
+              f"  |  调度器 {stats.percentile(priority, 0.5) * 1000:5.0f} / "
+              f"{stats.percentile(priority, 0.99) * 1000:5.0f} ms")
+
+    reasons = Counter()
+    for (_, _, reason), n in stats.missed.items():
+        reasons[reason] += n
+    print(f"\n调度器错过截止时间: {stats.missed_total()} 个，"
+          f"其中 admit={reasons['admit']} queue={reasons['queue']} running={reasons['running']}")
+    print("  - admit/queue：派发前就判定来不及，没有浪费 db 名额")
+    print("  - 交互请求优先，延迟不随批量流量上涨；批量内 tenant-B 不被 tenant-A 挤掉")
+    print("  - 批量请求延迟贴近预算：过载时 EDF 会用尽每个任务的余量，这是预期行为")
+
+
 async def main() -> None:
     """运行所有示例。"""
     # done() 示例
@@ -468,6 +854,9 @@ async def main() -> None:
     # 最佳实践
     await demo_best_practices()
 
+    # 调度器
+    await demo_deadline_scheduler()
+
     print("\n" + "="*60)
     print("核心方法速查")
     print("="*60)
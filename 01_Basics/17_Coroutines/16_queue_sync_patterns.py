@@ -18,12 +18,22 @@ Author: Lambert
 - 每次调用 get() 获取一个项目，处理后必须调用 task_done()
 - join() 会阻塞，直到所有已获取的项目都标记为 task_done()
 - 这是一种"倒计数"同步机制
+
+示例 07 的 MonitoredQueue 为 worker 池提供监控：等待/服务时间分开记录到对数分桶直方图，
+周期导出分位数、队列深度与每个 worker 的利用率。
+示例 08 的 AdaptiveBatcher 是生产级批处理器：按条数 / 字节 / 停留时间
+先到先触发切批，有界队列背压，多消费者并行写入，并按目标耗时自动调整批大小。
 """
 
 from __future__ import annotations
 
 import asyncio
-from typing import NoReturn
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Generic, NoReturn, TypeVar
+
+T = TypeVar("T")
 
 
 # =============================================================================
@@ -203,18 +213,17 @@ async def demo_batch_processing() -> None:
             self.current_batch.append(item)
 
             if len(self.current_batch) >= self.batch_size:
-                # 满批次，放入队列处理
-                batch = self.current_batch[:]
-                self.current_batch.clear()
+                # 满批次，放入队列处理：直接交换列表，不必切片复制
+                batch, self.current_batch = self.current_batch, []
                 await self.queue.put(batch)
                 print(f"[添加] 满批次，放入队列: {batch}")
 
         async def finish(self) -> None:
             """完成添加，处理剩余项目。"""
             if self.current_batch:
-                await self.queue.put(self.current_batch)
-                print(f"[完成] 剩余批次放入队列: {self.current_batch}")
-                self.current_batch.clear()
+                batch, self.current_batch = self.current_batch, []
+                await self.queue.put(batch)
+                print(f"[完成] 剩余批次放入队列: {batch}")
 
         async def processor(self, name: str) -> NoReturn:
             """批量处理器：从队列获取批次并处理。"""
@@ -247,6 +256,8 @@ async def demo_batch_processing() -> None:
     except asyncio.CancelledError:
         pass
 
+    print("注意：G 一直等到 finish() 才发出；流量稀疏时需要停留时间上限，见示例 08")
+
 
 # =============================================================================
 # 优雅关闭模式
@@ -384,73 +395,531 @@ async def demo_error_handling() -> None:
 
 
 # =============================================================================
-# 性能监控模式
+# 性能监控模式：等待/服务时间直方图、队列深度、worker 利用率
 # =============================================================================
-
-
-async def demo_performance_monitoring() -> None:
-    """示例 07：性能监控 - 追踪吞吐量和延迟。"""
-    print("\n\n== 性能监控模式 ==\n")
-
-    class MonitoredQueue:
-        """带监控的队列系统。"""
-
-        def __init__(self) -> None:
-            self.queue: asyncio.Queue[str] = asyncio.Queue()
-            self.total_processed = 0
-            self.start_time = 0
-
-        async def worker(self, name: str) -> NoReturn:
-            """工作协程：记录处理时间。"""
-            while True:
-                task = await self.queue.get()
-                task_start = asyncio.get_event_loop().time()
-
-                # 处理任务
-                await asyncio.sleep(0.1)
-
-                task_time = asyncio.get_event_loop().time() - task_start
-                self.total_processed += 1
-                print(f"[{name}] 处理: {task} | 耗时: {task_time:.3f}s | 总计: {self.total_processed}")
-
+#
+# 只数 total_processed、最后打印一个平均吞吐，回答不了最关键的问题：
+# 延迟变高，是 worker 不够（任务在队列里排队）还是下游变慢（任务本身变慢）？
+# 所以把每个任务的耗时拆成两段分别记录：
+#
+#   put ──── 等待时间 (wait) ────▶ get ──── 服务时间 (service) ────▶ 完成
+#
+# - LogHistogram：HDR 风格的对数分桶直方图（微秒，每个 2 的幂区间 16 个子桶，
+#   相对误差 ≤ 1/16），记录一次只是一次下标计算 + 列表自增；
+# - 热路径不加锁也不拷贝：导出器每个周期把"当前区间直方图"整个换成新的空对象，
+#   旧对象交给导出器慢慢算分位数（与 HdrHistogram 的 Recorder 同一思路）；
+# - 队列深度、在途任务数是 gauge；每个 worker 的忙碌时间按区间切分，得到利用率。
+
+_SUB_BITS = 4
+_SUB_COUNT = 1 << _SUB_BITS
+
+
+class LogHistogram:
+    """对数分桶直方图，单位微秒，可记录到约 1 小时。"""
+
+    __slots__ = ("counts", "total", "max_us", "sum_us")
+
+    def __init__(self) -> None:
+        self.counts = [0] * (40 * _SUB_COUNT)
+        self.total = 0
+        self.max_us = 0
+        self.sum_us = 0
+
+    @staticmethod
+    def _index(us: int) -> int:
+        shift = us.bit_length() - (_SUB_BITS + 1)
+        if shift <= 0:
+            return us
+        return shift * _SUB_COUNT + (us >> shift)
+
+    @staticmethod
+    def _upper(index: int) -> int:
+        """桶的上界（微秒），报告分位数时取上界，偏保守。"""
+        if index < 2 * _SUB_COUNT:
+            return index
+        shift = index // _SUB_COUNT - 1
+        return ((index - shift * _SUB_COUNT + 1) << shift) - 1
+
+    def record(self, seconds: float) -> None:
+        us = int(seconds * 1e6)
+        self.counts[self._index(us)] += 1
+        self.total += 1
+        self.sum_us += us
+        if us > self.max_us:
+            self.max_us = us
+
+    def merge(self, other: LogHistogram) -> None:
+        for i, n in enumerate(other.counts):
+            if n:
+                self.counts[i] += n
+        self.total += other.total
+        self.sum_us += other.sum_us
+        self.max_us = max(self.max_us, other.max_us)
+
+    def percentile(self, q: float) -> float:
+        """返回第 q 分位（0~1）的秒数；空直方图返回 0。"""
+        if not self.total:
+            return 0.0
+        rank = max(1, round(q * self.total))
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return min(self._upper(i), self.max_us) / 1e6
+        return self.max_us / 1e6
+
+    @property
+    def mean(self) -> float:
+        return self.sum_us / self.total / 1e6 if self.total else 0.0
+
+
+@dataclass
+class QueueReport:
+    """一个导出周期的快照。"""
+
+    interval: float
+    completed: int
+    depth: int
+    max_depth: int
+    in_flight: int
+    wait: LogHistogram
+    service: LogHistogram
+    utilization: list[float]
+    # 之前所有区间的服务时间中位数，用来判断"下游是否比平时慢"
+    baseline_service: float = 0.0
+
+    @property
+    def throughput(self) -> float:
+        return self.completed / self.interval if self.interval > 0 else 0.0
+
+    def diagnose(self) -> str:
+        """粗略判断瓶颈：服务时间高于基线 → 查下游；排队为主且 worker 跑满 → 加 worker。"""
+        busy = sum(self.utilization) / len(self.utilization) if self.utilization else 0.0
+        service_p50 = self.service.percentile(0.5)
+        if self.baseline_service and service_p50 > 1.5 * self.baseline_service:
+            ratio = service_p50 / self.baseline_service
+            return f"服务时间是基线的 {ratio:.1f} 倍 → 下游变慢或任务变重"
+        if busy > 0.9 and self.wait.percentile(0.99) > self.service.percentile(0.99):
+            return "排队为主、worker 已跑满 → 需要更多 worker"
+        return "健康"
+
+    def format(self) -> str:
+        def ms(h: LogHistogram, q: float) -> str:
+            return f"{h.percentile(q) * 1000:6.1f}"
+
+        util = " ".join(f"{u:4.0%}" for u in self.utilization)
+        return (
+            f"吞吐 {self.throughput:6.1f}/s | 深度 {self.depth:3d} (峰值 {self.max_depth:3d}) | "
+            f"wait p50/p99 {ms(self.wait, 0.5)}/{ms(self.wait, 0.99)}ms | "
+            f"service p50/p99 {ms(self.service, 0.5)}/{ms(self.service, 0.99)}ms | "
+            f"利用率 [{util}]"
+        )
+
+
+class MonitoredQueue:
+    """带监控的 asyncio.Queue worker 池。
+
+    Args:
+        handler: 处理单个任务的协程函数
+        workers: worker 数量（可通过 add_workers 在线扩容）
+        maxsize: 队列容量，0 表示无界
+        interval: 导出周期（秒）
+        on_report: 每个周期收到一个 QueueReport；默认不处理，用 reports 列表查看
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[Any], Awaitable[None]],
+        *,
+        workers: int = 4,
+        maxsize: int = 0,
+        interval: float = 1.0,
+        on_report: Callable[[QueueReport], None] | None = None,
+    ) -> None:
+        self._handler = handler
+        self.queue: asyncio.Queue[tuple[Any, float]] = asyncio.Queue(maxsize)
+        self.interval = interval
+        self._on_report = on_report
+        # 热路径写入的区间数据：导出时整体替换，不加锁
+        self._wait = LogHistogram()
+        self._service = LogHistogram()
+        self._completed = 0
+        self._max_depth = 0
+        # 累计数据：只由导出器合并
+        self.total_wait = LogHistogram()
+        self.total_service = LogHistogram()
+        self.reports: list[QueueReport] = []
+        self._busy: list[float] = []
+        self._busy_since: list[float | None] = []
+        self._interval_start = time.perf_counter()
+        self._tasks: list[asyncio.Task[Any]] = []
+        self._initial_workers = workers
+
+    def start(self) -> None:
+        self._interval_start = time.perf_counter()
+        self.add_workers(self._initial_workers)
+        self._tasks.append(asyncio.create_task(self._exporter()))
+
+    def add_workers(self, n: int) -> None:
+        for _ in range(n):
+            wid = len(self._busy)
+            self._busy.append(0.0)
+            self._busy_since.append(None)
+            self._tasks.append(asyncio.create_task(self._worker(wid)))
+
+    async def put(self, item: Any) -> None:
+        await self.queue.put((item, time.perf_counter()))
+        depth = self.queue.qsize()
+        if depth > self._max_depth:
+            self._max_depth = depth
+
+    async def _worker(self, wid: int) -> NoReturn:
+        while True:
+            item, enqueued = await self.queue.get()
+            started = time.perf_counter()
+            self._busy_since[wid] = started
+            try:
+                await self._handler(item)
+            except Exception:
+                pass  # 错误处理见示例 06，这里只关心耗时
+            finally:
+                finished = time.perf_counter()
+                self._busy_since[wid] = None
+                self._busy[wid] += finished - max(started, self._interval_start)
+                self._wait.record(started - enqueued)
+                self._service.record(finished - started)
+                self._completed += 1
                 self.queue.task_done()
 
-        async def submit_batch(self, tasks: list[str]) -> None:
-            """批量提交任务。"""
-            self.start_time = asyncio.get_event_loop().time()
-            for task in tasks:
-                await self.queue.put(task)
+    def snapshot(self) -> QueueReport:
+        """切换区间：换上新的直方图和计数器，旧数据生成报告。"""
+        now = time.perf_counter()
+        elapsed = now - self._interval_start
+        wait, self._wait = self._wait, LogHistogram()
+        service, self._service = self._service, LogHistogram()
+        completed, self._completed = self._completed, 0
+        max_depth, self._max_depth = self._max_depth, self.queue.qsize()
+
+        utilization = []
+        for wid, since in enumerate(self._busy_since):
+            busy = self._busy[wid]
+            if since is not None:
+                # 正在执行的任务：只把本区间内的部分算进来
+                busy += now - max(since, self._interval_start)
+            utilization.append(min(1.0, busy / elapsed) if elapsed > 0 else 0.0)
+            self._busy[wid] = 0.0
+        self._interval_start = now
+
+        baseline = self.total_service.percentile(0.5)
+        self.total_wait.merge(wait)
+        self.total_service.merge(service)
+        in_flight = sum(since is not None for since in self._busy_since)
+        return QueueReport(
+            elapsed, completed, self.queue.qsize(), max_depth, in_flight,
+            wait, service, utilization, baseline,
+        )
+
+    async def _exporter(self) -> NoReturn:
+        while True:
+            await asyncio.sleep(self.interval)
+            report = self.snapshot()
+            self.reports.append(report)
+            if self._on_report is not None:
+                self._on_report(report)
 
-        async def wait_completion(self) -> None:
-            """等待完成并打印统计。"""
-            await self.queue.join()
-            elapsed = asyncio.get_event_loop().time() - self.start_time
-            throughput = self.total_processed / elapsed if elapsed > 0 else 0
+    async def join(self) -> None:
+        await self.queue.join()
 
-            print(f"\n[性能统计]")
-            print(f"  总任务数: {self.total_processed}")
-            print(f"  总耗时: {elapsed:.3f}s")
-            print(f"  吞吐量: {throughput:.2f} 任务/秒")
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
 
-    mq = MonitoredQueue()
 
-    # 启动工作协程
-    workers = [
-        asyncio.create_task(mq.worker(f"Worker-{i}"))
-        for i in range(3)
-    ]
+async def demo_performance_monitoring() -> None:
+    """示例 07：性能监控 - 等待/服务时间直方图、队列深度与 worker 利用率。"""
+    print("\n\n== 性能监控模式 ==\n")
 
-    # 提交任务
-    tasks = [f"Task-{i}" for i in range(1, 16)]
-    await mq.submit_batch(tasks)
+    downstream_delay = 0.02  # 模拟下游（数据库/HTTP）单次耗时
+
+    async def handle(_: int) -> None:
+        await asyncio.sleep(downstream_delay)
+
+    def show(report: QueueReport) -> None:
+        print(f"  {report.format()}")
+        print(f"    → {report.diagnose()}")
+
+    mq = MonitoredQueue(handle, workers=3, interval=0.5, on_report=show)
+    mq.start()
+
+    async def produce(rate: float, seconds: float) -> None:
+        n = int(rate * seconds)
+        for i in range(n):
+            await mq.put(i)
+            await asyncio.sleep(1 / rate)
+
+    # 3 个 worker × 20ms ≈ 150 任务/秒 的容量
+    print("阶段 1：到达 100/s，容量约 150/s")
+    await produce(100, 1.0)
+    print("阶段 2：到达 200/s，超过容量 → 队列堆积，wait 上涨")
+    await produce(200, 1.0)
+    print("阶段 3：扩容到 6 个 worker，积压被消化")
+    mq.add_workers(3)
+    await produce(200, 1.0)
+    print("阶段 4：下游变慢（20ms → 45ms），service 上涨")
+    downstream_delay = 0.045
+    await produce(100, 1.0)
+    await mq.join()
+    await mq.stop()
+
+    total = mq.total_service.total
+    print("\n[累计]")
+    print(f"  任务数: {total}")
+    print(f"  wait    p50/p99/max: {mq.total_wait.percentile(0.5) * 1000:.1f} / "
+          f"{mq.total_wait.percentile(0.99) * 1000:.1f} / {mq.total_wait.max_us / 1000:.1f} ms")
+    print(f"  service p50/p99/max: {mq.total_service.percentile(0.5) * 1000:.1f} / "
+          f"{mq.total_service.percentile(0.99) * 1000:.1f} / {mq.total_service.max_us / 1000:.1f} ms")
 
-    # 等待完成
-    await mq.wait_completion()
 
-    # 清理
-    for w in workers:
-        w.cancel()
-    await asyncio.gather(*workers, return_exceptions=True)
+# =============================================================================
+# 生产级批处理：条数 / 字节 / 停留时间三重触发 + 背压 + 并行消费 + 自动调优
+# =============================================================================
+#
+# 示例 04 的 BatchProcessor 只在凑满 batch_size 时才发货：流量稀疏时最后几条
+# 会一直卡在 current_batch 里，直到 finish()。AdaptiveBatcher 的流水线：
+#
+#   submit() ──▶ inbox（有界，满了就让生产者等待 = 背压）
+#            ──▶ collector（按 max_items / max_bytes / max_linger 先到先触发切批）
+#            ──▶ outbox（容量 = consumers，消费者忙时 collector 也停下）
+#            ──▶ N 个 consumer 并行调用 sink(batch)
+#
+# 停留时间从批次里第一条的入队时间算起：已经在 inbox 排过队的条目不会再
+# 额外等一个 max_linger。给出 target_latency 时，每批写完后按
+# target / 实际耗时 调整 max_items（只有满批才允许放大），
+# 让单次写入耗时贴近目标——这就是摊薄数据库 / HTTP 写入开销的方式。
+
+_CLOSE = object()
+
+
+@dataclass
+class BatcherStats:
+    """AdaptiveBatcher 的运行统计。"""
+
+    batches: int = 0
+    items: int = 0
+    failed_batches: int = 0
+    flush_reasons: dict[str, int] = field(default_factory=dict)
+    # 每批中最老一条从 submit 到写完的耗时（秒），只保留最近 1024 批
+    latencies: deque[float] = field(default_factory=lambda: deque(maxlen=1024))
+    max_items_history: list[int] = field(default_factory=list)
+
+    def latency_percentile(self, q: float) -> float:
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class AdaptiveBatcher(Generic[T]):
+    """按条数、字节数或停留时间（先到者）切批，并行写入 sink。
+
+    Args:
+        sink: 处理一批的协程函数，如批量 INSERT 或批量 HTTP POST
+        max_items: 每批最多条数（开启自动调优时是初始值）
+        max_bytes: 每批累计字节上限，达到或超过即切批（可能超出最后一条的大小）
+        max_linger: 第一条入队后最多等待多久就必须发货（秒）
+        queue_size: inbox 容量，满时 submit() 阻塞
+        consumers: 并行执行 sink 的协程数
+        target_latency: 单批 sink 的目标耗时（秒）；None 表示不自动调优
+        min_items / max_items_cap: 自动调优的上下限
+        size_of: 计算单条字节数，默认 len
+    """
+
+    def __init__(
+        self,
+        sink: Callable[[list[T]], Awaitable[None]],
+        *,
+        max_items: int = 100,
+        max_bytes: int = 1 << 20,
+        max_linger: float = 0.05,
+        queue_size: int = 1000,
+        consumers: int = 2,
+        target_latency: float | None = None,
+        min_items: int = 1,
+        max_items_cap: int = 10_000,
+        size_of: Callable[[T], int] = len,  # type: ignore[assignment]
+    ) -> None:
+        self._sink = sink
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.max_linger = max_linger
+        self.target_latency = target_latency
+        self.min_items = min_items
+        self.max_items_cap = max_items_cap
+        self._size_of = size_of
+        self._inbox: asyncio.Queue[Any] = asyncio.Queue(maxsize=queue_size)
+        self._outbox: asyncio.Queue[Any] = asyncio.Queue(maxsize=consumers)
+        self._consumers = consumers
+        self._tasks: list[asyncio.Task[None]] = []
+        self._closed = False
+        self.stats = BatcherStats()
+
+    async def __aenter__(self) -> AdaptiveBatcher[T]:
+        self.start()
+        return self
+
+    async def __aexit__(self, *exc: object) -> None:
+        await self.close()
+
+    def start(self) -> None:
+        self._tasks.append(asyncio.create_task(self._collect()))
+        self._tasks.extend(
+            asyncio.create_task(self._consume()) for _ in range(self._consumers)
+        )
+
+    async def submit(self, item: T) -> None:
+        """提交一条；inbox 已满时等待（背压传递给生产者）。"""
+        if self._closed:
+            raise RuntimeError("batcher is closed")
+        now = asyncio.get_running_loop().time()
+        await self._inbox.put((item, now, self._size_of(item)))
+
+    async def close(self) -> None:
+        """停止接收，把剩余条目全部写完后再返回。"""
+        if self._closed:
+            return
+        self._closed = True
+        await self._inbox.put(_CLOSE)
+        await asyncio.gather(*self._tasks)
+
+    async def _collect(self) -> None:
+        loop = asyncio.get_running_loop()
+        closing = False
+        while not closing:
+            entry = await self._inbox.get()
+            if entry is _CLOSE:
+                break
+            batch = [entry[0]]
+            oldest = entry[1]
+            nbytes = entry[2]
+            deadline = oldest + self.max_linger
+            while True:
+                if len(batch) >= self.max_items:
+                    reason = "items"
+                    break
+                if nbytes >= self.max_bytes:
+                    reason = "bytes"
+                    break
+                try:
+                    entry = self._inbox.get_nowait()
+                except asyncio.QueueEmpty:
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        reason = "linger"
+                        break
+                    try:
+                        entry = await asyncio.wait_for(self._inbox.get(), timeout)
+                    except asyncio.TimeoutError:
+                        reason = "linger"
+                        break
+                if entry is _CLOSE:
+                    reason = "close"
+                    closing = True
+                    break
+                batch.append(entry[0])
+                nbytes += entry[2]
+            self.stats.flush_reasons[reason] = self.stats.flush_reasons.get(reason, 0) + 1
+            await self._outbox.put((batch, reason, oldest))
+        for _ in range(self._consumers):
+            await self._outbox.put(None)
+
+    async def _consume(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            job = await self._outbox.get()
+            if job is None:
+                return
+            batch, reason, oldest = job
+            started = loop.time()
+            try:
+                await self._sink(batch)
+            except Exception:
+                # 单批失败不能拖垮消费者；重试 / 死信交给 sink 自己决定
+                self.stats.failed_batches += 1
+            finished = loop.time()
+            self.stats.batches += 1
+            self.stats.items += len(batch)
+            self.stats.latencies.append(finished - oldest)
+            self._tune(len(batch), finished - started, reason)
+
+    def _tune(self, size: int, duration: float, reason: str) -> None:
+        """按 target / 实际耗时 的平方根缩放 max_items，单步限制在 [0.5, 1.5] 倍。"""
+        if self.target_latency is None:
+            return
+        factor = min(1.5, max(0.5, (self.target_latency / max(duration, 1e-6)) ** 0.5))
+        if factor > 1 and (reason != "items" or size < self.max_items):
+            # 只有满批才说明"还能装更多"；停留时间触发的小批不代表 sink 变快了
+            return
+        new = max(self.min_items, min(self.max_items_cap, round(self.max_items * factor)))
+        if new != self.max_items:
+            self.max_items = new
+            self.stats.max_items_history.append(new)
+
+
+async def demo_adaptive_batcher() -> None:
+    """示例 08：AdaptiveBatcher - 稀疏流量不卡住、突发流量自动放大批次。"""
+    print("\n\n== 生产级批处理：条数/字节/停留时间三重触发 ==\n")
+
+    loop = asyncio.get_running_loop()
+    writes: list[int] = []
+
+    async def db_write(batch: list[bytes]) -> None:
+        # 模拟批量 INSERT：每次往返 5ms 固定开销 + 每条 0.2ms
+        writes.append(len(batch))
+        await asyncio.sleep(0.005 + 0.0002 * len(batch))
+
+    # 1) 稀疏流量：每 30ms 来一条，max_items 再大也不会卡住
+    print("1) 稀疏流量（每 30ms 一条，max_items=50，max_linger=50ms）")
+    async with AdaptiveBatcher(db_write, max_items=50, max_linger=0.05) as batcher:
+        for i in range(6):
+            await batcher.submit(f"event-{i}".encode())
+            await asyncio.sleep(0.03)
+    stats = batcher.stats
+    print(f"   批次大小: {writes}，触发原因: {stats.flush_reasons}")
+    print(f"   最老条目最大等待: {max(stats.latencies) * 1000:.0f}ms（旧版会等到 finish()）")
+
+    # 2) 字节上限：大对象按字节切批
+    writes.clear()
+    print("\n2) 字节上限（每条 40KB，max_bytes=128KB）")
+    async with AdaptiveBatcher(db_write, max_items=100, max_bytes=128 * 1024) as batcher:
+        for _ in range(10):
+            await batcher.submit(bytes(40 * 1024))
+    print(f"   批次大小: {writes}，触发原因: {batcher.stats.flush_reasons}")
+
+    # 3) 突发流量：逐条写 vs 自动调优批处理
+    print("\n3) 突发 3000 条，2 个并行消费者，目标单批耗时 20ms")
+    writes.clear()
+    async with AdaptiveBatcher(db_write, max_items=1, consumers=2) as batcher:
+        start = loop.time()
+        for i in range(200):
+            await batcher.submit(b"row")
+    single_rate = 200 / (loop.time() - start)
+
+    writes.clear()
+    async with AdaptiveBatcher(
+        db_write, max_items=8, consumers=2, queue_size=500, target_latency=0.02
+    ) as batcher:
+        start = loop.time()
+        for i in range(3000):
+            await batcher.submit(b"row")  # inbox 满时在这里等待
+    batched_rate = 3000 / (loop.time() - start)
+    stats = batcher.stats
+    print(f"   逐条写入: {single_rate:,.0f} 条/秒")
+    print(f"   自动调优: {batched_rate:,.0f} 条/秒（{batched_rate / single_rate:.0f}x），{stats.batches} 批")
+    print(f"   max_items 调整轨迹: {stats.max_items_history[:12]}")
+    print(f"   最终 max_items={batcher.max_items}（理论值 (20-5)/0.2 = 75），"
+          f"p95 延迟 {stats.latency_percentile(0.95) * 1000:.0f}ms")
 
 
 # =============================================================================
@@ -467,6 +936,7 @@ async def main() -> None:
     await demo_graceful_shutdown()
     await demo_error_handling()
     await demo_performance_monitoring()
+    await demo_adaptive_batcher()
 
     print("\n" + "="*60)
     print("核心方法速查")
@@ -28,12 +28,20 @@ Author: Lambert
    - asyncio.start_unix_server() - Unix域socket服务器
 
 4. **底层 Protocol/Transport**（简要介绍）
+
+5. **高吞吐帧协议**：
+   - asyncio.BufferedProtocol：recv_into 池化缓冲区，一次回调解析多帧
+   - 小消息合批、writelines 分片写出，避免 prefix + message 拷贝
+   - 与 StreamReader 版本的回显基准（消息/秒、每次写出的帧数、每帧拷贝字节）
 """
 
 from __future__ import annotations
 
 import asyncio
-from typing import Any
+import struct
+import sys
+import time
+from typing import Any, Callable
 
 
 # =============================================================================
@@ -352,6 +360,293 @@ async def demo_length_prefix_protocol() -> None:
         if msg:
             print(f"  消息 {i+1}: {msg.decode()} (长度: {len(msg)})")
 
+    print("\n注意：每条消息两次 readexactly、prefix + message 又拷贝一次；")
+    print("      高吞吐场景见 demo_framed_protocol_benchmark 的 FrameProtocol")
+
+
+# =============================================================================
+# 高吞吐长度前缀协议：BufferedProtocol + 缓冲池
+# =============================================================================
+
+_FRAME_HEADER = struct.Struct("!I")
+# 3.12+ 的 selector transport.writelines 用 sendmsg 分散写；之前的版本会先 b"".join 拷贝一次
+_WRITELINES_ZERO_COPY = sys.version_info >= (3, 12)
+
+
+class BufferPool:
+    """固定大小接收缓冲区的对象池：连接关闭后归还，新连接直接复用。
+
+    只在事件循环线程里使用，不需要加锁。
+    """
+
+    def __init__(self, size: int = 256 * 1024, max_free: int = 64):
+        self.size = size
+        self.max_free = max_free
+        self._free: list[bytearray] = []
+        self.created = 0
+        self.reused = 0
+
+    def acquire(self) -> bytearray:
+        if self._free:
+            self.reused += 1
+            return self._free.pop()
+        self.created += 1
+        return bytearray(self.size)
+
+    def release(self, buffer: bytearray) -> None:
+        # 为超大帧临时扩容过的缓冲区不回池
+        if len(buffer) == self.size and len(self._free) < self.max_free:
+            self._free.append(buffer)
+
+
+class FrameProtocol(asyncio.BufferedProtocol):
+    """4 字节大端长度前缀的帧协议。
+
+    接收：内核数据直接 recv_into 池化缓冲区，一次 buffer_updated 解析出所有完整帧，
+    on_frame(protocol, frame) 拿到的是指向缓冲区的 memoryview，只在回调期间有效。
+    发送：小帧拷进批量缓冲区，大帧（bytes）不拷贝直接作为独立分片；同一轮事件循环
+    里 send() 的所有帧在 call_soon 的 flush 中一次写出。
+    """
+
+    def __init__(
+        self,
+        on_frame: Callable[[FrameProtocol, memoryview], None],
+        pool: BufferPool | None = None,
+        max_frame: int = 16 * 1024 * 1024,
+        small_frame: int = 4096,
+    ):
+        self.on_frame = on_frame
+        self.pool = pool or BufferPool()
+        self.max_frame = max_frame
+        self.small_frame = small_frame
+        self.transport: asyncio.Transport | None = None
+        self.stats = {"frames_in": 0, "frames_out": 0, "flushes": 0, "bytes_copied": 0}
+        self._buffer = bytearray()
+        self._view = memoryview(self._buffer)
+        self._start = 0  # 未解析数据在 [_start, _end)
+        self._end = 0
+        self._batch = bytearray()
+        self._parts: list[bytes | bytearray] = []
+        self._flush_scheduled = False
+        self._paused = False
+        self._drain_waiters: list[asyncio.Future[None]] = []
+        self.closed: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+
+    # ---- 接收 ----
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self.transport = transport  # type: ignore[assignment]
+        self._set_buffer(self.pool.acquire())
+
+    def _set_buffer(self, buffer: bytearray) -> None:
+        self._view.release()
+        self._buffer = buffer
+        self._view = memoryview(buffer)
+
+    def get_buffer(self, sizehint: int) -> memoryview:
+        if self._end == len(self._buffer):
+            # 前面有已解析的空间就原地挪（_start > 0 时 pending + 1 不会超过容量）；
+            # 只有未解析数据真的占满整个缓冲区才扩容
+            self._make_room(self._end - self._start + 1)
+        return self._view[self._end:]
+
+    def _make_room(self, needed: int) -> None:
+        """把未解析的半帧挪到缓冲区开头；单帧比缓冲区还大时换一个更大的缓冲区"""
+        pending = self._end - self._start
+        if needed > len(self._buffer):
+            bigger = bytearray(max(needed, len(self._buffer) * 2))
+            bigger[:pending] = self._view[self._start:self._end]
+            self.pool.release(self._buffer)
+            self._set_buffer(bigger)
+        elif self._start:
+            self._view[:pending] = self._view[self._start:self._end]
+        else:
+            return
+        self.stats["bytes_copied"] += pending
+        self._start, self._end = 0, pending
+
+    def buffer_updated(self, nbytes: int) -> None:
+        self._end += nbytes
+        buffer, view = self._buffer, self._view
+        start, end = self._start, self._end
+        unpack = _FRAME_HEADER.unpack_from
+        frames = 0
+        needed = 0
+        while end - start >= 4:
+            (length,) = unpack(buffer, start)
+            if length > self.max_frame:
+                self.transport.abort()  # type: ignore[union-attr]
+                return
+            stop = start + 4 + length
+            if stop > end:
+                needed = stop - start
+                break
+            self.on_frame(self, view[start + 4:stop])
+            start = stop
+            frames += 1
+        self.stats["frames_in"] += frames
+        if start == end:
+            start = end = 0  # 全部解析完：下次从头写，不用挪数据
+            if len(buffer) != self.pool.size:
+                # 超大帧已处理完：扔掉临时扩容的缓冲区，换回池化的标准缓冲区
+                self._set_buffer(self.pool.acquire())
+        self._start, self._end = start, end
+        if needed > len(buffer) - start:
+            self._make_room(needed)
+
+    def eof_received(self) -> bool:
+        return False
+
+    def connection_lost(self, exc: Exception | None) -> None:
+        self.pool.release(self._buffer)
+        self._set_buffer(bytearray())
+        self._wake_drainers()
+        if not self.closed.done():
+            self.closed.set_result(None)
+
+    # ---- 发送 ----
+
+    def send(self, payload: bytes | memoryview) -> None:
+        """排队一帧；memoryview 可能指向接收缓冲区，一律拷贝"""
+        size = len(payload)
+        if size <= self.small_frame or isinstance(payload, memoryview):
+            self._batch += _FRAME_HEADER.pack(size)
+            self._batch += payload
+            self.stats["bytes_copied"] += size
+        else:
+            self._seal_batch()
+            self._parts.append(_FRAME_HEADER.pack(size))
+            self._parts.append(payload)  # bytes 不可变，直接交给 transport
+        self.stats["frames_out"] += 1
+        if not self._flush_scheduled:
+            self._flush_scheduled = True
+            asyncio.get_running_loop().call_soon(self._flush)
+
+    def _seal_batch(self) -> None:
+        if self._batch:
+            self._parts.append(self._batch)
+            self._batch = bytearray()
+
+    def _flush(self) -> None:
+        self._flush_scheduled = False
+        self._seal_batch()
+        parts, self._parts = self._parts, []
+        if not parts or self.transport is None or self.transport.is_closing():
+            return
+        self.stats["flushes"] += 1
+        if _WRITELINES_ZERO_COPY or len(parts) == 1:
+            self.transport.writelines(parts)
+        else:
+            for part in parts:
+                self.transport.write(part)
+
+    def pause_writing(self) -> None:
+        self._paused = True
+
+    def resume_writing(self) -> None:
+        self._paused = False
+        self._wake_drainers()
+
+    def _wake_drainers(self) -> None:
+        waiters, self._drain_waiters = self._drain_waiters, []
+        for waiter in waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    async def drain(self) -> None:
+        """对端读得慢、transport 写缓冲超过高水位时等待"""
+        if self._paused and self.transport is not None and not self.transport.is_closing():
+            waiter = asyncio.get_running_loop().create_future()
+            self._drain_waiters.append(waiter)
+            await waiter
+
+
+async def _stream_echo_handler(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    """对照组：与 demo_length_prefix_protocol 相同的 readexactly x2 + prefix + message 写法"""
+    try:
+        while True:
+            prefix = await reader.readexactly(4)
+            message = await reader.readexactly(int.from_bytes(prefix, "big"))
+            writer.write(len(message).to_bytes(4, "big") + message)
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def _run_echo_client(port: int, count: int, size: int, window: int) -> float:
+    """流水线客户端：保持 window 条消息在途，返回收齐 count 条回显的耗时"""
+    loop = asyncio.get_running_loop()
+    done = loop.create_future()
+    payload = b"x" * size
+    sent = received = 0
+
+    def on_frame(protocol: FrameProtocol, frame: memoryview) -> None:
+        nonlocal sent, received
+        received += 1
+        if sent < count:
+            protocol.send(payload)
+            sent += 1
+        elif received == count and not done.done():
+            done.set_result(None)
+
+    transport, protocol = await loop.create_connection(lambda: FrameProtocol(on_frame), "127.0.0.1", port)
+    started = time.perf_counter()
+    for _ in range(min(window, count)):
+        protocol.send(payload)
+        sent += 1
+    await done
+    elapsed = time.perf_counter() - started
+    transport.close()
+    return elapsed
+
+
+async def demo_framed_protocol_benchmark(count: int = 50_000, window: int = 64) -> None:
+    """示例 07：BufferedProtocol 帧协议 vs StreamReader 版本的回显基准。"""
+    print("\n\n== 高吞吐长度前缀协议（BufferedProtocol + 缓冲池）==\n")
+    loop = asyncio.get_running_loop()
+    pool = BufferPool()
+    servers: list[FrameProtocol] = []
+
+    def echo(protocol: FrameProtocol, frame: memoryview) -> None:
+        protocol.send(frame)
+
+    def framed_factory() -> FrameProtocol:
+        protocol = FrameProtocol(echo, pool=pool)
+        servers.append(protocol)
+        return protocol
+
+    variants = {
+        "StreamReader": await asyncio.start_server(_stream_echo_handler, "127.0.0.1", 0),
+        "BufferedProtocol": await loop.create_server(framed_factory, "127.0.0.1", 0),
+    }
+    def totals() -> tuple[int, int, int]:
+        return tuple(sum(p.stats[key] for p in servers) for key in ("frames_in", "flushes", "bytes_copied"))  # type: ignore[return-value]
+
+    try:
+        print(f"{'实现':<18}{'消息大小':>8}{'消息/秒':>12}{'帧/次写':>10}{'拷贝/帧':>11}")
+        for size in (64, 4096):
+            for name, server in variants.items():
+                port = server.sockets[0].getsockname()[1]
+                before = totals()
+                elapsed = await _run_echo_client(port, count, size, window)
+                if name == "StreamReader":
+                    # 没有插桩，按代码路径估算：write + drain 各一次；feed_data 拷进缓冲区、
+                    # readexactly 拷出、prefix + message 再拼一次
+                    per_write, copied = "1.0", f"~{3 * size:,}B*"
+                else:
+                    frames, flushes, copied_bytes = (after - b for after, b in zip(totals(), before))
+                    per_write, copied = f"{frames / max(flushes, 1):.1f}", f"{copied_bytes / max(frames, 1):,.0f}B"
+                print(f"{name:<18}{size:>7}B{count / elapsed:>12,.0f}{per_write:>10}{copied:>12}")
+        print("\n* StreamReader 的拷贝量是按代码路径估算的（未实测）；BufferedProtocol 的数据来自 stats 计数")
+        print(f"缓冲池：新建 {pool.created} 个接收缓冲区，复用 {pool.reused} 次")
+        print("回显必须把 memoryview 拷进发送批次；真正的业务处理在回调里直接解析 memoryview 可以做到零拷贝")
+    finally:
+        for server in variants.values():
+            server.close()
+            await server.wait_closed()
+
 
 # =============================================================================
 # 超时和取消
@@ -359,7 +654,7 @@ async def demo_length_prefix_protocol() -> None:
 
 
 async def demo_stream_timeout() -> None:
-    """示例 07：Stream超时和取消。"""
+    """示例 08：Stream超时和取消。"""
     print("\n\n== Stream 超时处理 ==\n")
 
     reader = asyncio.StreamReader()
@@ -416,6 +711,8 @@ async def main() -> None:
     demo_stream_timeout()
     await demo_stream_timeout()
 
+    await demo_framed_protocol_benchmark()
+
     print("\n" + "="*60)
     print("StreamReader/Writer API 速查")
     print("="*60)
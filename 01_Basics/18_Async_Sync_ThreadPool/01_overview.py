@@ -13,7 +13,7 @@ from pathlib import Path
 
 TOPICS: list[tuple[str, str]] = [
     ("02_threadpool_basics.py", "ThreadPoolExecutor 提交/结果/异常/超时/取消"),
-    ("03_cpu_vs_io_in_threadpool.py", "CPU 密集 vs I/O 模拟：线程池收益对比"),
+    ("03_cpu_vs_io_in_threadpool.py", "CPU 密集 vs I/O 模拟：线程池/进程池收益对比"),
     ("04_async_to_thread_basics.py", "async 中用 asyncio.to_thread 包装阻塞函数"),
     ("05_run_in_executor_legacy.py", "loop.run_in_executor（自建线程池）兼容旧代码"),
     ("06_limit_concurrency_with_semaphore.py", "Semaphore + to_thread 限制阻塞调用并发"),
@@ -22,6 +22,7 @@ TOPICS: list[tuple[str, str]] = [
     ("09_threadpool_logging_and_cleanup.py", "线程名日志，shutdown(cancel_futures) 行为与清理"),
     ("10_what_not_to_do.py", "反例：线程池里 asyncio.run、无限制任务堆积"),
     ("11_chapter_summary.py", "本章总结：规则清单与常见坑"),
+    ("12_hybrid_executor_bridge.py", "混合执行器：线程池/进程池自动路由、预热、限流、NumPy 共享内存传参"),
     ("Exercises/01_overview.py", "练习题索引（每题一个文件）"),
 ]
 
@@ -8,6 +8,7 @@ Author: Lambert
 from __future__ import annotations
 
 import concurrent.futures as cf
+import os
 import time
 from typing import Callable
 
@@ -35,6 +36,12 @@ def run_cpu_threadpool(workers: int = 4) -> None:
         list(executor.map(cpu_bound, [10_000_00] * workers))
 
 
+def run_cpu_processpool(workers: int = 4) -> None:
+    # 每个进程有自己的解释器和 GIL；多核机器上才能真正并行
+    with cf.ProcessPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(cpu_bound, [10_000_00] * workers))
+
+
 def run_io_threadpool(tasks: int = 10) -> None:
     with cf.ThreadPoolExecutor(max_workers=4) as executor:
         list(executor.map(io_like, [0.05] * tasks))
@@ -44,11 +51,13 @@ def main() -> None:
     print("== CPU 密集 ==")
     measure(cpu_bound, "单线程 CPU")
     measure(run_cpu_threadpool, "线程池 CPU（无明显收益）")
+    measure(run_cpu_processpool, f"进程池 CPU（{os.cpu_count()} 核，多核时可并行）")
 
     print("\n== I/O 模拟 ==")
     measure(lambda: [io_like() for _ in range(4)], "单线程 I/O")
     measure(run_io_threadpool, "线程池 I/O（可并发等待）")
     print("结论：线程池适合阻塞 I/O，不适合 CPU 密集求加速。")
+    print("按实测自动选择线程池/进程池的执行器见 12_hybrid_executor_bridge.py。")
 
 
 if __name__ == "__main__":
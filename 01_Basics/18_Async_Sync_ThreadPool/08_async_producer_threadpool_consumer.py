@@ -24,6 +24,8 @@ async def producer(q: asyncio.Queue[object]) -> None:
 
 
 def blocking_consume(item: int) -> str:
+    # 阻塞 I/O 适合线程池；若消费端是 CPU 密集计算，应改用进程池，
+    # 12_hybrid_executor_bridge.py 的 HybridExecutor 会按实测耗时自动选择
     time.sleep(0.1)
     return f"processed-{item}"
 
@@ -21,8 +21,8 @@ TOPICS: list[tuple[str, str]] = [
     ("08_ssl_wrapped_socket.py", "SSL wrapped sockets and HTTPS client"),
     ("09_selectors_basics.py", "selectors: I/O multiplexing"),
     ("10_socketserver_basics.py", "socketserver: TCP/UDP servers"),
-    ("11_socketserver_production.py", "socketserver: serve_forever/shutdown 优雅关闭"),
-    ("12_ssl_server_context.py", "SSL server context: HTTPS 服务器配置与证书管理"),
+    ("11_socketserver_production.py", "socketserver: 优雅关闭；pre-fork 多进程、滚动重启、共享内存统计"),
+    ("12_ssl_server_context.py", "SSL server context: HTTPS 服务器配置与证书管理（openssl 自签名证书 + 上下文构造函数）"),
     ("Exercises/01_overview.py", "Exercises index"),
 ]
 
@@ -12,22 +12,30 @@ Author: Lambert
 4. 自定义服务器类（重写关键方法）
 5. 信号处理和优雅关闭
 6. 服务器状态监控
+7. pre-fork 多进程服务器（SO_REUSEPORT / 共享监听 socket）、滚动重启、共享内存统计
 
 关键概念：
 - serve_forever() 会持续处理请求，直到调用 shutdown()
 - shutdown() 必须在单独的线程中调用（因为 serve_forever() 会阻塞）
 - shutdown() 会等待当前请求处理完成
 - 使用 ThreadingMixIn 实现并发处理
+- ThreadingMixIn 只用得上一个核：多进程 + 共享内存计数器才能用满所有核
 """
 
 from __future__ import annotations
 
+import bisect
+import http.server
+import json
+import multiprocessing
+import os
 import socketserver
 import socket
 import threading
 import time
 import signal
-from typing import ClassVar
+import urllib.request
+from typing import Any, ClassVar
 
 
 # =============================================================================
@@ -397,9 +405,11 @@ def demo_server_monitoring() -> None:
     class MonitoringHandler(socketserver.BaseRequestHandler):
         """处理器。"""
         active_connections: ClassVar[int] = 0
+        lock: ClassVar[threading.Lock] = threading.Lock()  # += 不是原子操作，多线程处理器要加锁
 
         def setup(self) -> None:
-            MonitoringHandler.active_connections += 1
+            with MonitoringHandler.lock:
+                MonitoringHandler.active_connections += 1
             print(f"[监控] 活跃连接: {MonitoringHandler.active_connections}")
             super().setup()
 
@@ -408,7 +418,8 @@ def demo_server_monitoring() -> None:
             time.sleep(0.5)  # 模拟处理
 
         def finish(self) -> None:
-            MonitoringHandler.active_connections -= 1
+            with MonitoringHandler.lock:
+                MonitoringHandler.active_connections -= 1
             print(f"[监控] 活跃连接: {MonitoringHandler.active_connections}")
             super().finish()
 
@@ -462,6 +473,386 @@ def demo_server_monitoring() -> None:
     server.server_close()
 
     print(f"\n[统计] 总请求: {server.requests_handled}")
+    print("[提示] 多进程下类属性计数器各进程各一份，跨进程统计见 demo_prefork_server 的 SharedStats")
+
+
+# =============================================================================
+# 多进程 pre-fork 服务器 + 共享内存统计
+# =============================================================================
+
+# 延迟直方图的桶上界（毫秒），最后一个桶兜底
+LATENCY_BUCKETS_MS: tuple[float, ...] = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, float("inf"))
+
+
+class SharedStats:
+    """共享内存计数器：每个 worker 独占一个槽位，只写自己的槽，master 读取时汇总。
+
+    槽位布局：[pid, state, active, requests, errors, hist_0 ... hist_n]。
+    数据放在 fork 前创建的 RawArray（共享内存）里，不需要跨进程锁；
+    同一 worker 内多个处理线程之间用进程内的 threading.Lock 互斥。
+    """
+
+    PID, STATE, ACTIVE, REQUESTS, ERRORS, HIST = range(6)
+    FIELDS = HIST + len(LATENCY_BUCKETS_MS)
+    FREE, STARTING, SERVING, DRAINING = range(4)
+    STATE_NAMES = ("free", "starting", "serving", "draining")
+
+    def __init__(self, slots: int, ctx: Any):
+        self.slots = slots
+        self.values = ctx.RawArray("q", slots * self.FIELDS)
+        self._lock = threading.Lock()
+
+    def get(self, slot: int, field: int) -> int:
+        return self.values[slot * self.FIELDS + field]
+
+    def set(self, slot: int, field: int, value: int) -> None:
+        self.values[slot * self.FIELDS + field] = value
+
+    def add(self, slot: int, field: int, delta: int = 1) -> None:
+        with self._lock:
+            self.values[slot * self.FIELDS + field] += delta
+
+    def observe(self, slot: int, seconds: float, failed: bool) -> None:
+        """记录一个请求结束：请求数、错误数、延迟直方图、活跃连接数"""
+        base = slot * self.FIELDS
+        bucket = bisect.bisect_left(LATENCY_BUCKETS_MS, seconds * 1000)
+        with self._lock:
+            self.values[base + self.ACTIVE] -= 1
+            self.values[base + self.REQUESTS] += 1
+            self.values[base + self.ERRORS] += failed
+            self.values[base + self.HIST + bucket] += 1
+
+    def free_slot(self) -> int:
+        for slot in range(self.slots):
+            if self.get(slot, self.STATE) == self.FREE:
+                return slot
+        raise RuntimeError("no free worker slot")
+
+    def snapshot(self) -> dict[str, Any]:
+        workers = []
+        histogram = [0] * len(LATENCY_BUCKETS_MS)
+        for slot in range(self.slots):
+            row = self.values[slot * self.FIELDS:(slot + 1) * self.FIELDS]
+            for i, count in enumerate(row[self.HIST:]):
+                histogram[i] += count
+            if row[self.STATE] != self.FREE:
+                workers.append({
+                    "slot": slot,
+                    "pid": row[self.PID],
+                    "state": self.STATE_NAMES[row[self.STATE]],
+                    "active": row[self.ACTIVE],
+                    "requests": row[self.REQUESTS],
+                })
+        # 退出的 worker 槽位会被复用，累计值留在槽位里，所以总数按所有槽位求和
+        totals = [sum(self.get(slot, field) for slot in range(self.slots)) for field in (self.ACTIVE, self.REQUESTS, self.ERRORS)]
+
+        def quantile(q: float) -> float | None:
+            target = q * sum(histogram)
+            seen = 0
+            for bound, count in zip(LATENCY_BUCKETS_MS, histogram):
+                seen += count
+                if count and seen >= target:
+                    return bound
+            return None
+
+        return {
+            "workers": workers,
+            "active": totals[0],
+            "requests": totals[1],
+            "errors": totals[2],
+            "latency_ms": {
+                "p50_le": quantile(0.5),
+                "p99_le": quantile(0.99),
+                "buckets": {f"le_{bound}": count for bound, count in zip(LATENCY_BUCKETS_MS, histogram) if count},
+            },
+        }
+
+
+class _InstrumentedThreadingServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    """worker 进程内的服务器：沿用已有的监听 socket，在每个请求前后更新共享计数器"""
+    daemon_threads: ClassVar[bool] = False  # server_close() 时等处理中的连接结束
+
+    def __init__(self, listener: socket.socket, handler_class: type, stats: SharedStats, slot: int):
+        super().__init__(listener.getsockname(), handler_class, bind_and_activate=False)
+        self.socket.close()
+        self.socket = listener
+        self.stats = stats
+        self.slot = slot
+
+    def process_request_thread(self, request: Any, client_address: Any) -> None:
+        self.stats.add(self.slot, SharedStats.ACTIVE)
+        started = time.perf_counter()
+        failed = False
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            failed = True
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self.stats.observe(self.slot, time.perf_counter() - started, failed)
+
+
+def _reuseport_socket(address: tuple[str, int]) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    sock.bind(address)
+    return sock
+
+
+def _prefork_worker(listener: socket.socket | None, address: tuple[str, int], handler_class: type,
+                    stats: SharedStats, slot: int, backlog: int) -> None:
+    """worker 进程入口：SIGTERM 触发优雅退出（停止 accept，等处理中的连接结束）"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Ctrl+C 交给 master 统一处理
+    own_listener = listener is None
+    if own_listener:
+        # SO_REUSEPORT：每个 worker 有自己的监听 socket 和 accept 队列，由内核分发连接
+        listener = _reuseport_socket(address)
+        listener.listen(backlog)
+    server = _InstrumentedThreadingServer(listener, handler_class, stats, slot)
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+
+    # serve_forever 放在线程里，主线程等信号后调用 shutdown()
+    stats.set(slot, SharedStats.ACTIVE, 0)
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.1})
+    thread.start()
+    stats.set(slot, SharedStats.PID, os.getpid())
+    stats.set(slot, SharedStats.STATE, SharedStats.SERVING)
+    while not stop.wait(0.5):
+        pass
+    stats.set(slot, SharedStats.STATE, SharedStats.DRAINING)
+    server.shutdown()
+    thread.join()
+    if own_listener:
+        # 关闭 SO_REUSEPORT 监听 socket 会丢弃它 accept 队列里已排队的连接，关之前先取空
+        # （Linux 5.14+ 可开启 net.ipv4.tcp_migrate_req，让内核把这些连接迁移给其他 worker）
+        listener.setblocking(False)
+        while True:
+            try:
+                request, client_address = listener.accept()
+            except (BlockingIOError, InterruptedError):
+                break
+            request.setblocking(True)
+            server.process_request(request, client_address)
+    server.server_close()  # 关闭监听 socket，并 join 所有处理线程
+
+
+class _StatsHandler(http.server.BaseHTTPRequestHandler):
+    """统计端点：GET /stats 返回 JSON"""
+
+    def do_GET(self) -> None:  # noqa: N802
+        if self.path != "/stats":
+            self.send_error(404)
+            return
+        body = json.dumps(self.server.prefork.stats.snapshot(), indent=2).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        return
+
+
+class PreforkServer:
+    """多进程 pre-fork 服务器：N 个 worker 进程运行同一个 socketserver 处理器。
+
+    - reuse_port=True（Linux/BSD）：每个 worker 用 SO_REUSEPORT 各自监听同一端口，
+      内核按连接哈希分发，避免多个进程抢同一个 accept 队列
+    - reuse_port=False：master 先 listen，再 fork，所有 worker 共享同一个监听 socket
+    - rolling_restart()：逐个先拉起新 worker 再让旧 worker 优雅退出，端口始终有人监听
+    - 计数器在共享内存里，stats_address 提供 HTTP 统计端点
+
+    依赖 fork，只支持 POSIX。
+    """
+
+    def __init__(
+        self,
+        server_address: tuple[str, int],
+        handler_class: type,
+        workers: int | None = None,
+        reuse_port: bool | None = None,
+        stats_address: tuple[str, int] | None = None,
+        backlog: int = 1024,
+    ):
+        self.ctx = multiprocessing.get_context("fork")
+        self.handler_class = handler_class
+        self.workers = workers or os.cpu_count() or 1
+        self.reuse_port = hasattr(socket, "SO_REUSEPORT") if reuse_port is None else reuse_port
+        self.backlog = backlog
+        # 滚动重启时新旧 worker 会短暂并存，所以槽位数是 worker 数的两倍
+        self.stats = SharedStats(self.workers * 2, self.ctx)
+        self._procs: dict[int, Any] = {}
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+
+        if self.reuse_port:
+            # 只 bind 不 listen：占住端口（port=0 时拿到实际端口），不参与连接分发
+            self._socket = _reuseport_socket(server_address)
+            self._listener = None
+        else:
+            self._socket = socket.create_server(server_address, backlog=backlog)
+            self._listener = self._socket
+        self.server_address = self._socket.getsockname()
+
+        self._stats_server = None
+        if stats_address is not None:
+            self._stats_server = http.server.ThreadingHTTPServer(stats_address, _StatsHandler)
+            self._stats_server.daemon_threads = True
+            self._stats_server.prefork = self
+            self.stats_address = self._stats_server.server_address
+
+    def start(self) -> None:
+        with self._lock:
+            for _ in range(self.workers):
+                self._spawn()
+        if self._stats_server is not None:
+            threading.Thread(target=self._stats_server.serve_forever, daemon=True).start()
+
+    def serve_forever(self, poll_interval: float = 0.5) -> None:
+        """监督 worker：异常退出的 worker 立即补一个，直到 shutdown()"""
+        while not self._stopping.wait(poll_interval):
+            with self._lock:
+                for slot, proc in list(self._procs.items()):
+                    if not proc.is_alive():
+                        print(f"[master] worker {proc.pid} 退出（exitcode={proc.exitcode}），重新拉起")
+                        self._release(slot)
+                        self._spawn()
+
+    def rolling_restart(self) -> None:
+        """逐个替换 worker：新 worker 就绪后再 SIGTERM 旧 worker"""
+        with self._lock:
+            for slot in list(self._procs):
+                self._spawn()
+                self._retire(slot)
+
+    def shutdown(self, timeout: float = 10.0) -> None:
+        self._stopping.set()
+        with self._lock:
+            for slot in list(self._procs):
+                self._retire(slot, timeout)
+        if self._stats_server is not None:
+            self._stats_server.shutdown()
+            self._stats_server.server_close()
+        self._socket.close()
+
+    def _spawn(self, timeout: float = 10.0) -> int:
+        slot = self.stats.free_slot()
+        self.stats.set(slot, SharedStats.STATE, SharedStats.STARTING)
+        proc = self.ctx.Process(
+            target=_prefork_worker,
+            args=(self._listener, self.server_address, self.handler_class, self.stats, slot, self.backlog),
+            daemon=True,
+        )
+        proc.start()
+        self._procs[slot] = proc
+        deadline = time.monotonic() + timeout
+        while self.stats.get(slot, SharedStats.STATE) != SharedStats.SERVING:
+            if not proc.is_alive() or time.monotonic() > deadline:
+                raise RuntimeError(f"worker in slot {slot} failed to start")
+            time.sleep(0.01)
+        return slot
+
+    def _retire(self, slot: int, timeout: float = 10.0) -> None:
+        proc = self._procs[slot]
+        proc.terminate()  # SIGTERM：worker 停止 accept 后等处理中的连接结束
+        proc.join(timeout)
+        if proc.is_alive():
+            proc.kill()
+            proc.join()
+        self._release(slot)
+
+    def _release(self, slot: int) -> None:
+        del self._procs[slot]
+        self.stats.set(slot, SharedStats.ACTIVE, 0)
+        self.stats.set(slot, SharedStats.STATE, SharedStats.FREE)
+
+
+class PreforkEchoHandler(socketserver.StreamRequestHandler):
+    """普通的行回显处理器：单进程和 pre-fork 模式下都原样使用"""
+
+    def handle(self) -> None:
+        for line in self.rfile:
+            self.wfile.write(line.upper())
+
+
+def _prefork_load(address: tuple[str, int], concurrency: int, stop: Any, results: Any) -> None:
+    """负载进程：concurrency 个线程不停地建连、发 5 行、收 5 行"""
+    counts = {"connections": 0, "errors": 0}
+    lock = threading.Lock()
+
+    def client_loop() -> None:
+        while not stop.is_set():
+            try:
+                with socket.create_connection(address, timeout=5) as sock:
+                    reader = sock.makefile("rb")
+                    for i in range(5):
+                        sock.sendall(f"ping {i}\n".encode())
+                        if reader.readline() != f"PING {i}\n".encode():
+                            raise ConnectionError("bad echo")
+                key = "connections"
+            except OSError:
+                key = "errors"
+            with lock:
+                counts[key] += 1
+
+    threads = [threading.Thread(target=client_loop) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    results.put((counts["connections"], counts["errors"]))
+
+
+def demo_prefork_server() -> None:
+    """示例 07：pre-fork 多进程服务器、滚动重启与共享内存统计。"""
+    print("\n\n== pre-fork 多进程服务器 ==\n")
+    if not hasattr(os, "fork"):
+        print("当前平台不支持 fork，跳过")
+        return
+
+    server = PreforkServer(("127.0.0.1", 0), PreforkEchoHandler, workers=4, stats_address=("127.0.0.1", 0))
+    server.start()
+    supervisor = threading.Thread(target=server.serve_forever, daemon=True)
+    supervisor.start()
+    mode = "SO_REUSEPORT" if server.reuse_port else "共享监听 socket"
+    print(f"[master] {server.workers} 个 worker（{mode}），服务 {server.server_address}，"
+          f"统计 http://{server.stats_address[0]}:{server.stats_address[1]}/stats")
+
+    def fetch_stats() -> dict[str, Any]:
+        with urllib.request.urlopen(f"http://{server.stats_address[0]}:{server.stats_address[1]}/stats", timeout=5) as resp:
+            return json.loads(resp.read())
+
+    # 负载放在单独的进程里：master 之后 fork 的 worker 不会继承客户端 socket
+    stop_load = server.ctx.Event()
+    results = server.ctx.Queue()
+    load = server.ctx.Process(target=_prefork_load, args=(server.server_address, 8, stop_load, results))
+    try:
+        load.start()
+        time.sleep(1.0)
+        before = fetch_stats()
+        print("[stats] 各 worker 处理的连接数:", {w["pid"]: w["requests"] for w in before["workers"]})
+
+        # 在持续负载下滚动重启
+        started = time.perf_counter()
+        server.rolling_restart()
+        print(f"[master] 滚动重启完成，耗时 {time.perf_counter() - started:.2f}s")
+        time.sleep(0.5)
+        stop_load.set()
+        connections, errors = results.get(timeout=30)
+        load.join()
+
+        after = fetch_stats()
+        print("[stats] 重启后的 worker:", {w["pid"]: w["state"] for w in after["workers"]})
+        print(f"[stats] 总连接 {after['requests']}，错误 {after['errors']}，活跃 {after['active']}，"
+              f"延迟 p50 <= {after['latency_ms']['p50_le']}ms，p99 <= {after['latency_ms']['p99_le']}ms")
+        print(f"[客户端] 完成 {connections} 个连接，失败 {errors} 次")
+    finally:
+        stop_load.set()
+        server.shutdown()
 
 
 # =============================================================================
@@ -470,7 +861,7 @@ def demo_server_monitoring() -> None:
 
 
 def demo_best_practices() -> None:
-    """示例 07：生产环境最佳实践。"""
+    """示例 08：生产环境最佳实践。"""
     print("\n\n== 生产环境最佳实践 ==\n")
 
     print("1. 使用 ThreadingMixIn 实现并发:")
@@ -498,6 +889,10 @@ def demo_best_practices() -> None:
     print("   def serve_forever(self, poll_interval=0.5):")
     print("       # 添加监控逻辑")
 
+    print("\n7. 用满多核：pre-fork 多进程，处理器不用改:")
+    print("   server = PreforkServer(addr, Handler, workers=os.cpu_count(), stats_address=...)")
+    print("   server.start(); server.serve_forever()  # 另一线程可 rolling_restart()/shutdown()")
+
 
 def main() -> None:
     """运行所有示例。"""
@@ -507,6 +902,7 @@ def main() -> None:
     demo_signal_handling()
     demo_custom_server_methods()
     demo_server_monitoring()
+    demo_prefork_server()
     demo_best_practices()
 
     print("\n" + "="*60)
@@ -23,8 +23,10 @@ Author: Lambert
 
 from __future__ import annotations
 
+import shutil
 import ssl
 import socket
+import subprocess
 import threading
 import time
 from pathlib import Path
@@ -90,6 +92,49 @@ def create_cert_files(temp_dir: Path) -> tuple[Path, Path]:
     return cert_file, key_file
 
 
+def create_openssl_cert_files(
+    temp_dir: Path, common_name: str = "localhost"
+) -> tuple[Path, Path] | None:
+    """调用 openssl 命令行生成可真正加载的自签名证书（本地演示/压测用）。
+
+    证书同时写入 ``DNS:<common_name>`` 与 ``IP:127.0.0.1`` 两个 SAN，
+    客户端把 cert.pem 当作 CA 即可完成校验。找不到 openssl 时返回 None。
+    """
+    openssl = shutil.which("openssl")
+    if openssl is None:
+        return None
+
+    temp_dir.mkdir(parents=True, exist_ok=True)
+    cert_file = temp_dir / "cert.pem"
+    key_file = temp_dir / "key.pem"
+    subprocess.run(
+        [
+            openssl, "req", "-x509", "-newkey", "rsa:2048", "-nodes",
+            "-keyout", str(key_file), "-out", str(cert_file), "-days", "1",
+            "-subj", f"/CN={common_name}",
+            "-addext", f"subjectAltName=DNS:{common_name},IP:127.0.0.1",
+        ],
+        check=True,
+        capture_output=True,
+    )
+    return cert_file, key_file
+
+
+def create_https_context(certfile: Path | str, keyfile: Path | str) -> ssl.SSLContext:
+    """创建 HTTPS 服务器上下文（与示例 09 中的模板一致）。"""
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    context.load_cert_chain(certfile=str(certfile), keyfile=str(keyfile))
+    context.minimum_version = ssl.TLSVersion.TLSv1_2
+    return context
+
+
+def create_client_context(cafile: Path | str) -> ssl.SSLContext:
+    """创建信任指定（自签名）证书的客户端上下文，仍然校验主机名。"""
+    context = ssl.create_default_context(cafile=str(cafile))
+    context.minimum_version = ssl.TLSVersion.TLSv1_2
+    return context
+
+
 # =============================================================================
 # SSLContext 基础
 # =============================================================================
@@ -17,7 +17,7 @@ TOPICS: list[tuple[str, str]] = [
     ("04_hash_password.py", "Compute sha256"),
     ("05_hmac_verify.py", "Verify HMAC"),
     ("06_https_client.py", "HTTPS client with SSL wrapped socket"),
-    ("07_selectors_server.py", "Echo server using selectors"),
+    ("07_selectors_server.py", "Reactor server: buffers, backpressure, framing, worker pool"),
     ("08_socketserver_handler.py", "TCP server using socketserver"),
 ]
 
@@ -1,113 +1,496 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 """
-Exercise 07: Echo server using selectors.
+Exercise 07: Reactor server using selectors.
 Author: Lambert
 
-Task: Create an echo server using the selectors module for I/O multiplexing.
+Task: Build a reusable event-loop (reactor) TCP server on top of selectors.
 
 Requirements:
-1. Use selectors.DefaultSelector()
-2. Register the listening socket for EVENT_READ
-3. Use select() to wait for events
-4. Handle new connections and data from existing connections
-5. Echo received data back to clients
+1. Use selectors.DefaultSelector() and non-blocking sockets only
+2. Keep a read buffer and a write buffer per connection
+3. Handle partial sends: queue the rest and wait for EVENT_WRITE
+4. Backpressure: stop reading from a client whose write buffer is too large
+5. Pluggable framing: line-delimited, length-prefixed, fixed-size
+6. Optional worker thread pool for CPU-heavy handlers (replies stay in order)
+7. Benchmark: hold 10k idle connections and measure loopback echo throughput
+
+Run:
+    python3 01_Basics/31_Network_Security/Exercises/07_selectors_server.py
+    python3 01_Basics/31_Network_Security/Exercises/07_selectors_server.py --bench
 """
 
 from __future__ import annotations
 
+import hashlib
+import itertools
+import multiprocessing
 import selectors
 import socket
+import struct
+import sys
 import threading
 import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable
 
 
-def run_selector_server() -> None:
-    """
-    Run an echo server using selectors.
-
-    The server should:
-    1. Create a listening socket on 127.0.0.1:19003
-    2. Register it with the selector
-    3. Use select() to wait for events
-    4. Accept new connections and register them
-    5. Echo data back to clients
+# =============================================================================
+# Framing
+# =============================================================================
+
+
+class FrameError(ValueError):
+    """Raised when a peer sends a frame the framer refuses to buffer."""
+
+
+class LineFramer:
+    """Frames separated by a delimiter (default: newline)."""
+
+    def __init__(self, delimiter: bytes = b"\n", max_length: int = 64 * 1024):
+        self.delimiter = delimiter
+        self.max_length = max_length
+        self._scanned = 0  # bytes already searched for the delimiter
+
+    def decode(self, buffer: bytearray) -> list[bytes]:
+        frames = []
+        start = 0
+        search_from = self._scanned
+        while (end := buffer.find(self.delimiter, search_from)) != -1:
+            frames.append(bytes(buffer[start:end]))
+            start = search_from = end + len(self.delimiter)
+        if start:
+            del buffer[:start]
+        if len(buffer) > self.max_length:
+            raise FrameError(f"line longer than {self.max_length} bytes")
+        # A partial delimiter may sit at the very end, so rescan its length next time
+        self._scanned = max(0, len(buffer) - len(self.delimiter) + 1)
+        return frames
+
+    def encode(self, payload: bytes) -> list[bytes]:
+        return [payload, self.delimiter]
+
+
+class LengthPrefixFramer:
+    """Frames prefixed with a 4-byte big-endian length."""
+
+    header = struct.Struct("!I")
+
+    def __init__(self, max_length: int = 16 * 1024 * 1024):
+        self.max_length = max_length
+
+    def decode(self, buffer: bytearray) -> list[bytes]:
+        frames = []
+        start = 0
+        size = self.header.size
+        while len(buffer) - start >= size:
+            (length,) = self.header.unpack_from(buffer, start)
+            if length > self.max_length:
+                raise FrameError(f"frame of {length} bytes exceeds {self.max_length}")
+            if len(buffer) - start - size < length:
+                break
+            frames.append(bytes(buffer[start + size:start + size + length]))
+            start += size + length
+        if start:
+            del buffer[:start]
+        return frames
+
+    def encode(self, payload: bytes) -> list[bytes]:
+        # Header and payload go out as two iovecs; the payload is never copied
+        return [self.header.pack(len(payload)), payload]
+
+
+class FixedFramer:
+    """Frames of exactly ``size`` bytes."""
+
+    def __init__(self, size: int):
+        self.size = size
+
+    def decode(self, buffer: bytearray) -> list[bytes]:
+        count = len(buffer) // self.size
+        frames = [bytes(buffer[i * self.size:(i + 1) * self.size]) for i in range(count)]
+        if count:
+            del buffer[:count * self.size]
+        return frames
+
+    def encode(self, payload: bytes) -> list[bytes]:
+        if len(payload) != self.size:
+            raise FrameError(f"fixed frame must be {self.size} bytes, got {len(payload)}")
+        return [payload]
+
+
+# =============================================================================
+# Reactor
+# =============================================================================
+
+
+class Connection:
+    """Per-client state owned by the event loop thread."""
+
+    __slots__ = ("sock", "addr", "framer", "inbuf", "outbuf", "out_bytes", "pending", "events", "closing", "closed")
+
+    def __init__(self, sock: socket.socket, addr: Any, framer: Any):
+        self.sock = sock
+        self.addr = addr
+        self.framer = framer
+        self.inbuf = bytearray()
+        self.outbuf: deque[bytes | memoryview] = deque()
+        self.out_bytes = 0
+        self.pending: deque[Future[bytes | None]] = deque()  # worker results, in request order
+        self.events = selectors.EVENT_READ
+        self.closing = False  # peer finished sending; close once replies are flushed
+        self.closed = False
+
+
+class ReactorServer:
+    """Single-threaded selectors event loop with per-connection buffers.
+
+    handler(payload) -> reply | None is called once per decoded frame. With
+    workers > 0 it runs in a thread pool and the loop is woken through a
+    socketpair when a result is ready; replies are still written in order.
     """
-    # TODO: Implement this function
-    # Hints:
-    # 1. sel = selectors.DefaultSelector()
-    # 2. sel.register(lsock, selectors.EVENT_READ, data=None)
-    # 3. events = sel.select(timeout=1.0)
-    # 4. for key, mask in events:
-    # 5.     if key.data is None: # New connection
-    # 6.     else: # Data from existing connection
-    sel = selectors.DefaultSelector()
-
-    # Create listening socket
-    lsock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    lsock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    lsock.bind(("127.0.0.1", 19003))
-    lsock.listen()
-    lsock.setblocking(False)
-
-    sel.register(lsock, selectors.EVENT_READ, data=None)
-    print("[服务器] 监听 127.0.0.1:19003")
-
-    connections = {}  # type: dict[socket, bytes]
-
-    start_time = time.time()
-    try:
-        while time.time() - start_time < 3:  # Run for 3 seconds
-            events = sel.select(timeout=0.5)
-            for key, mask in events:
-                if key.data is None:
-                    # New connection
-                    conn, addr = lsock.accept()
-                    conn.setblocking(False)
-                    connections[conn] = b""
-                    sel.register(conn, selectors.EVENT_READ, data=addr)
-                    print(f"[服务器] 新连接: {addr}")
+
+    def __init__(
+        self,
+        handler: Callable[[bytes], bytes | None],
+        host: str = "127.0.0.1",
+        port: int = 0,
+        framer_factory: Callable[[], Any] = LineFramer,
+        workers: int = 0,
+        backlog: int = 4096,
+        recv_size: int = 256 * 1024,
+        high_water: int = 4 * 1024 * 1024,
+        low_water: int = 1024 * 1024,
+        max_pending: int = 64,
+    ):
+        self.handler = handler
+        self.framer_factory = framer_factory
+        self.recv_size = recv_size
+        self.high_water = high_water
+        self.low_water = low_water
+        self.max_pending = max_pending
+        self.connections: dict[int, Connection] = {}
+        self.stats = {"accepted": 0, "frames": 0, "bytes_in": 0, "bytes_out": 0, "read_pauses": 0}
+
+        self.selector = selectors.DefaultSelector()
+        self.listener = socket.create_server((host, port), backlog=backlog)
+        self.listener.setblocking(False)
+        self.selector.register(self.listener, selectors.EVENT_READ, data=self._accept)
+        self.server_address = self.listener.getsockname()
+
+        # Self-pipe trick: worker threads and shutdown() wake the loop through this pair
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+        self.selector.register(self._wake_r, selectors.EVENT_READ, data=self._drain_wakeups)
+        self._ready: deque[Connection] = deque()
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix="reactor-worker") if workers else None
+        self._running = False
+        self._stopped = threading.Event()
+        self._stopped.set()
+
+    # ---- lifecycle ---------------------------------------------------------
+
+    def serve_forever(self, poll_interval: float = 0.5) -> None:
+        self._running = True
+        self._stopped.clear()
+        try:
+            while self._running:
+                for key, mask in self.selector.select(poll_interval):
+                    if callable(key.data):
+                        key.data()
+                        continue
+                    conn = key.data
+                    if conn.closed:
+                        continue  # closed earlier in this batch
+                    if mask & selectors.EVENT_READ:
+                        self._on_readable(conn)
+                    if mask & selectors.EVENT_WRITE and not conn.closed:
+                        self._flush(conn)
+        finally:
+            for conn in list(self.connections.values()):
+                self._close(conn)
+            self._stopped.set()
+
+    def shutdown(self) -> None:
+        """Stop serve_forever() from another thread and wait until it returns."""
+        self._running = False
+        self._wake()
+        self._stopped.wait()
+
+    def server_close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+        self.selector.close()
+        self.listener.close()
+        self._wake_r.close()
+        self._wake_w.close()
+
+    def __enter__(self) -> ReactorServer:
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.server_close()
+
+    # ---- event handlers ----------------------------------------------------
+
+    def _accept(self) -> None:
+        # Drain the accept queue in one go; bursts of connects are common
+        for _ in range(1024):
+            try:
+                sock, addr = self.listener.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                return  # e.g. EMFILE; try again on the next readiness event
+            sock.setblocking(False)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            conn = Connection(sock, addr, self.framer_factory())
+            self.connections[sock.fileno()] = conn
+            self.selector.register(sock, selectors.EVENT_READ, data=conn)
+            self.stats["accepted"] += 1
+
+    def _on_readable(self, conn: Connection) -> None:
+        try:
+            data = conn.sock.recv(self.recv_size)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError:
+            self._close(conn)
+            return
+        if not data:
+            # Half-close: stop reading but still deliver replies that are queued
+            conn.closing = True
+            self._flush(conn)
+            return
+        self.stats["bytes_in"] += len(data)
+        conn.inbuf += data
+        try:
+            frames = conn.framer.decode(conn.inbuf)
+        except FrameError:
+            self._close(conn)
+            return
+        self.stats["frames"] += len(frames)
+        for frame in frames:
+            self._dispatch(conn, frame)
+        # One flush for the whole batch: pipelined requests become one sendmsg()
+        self._flush(conn)
+
+    def _dispatch(self, conn: Connection, frame: bytes) -> None:
+        if self._executor is None:
+            reply = self.handler(frame)
+            if reply is not None:
+                self._queue_reply(conn, reply)
+            return
+        future = self._executor.submit(self.handler, frame)
+        conn.pending.append(future)
+        future.add_done_callback(lambda _, conn=conn: self._notify(conn))
+
+    def _queue_reply(self, conn: Connection, reply: bytes) -> None:
+        try:
+            buffers = conn.framer.encode(reply)
+        except FrameError:
+            self._close(conn)
+            return
+        for buf in buffers:
+            if buf:
+                conn.outbuf.append(buf)
+                conn.out_bytes += len(buf)
+
+    def _notify(self, conn: Connection) -> None:
+        # Runs in a worker thread: hand the connection back to the loop thread
+        self._ready.append(conn)
+        self._wake()
+
+    def _wake(self) -> None:
+        try:
+            self._wake_w.send(b"\0")
+        except (BlockingIOError, OSError):
+            pass  # Pipe full (the loop is waking anyway) or already closed
+
+    def _drain_wakeups(self) -> None:
+        try:
+            while self._wake_r.recv(4096):
+                pass
+        except (BlockingIOError, InterruptedError):
+            pass
+        while self._ready:
+            conn = self._ready.popleft()
+            if conn.closed:
+                continue
+            while conn.pending and conn.pending[0].done():
+                future = conn.pending.popleft()
+                try:
+                    reply = future.result()
+                except Exception:
+                    self._close(conn)
+                    break
+                if reply is not None:
+                    self._queue_reply(conn, reply)
+            if not conn.closed:
+                self._flush(conn)
+
+    def _flush(self, conn: Connection) -> None:
+        outbuf = conn.outbuf
+        while outbuf:
+            try:
+                # Scatter-gather write of up to 64 queued buffers in one syscall
+                sent = conn.sock.sendmsg(list(itertools.islice(outbuf, 64)))
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError:
+                self._close(conn)
+                return
+            self.stats["bytes_out"] += sent
+            conn.out_bytes -= sent
+            while sent:
+                head = outbuf[0]
+                if len(head) <= sent:
+                    sent -= len(head)
+                    outbuf.popleft()
                 else:
-                    # Data from existing connection
-                    sock = key.fileobj
-                    addr = key.data
-                    try:
-                        data = sock.recv(1024)
-                        if data:
-                            print(f"[服务器] 收到: {data.decode()}")
-                            sock.sendall(data)  # Echo back
-                        else:
-                            # Connection closed
-                            sel.unregister(sock)
-                            sock.close()
-                            del connections[sock]
-                    except OSError:
-                        sel.unregister(sock)
-                        sock.close()
-                        if sock in connections:
-                            del connections[sock]
-    finally:
-        sel.close()
-        lsock.close()
+                    # Partial send: keep the unsent tail as a view, no copy
+                    outbuf[0] = memoryview(head)[sent:]
+                    sent = 0
+        if conn.closing and not outbuf and not conn.pending:
+            self._close(conn)
+            return
+        self._update_interest(conn)
+
+    def _update_interest(self, conn: Connection) -> None:
+        reading = bool(conn.events & selectors.EVENT_READ)
+        # Hysteresis between high_water and low_water avoids flapping registrations
+        limit = self.high_water if reading else self.low_water
+        want_read = not conn.closing and conn.out_bytes <= limit and len(conn.pending) < self.max_pending
+        events = (selectors.EVENT_READ if want_read else 0) | (selectors.EVENT_WRITE if conn.outbuf else 0)
+        if events == conn.events:
+            return
+        if reading and not want_read and not conn.closing:
+            self.stats["read_pauses"] += 1
+        if not events:
+            # Only waiting on worker results: unregister, _notify() will flush it later
+            self.selector.unregister(conn.sock)
+        elif not conn.events:
+            self.selector.register(conn.sock, events, data=conn)
+        else:
+            self.selector.modify(conn.sock, events, data=conn)
+        conn.events = events
+
+    def _close(self, conn: Connection) -> None:
+        if conn.closed:
+            return
+        conn.closed = True
+        for future in conn.pending:
+            future.cancel()
+        conn.pending.clear()
+        self.connections.pop(conn.sock.fileno(), None)
+        if conn.events:
+            self.selector.unregister(conn.sock)
+        conn.sock.close()
+
+
+# =============================================================================
+# Exercise: echo server + tests
+# =============================================================================
+
+
+def run_selector_server(port: int = 19003, duration: float = 3.0) -> None:
+    """Run a line-based echo server on 127.0.0.1:port for ``duration`` seconds."""
+    with ReactorServer(lambda line: line, port=port) as server:
+        print(f"[服务器] 监听 127.0.0.1:{server.server_address[1]}")
+        timer = threading.Timer(duration, server.shutdown)
+        timer.daemon = True
+        timer.start()
+        server.serve_forever(poll_interval=0.1)
 
 
 def run_client(port: int = 19003) -> None:
     """Run test client."""
     time.sleep(0.3)
 
-    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
-        sock.connect(("127.0.0.1", port))
+    with socket.create_connection(("127.0.0.1", port)) as sock:
+        reader = sock.makefile("rb")
         messages = ["Hello selectors!", "Message 2", "Bye!"]
         for msg in messages:
-            sock.sendall(msg.encode())
-            response = sock.recv(1024)
+            sock.sendall(msg.encode() + b"\n")
+            response = reader.readline().rstrip(b"\n")
             print(f"[客户端] 收到: {response.decode()}")
             time.sleep(0.1)
 
 
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    data = bytearray()
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("peer closed")
+        data += chunk
+    return bytes(data)
+
+
+def check_framing_and_workers() -> None:
+    """Pipelined requests through a worker pool still get replies in order."""
+
+    def digest(payload: bytes) -> bytes:
+        # Larger payloads take longer, so results finish out of order
+        return hashlib.sha256(payload * (1 + len(payload) % 7 * 2000)).hexdigest().encode()
+
+    server = ReactorServer(digest, framer_factory=LengthPrefixFramer, workers=4)
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.1}, daemon=True)
+    thread.start()
+    try:
+        with socket.create_connection(server.server_address) as sock:
+            payloads = [f"request-{i}".encode() * (i % 5 + 1) for i in range(50)]
+            header = LengthPrefixFramer.header
+            sock.sendall(b"".join(header.pack(len(p)) + p for p in payloads))
+            for payload in payloads:
+                (length,) = header.unpack(_recv_exact(sock, header.size))
+                expected = digest(payload)
+                assert _recv_exact(sock, length) == expected, "reply out of order"
+        print("[TEST] 50 个流水线请求经线程池处理，回复顺序正确")
+
+        # Fixed-size frames split across arbitrary TCP segments
+        fixed = ReactorServer(lambda block: block[::-1], framer_factory=lambda: FixedFramer(8))
+        fixed_thread = threading.Thread(target=fixed.serve_forever, kwargs={"poll_interval": 0.1}, daemon=True)
+        fixed_thread.start()
+        with socket.create_connection(fixed.server_address) as sock:
+            for piece in (b"abc", b"defghABC", b"DEFGH"):
+                sock.sendall(piece)
+                time.sleep(0.01)
+            assert _recv_exact(sock, 16) == b"hgfedcbaHGFEDCBA"
+        fixed.shutdown()
+        fixed.server_close()
+        print("[TEST] 定长帧跨 TCP 分段拼接正确")
+
+        # Backpressure: a client that never reads makes the server stop reading from it
+        slow = ReactorServer(lambda payload: payload, framer_factory=LengthPrefixFramer,
+                             high_water=256 * 1024, low_water=64 * 1024)
+        slow_thread = threading.Thread(target=slow.serve_forever, kwargs={"poll_interval": 0.1}, daemon=True)
+        slow_thread.start()
+        with socket.create_connection(slow.server_address) as sock:
+            frame = LengthPrefixFramer.header.pack(64 * 1024) + b"z" * 64 * 1024
+            count = 200  # ~13 MB, far more than kernel buffers + high_water
+            sender = threading.Thread(target=sock.sendall, args=(frame * count,), daemon=True)
+            sender.start()
+            time.sleep(0.5)  # not reading yet: replies pile up on the server
+            paused = slow.stats["read_pauses"]
+            backlog = slow.connections and max(c.out_bytes for c in slow.connections.values())
+            assert _recv_exact(sock, len(frame) * count) == frame * count
+            sender.join()
+        slow.shutdown()
+        slow.server_close()
+        assert paused > 0, "server never paused reading"
+        print(f"[TEST] 背压：客户端不读时服务器暂停读取 {paused} 次，写缓冲区积压约 {backlog / 1024:.0f}KB，"
+              f"之后 {count} 帧全部回显")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
 def test() -> None:
     """Test selectors server."""
-    print("== Test Selectors Echo Server ==\n")
+    print("== Test Selectors Reactor Server ==\n")
 
     # Start server in thread
     server_thread = threading.Thread(target=run_selector_server, daemon=True)
@@ -119,8 +502,108 @@ def test() -> None:
     # Wait for server
     server_thread.join(timeout=4)
 
-    print("\n[TEST] OK" if True else "[TEST] FAIL")
+    check_framing_and_workers()
+    print("\n[TEST] OK")
+
+
+# =============================================================================
+# Benchmark: idle connections + echo throughput
+# =============================================================================
+
+
+def _raise_fd_limit() -> int:
+    try:
+        import resource
+    except ImportError:  # Windows
+        return 0
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hard != resource.RLIM_INFINITY and soft < hard:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+        soft = hard
+    return soft
+
+
+def _hold_idle_connections(address: tuple[str, int], count: int, ready: Any, stop: Any) -> None:
+    """Child process: open ``count`` connections and keep them idle until ``stop`` is set."""
+    _raise_fd_limit()
+    socks = []
+    try:
+        for _ in range(count):
+            socks.append(socket.create_connection(address))
+        ready.put(len(socks))
+    except OSError as exc:
+        ready.put(f"{len(socks)} ({exc})")
+    stop.wait()
+    for sock in socks:
+        sock.close()
+
+
+def _echo_client(address: tuple[str, int], frames: int, payload_size: int, depth: int, results: Any) -> None:
+    """Child process: pipeline length-prefixed frames and count echoed bytes."""
+    header = LengthPrefixFramer.header
+    frame = header.pack(payload_size) + b"x" * payload_size
+    with socket.create_connection(address) as sock:
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        buffer = bytearray(len(frame) * depth)
+        view = memoryview(buffer)
+        sent = received = 0
+        started = time.perf_counter()
+        while received < frames * len(frame):
+            # Keep up to ``depth`` frames in flight
+            burst = min(depth - (sent - received // len(frame)), frames - sent)
+            if burst > 0:
+                sock.sendall(frame * burst)
+                sent += burst
+            received += sock.recv_into(view)
+        results.put((received, time.perf_counter() - started))
+
+
+def benchmark(idle: int = 10_000, clients: int = 4, frames: int = 4000, payload_size: int = 64 * 1024, depth: int = 8) -> None:
+    """Hold ``idle`` idle connections, then measure echo throughput alongside them."""
+    print("\n== Reactor Benchmark ==\n")
+    limit = _raise_fd_limit()
+    if limit and idle + 64 > limit:
+        idle = max(0, limit - 64)
+        print(f"文件描述符上限 {limit}，空闲连接数调整为 {idle}")
+
+    server = ReactorServer(lambda payload: payload, framer_factory=LengthPrefixFramer)
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.1}, daemon=True)
+    thread.start()
+    ctx = multiprocessing.get_context()
+    stop = ctx.Event()
+    ready = ctx.Queue()
+    holder = ctx.Process(target=_hold_idle_connections, args=(server.server_address, idle, ready, stop), daemon=True)
+    try:
+        started = time.perf_counter()
+        holder.start()
+        opened = ready.get(timeout=120)
+        while len(server.connections) < idle and time.perf_counter() - started < 60:
+            time.sleep(0.05)
+        print(f"空闲连接: 客户端打开 {opened}，服务器持有 {len(server.connections)}，"
+              f"耗时 {time.perf_counter() - started:.2f}s（单进程单线程）")
+
+        results = ctx.Queue()
+        workers = [ctx.Process(target=_echo_client, args=(server.server_address, frames, payload_size, depth, results))
+                   for _ in range(clients)]
+        started = time.perf_counter()
+        for proc in workers:
+            proc.start()
+        total = sum(results.get(timeout=300)[0] for _ in workers)
+        elapsed = time.perf_counter() - started
+        for proc in workers:
+            proc.join()
+        print(f"回显吞吐: {clients} 个客户端 x {frames} 帧 x {payload_size // 1024}KB，"
+              f"{total / 1e6 / elapsed:.0f} MB/s（每方向），{clients * frames / elapsed:.0f} 帧/s")
+        print(f"统计: {server.stats}")
+    finally:
+        stop.set()
+        holder.join(timeout=30)
+        server.shutdown()
+        server.server_close()
 
 
 if __name__ == "__main__":
-    test()
+    if "--bench" in sys.argv:
+        benchmark()
+    else:
+        test()
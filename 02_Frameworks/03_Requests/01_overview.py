@@ -23,10 +23,10 @@ TOPICS: list[tuple[str, str]] = [
     ("08_raise_for_status.py", "raise_for_status 与状态码"),
     ("09_session_and_cookies.py", "Session 复用与 Cookie"),
     ("10_redirects_and_history.py", "重定向与 history"),
-    ("11_streaming_download.py", "流式下载与 iter_content"),
+    ("11_streaming_download.py", "流式下载与 RangeDownloader（分段并行/续传/校验）"),
     ("12_upload_files_multipart.py", "文件上传 multipart"),
     ("13_basic_auth.py", "Basic Auth 示例"),
-    ("14_retries_and_adapter.py", "连接池与重试策略"),
+    ("14_retries_and_adapter.py", "连接池与重试策略（full jitter 退避、按 host 重试预算与熔断器）"),
     ("15_chapter_summary.py", "基础章节总结"),
     # 进阶内容 (16-28)
     ("16_http_methods.py", "HTTP 方法完整演示：PUT/PATCH/DELETE/HEAD/OPTIONS"),
@@ -34,13 +34,13 @@ TOPICS: list[tuple[str, str]] = [
     ("18_ssl_verification.py", "SSL/TLS 证书验证控制、客户端证书"),
     ("19_auth_extended.py", "扩展认证：Digest Auth、Bearer Token、API Key"),
     ("20_event_hooks.py", "事件钩子：请求/响应生命周期监听"),
-    ("21_connection_pool.py", "连接池配置与性能优化"),
+    ("21_connection_pool.py", "连接池配置与 InstrumentedAdapter 遥测/自动调优"),
     ("22_raw_request_body.py", "原始请求体与自定义 Content-Type"),
     ("23_url_encoding.py", "URL 编码与解码、特殊字符处理"),
     ("24_cookiejar_and_persistence.py", "Cookie 持久化与文件保存"),
     ("25_response_raw_stream.py", "Response.raw 底层流访问"),
     ("26_dns_and_connection_reuse.py", "DNS 缓存与连接复用原理"),
-    ("27_asyncio_integration.py", "在 AsyncIO 中使用 requests"),
+    ("27_asyncio_integration.py", "在 AsyncIO 中使用 requests（有界线程池 + 线程专属 Session）"),
     ("28_advanced_summary.py", "进阶内容总结"),
     ("Exercises/01_overview.py", "练习索引"),
 ]
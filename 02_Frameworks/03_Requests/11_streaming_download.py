@@ -4,16 +4,362 @@
 示例 11：流式下载与 iter_content。
 Author: Lambert
 
+要点：
+- stream=True + iter_content：边下边处理，不把整个响应读进内存
+- 大文件下载引擎 RangeDownloader：
+  - readinto 读进复用的缓冲区（或直接读进 mmap 映射的目标文件），不产生临时 bytes
+  - 目标文件预先分配好大小，每个分段直接写到自己的偏移量
+  - 服务端支持 Range 时按分段并行下载，多个线程共享 Session 的连接池
+  - 断点续传：已完成分段记录在 <文件名>.part.json，ETag/大小不变时跳过
+  - 边下边算 SHA-256：按文件顺序推进“已哈希前沿”，内存占用与文件大小无关
+
 运行：
     python3 02_Frameworks/03_Requests/11_streaming_download.py
 """
 
 from __future__ import annotations
 
+import hashlib
+import http.client
+import json
+import mmap
+import os
+import queue
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+
 import requests
+from requests.adapters import HTTPAdapter
 
 
-def main() -> None:
+@dataclass
+class DownloadResult:
+    path: Path
+    size: int
+    sha256: str
+    segments: int
+    resumed_bytes: int  # 续传时跳过的字节数
+    elapsed: float
+
+    @property
+    def throughput_mb_s(self) -> float:
+        return (self.size - self.resumed_bytes) / 1e6 / self.elapsed if self.elapsed else 0.0
+
+
+def _body_reader(resp: requests.Response) -> Any:
+    """返回可以 readinto 的响应体读取对象
+
+    公开接口是 resp.raw.readinto（urllib3 HTTPResponse），但它内部是 read() 后再拷贝。
+    响应没有压缩、且 urllib3 的私有属性 _fp 确实是 http.client.HTTPResponse 时，
+    直接用它的 readinto，数据从 socket 直接落进我们的缓冲区。
+    _fp 不是公开 API：urllib3 改名或换实现时这里自动回退到 raw.readinto，
+    结果不变，只是多一次拷贝。
+    """
+    raw = resp.raw
+    encoding = resp.headers.get("Content-Encoding", "identity").lower()
+    fp = getattr(raw, "_fp", None)
+    if encoding == "identity" and isinstance(fp, http.client.HTTPResponse):
+        return fp
+    return raw
+
+
+class RangeDownloader:
+    """分段并行 + 断点续传 + 边下边校验的下载引擎"""
+
+    def __init__(
+        self,
+        session: requests.Session | None = None,
+        workers: int = 4,
+        segment_size: int = 8 * 1024 * 1024,
+        buffer_size: int = 1024 * 1024,
+        use_mmap: bool = False,
+        timeout: float = 30.0,
+    ):
+        self.workers = workers
+        self.segment_size = segment_size
+        self.buffer_size = buffer_size
+        self.use_mmap = use_mmap
+        self.timeout = timeout
+        if session is None:
+            # 连接池至少容纳所有 worker，分段之间复用连接而不是每段重新握手；
+            # 调用方传入的 Session 保持原样（重试、认证、连接池都是调用方的配置）
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max(10, workers))
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+        self.session = session
+
+    def probe(self, url: str) -> tuple[int | None, bool, str | None]:
+        """HEAD 探测：(文件大小, 是否支持 Range, ETag)"""
+        resp = self.session.head(url, timeout=self.timeout, allow_redirects=True)
+        resp.raise_for_status()
+        length = resp.headers.get("Content-Length")
+        accepts_ranges = resp.headers.get("Accept-Ranges", "").lower() == "bytes"
+        return (int(length) if length else None), accepts_ranges, resp.headers.get("ETag")
+
+    def download(self, url: str, dest: Path, expected_sha256: str | None = None) -> DownloadResult:
+        started = time.perf_counter()
+        size, accepts_ranges, etag = self.probe(url)
+        if size is None or not accepts_ranges:
+            result = self._download_single(url, dest, started)
+        else:
+            result = self._download_ranges(url, dest, size, etag, started)
+        if expected_sha256 and result.sha256 != expected_sha256:
+            raise ValueError(f"sha256 mismatch for {dest}: {result.sha256} != {expected_sha256}")
+        return result
+
+    # 单流下载（服务端不支持 Range 时）
+    def _download_single(self, url: str, dest: Path, started: float) -> DownloadResult:
+        hasher = hashlib.sha256()
+        buffer = bytearray(self.buffer_size)
+        view = memoryview(buffer)
+        total = 0
+        headers = {"Accept-Encoding": "identity"}
+        with self.session.get(url, stream=True, timeout=self.timeout, headers=headers) as resp, dest.open("wb") as f:
+            resp.raise_for_status()
+            reader = _body_reader(resp)
+            while n := reader.readinto(view):
+                hasher.update(view[:n])
+                f.write(view[:n])
+                total += n
+        return DownloadResult(dest, total, hasher.hexdigest(), 1, 0, time.perf_counter() - started)
+
+    # 分段并行下载
+    def _download_ranges(self, url: str, dest: Path, size: int, etag: str | None, started: float) -> DownloadResult:
+        segment_count = max(1, -(-size // self.segment_size))
+        state_path = dest.with_name(dest.name + ".part.json")
+        done = self._load_state(state_path, dest, size, etag)
+        resumed_bytes = sum(self._segment_bounds(i, size)[1] - self._segment_bounds(i, size)[0] for i in done)
+
+        # 预分配目标文件（续传时保留已有内容）
+        with dest.open("r+b" if dest.exists() else "wb") as f:
+            f.truncate(size)
+
+        todo: queue.SimpleQueue[int] = queue.SimpleQueue()
+        for index in range(segment_count):
+            if index not in done:
+                todo.put(index)
+        # 分段编号 = 完成，异常 = 失败，None = worker 退出
+        completed: queue.SimpleQueue[int | BaseException | None] = queue.SimpleQueue()
+        state_lock = threading.Lock()
+        finished = set(done)  # worker 会往 done 里加分段，主线程用启动前的快照
+
+        def worker() -> None:
+            # 无缓冲 FileIO：write 直接进 page cache，分段标记完成时主线程一定能读到
+            with dest.open("r+b", buffering=0) as f:
+                mm = mmap.mmap(f.fileno(), size) if self.use_mmap and size else None
+                buffer = None if mm else memoryview(bytearray(self.buffer_size))
+                try:
+                    while True:
+                        try:
+                            index = todo.get_nowait()
+                        except queue.Empty:
+                            return
+                        self._fetch_segment(url, etag, index, size, f, mm, buffer)
+                        with state_lock:
+                            done.add(index)
+                            self._save_state(state_path, size, etag, done)
+                        completed.put(index)
+                except BaseException as exc:
+                    completed.put(exc)
+                finally:
+                    if mm is not None:
+                        mm.close()
+                    completed.put(None)
+
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(min(self.workers, todo.qsize()))]
+        for thread in threads:
+            thread.start()
+
+        # 主线程负责哈希：按文件顺序推进前沿，哈希的是刚写进 page cache 的数据
+        hasher = hashlib.sha256()
+        frontier = 0
+        error: BaseException | None = None
+        with dest.open("rb", buffering=0) as f:
+            hash_buffer = memoryview(bytearray(self.buffer_size))
+            frontier = self._hash_frontier(f, hasher, hash_buffer, frontier, finished, size)
+            running = len(threads)
+            while running:
+                item = completed.get()
+                if item is None:
+                    running -= 1
+                elif isinstance(item, BaseException):
+                    error = error or item
+                else:
+                    finished.add(item)
+                    frontier = self._hash_frontier(f, hasher, hash_buffer, frontier, finished, size)
+        for thread in threads:
+            thread.join()
+        if error is not None:
+            raise error
+        if frontier != size:
+            raise RuntimeError(f"download incomplete: hashed {frontier} of {size} bytes")
+
+        state_path.unlink(missing_ok=True)
+        return DownloadResult(dest, size, hasher.hexdigest(), segment_count, resumed_bytes, time.perf_counter() - started)
+
+    def _segment_bounds(self, index: int, size: int) -> tuple[int, int]:
+        start = index * self.segment_size
+        return start, min(size, start + self.segment_size)
+
+    def _fetch_segment(self, url: str, etag: str | None, index: int, size: int, f: Any, mm: mmap.mmap | None, buffer: memoryview | None) -> None:
+        start, end = self._segment_bounds(index, size)
+        headers = {"Range": f"bytes={start}-{end - 1}", "Accept-Encoding": "identity"}
+        if etag:
+            headers["If-Range"] = etag  # 文件变了服务端会回 200 全量，下面会当作错误
+        with self.session.get(url, headers=headers, stream=True, timeout=self.timeout) as resp:
+            if resp.status_code != 206:
+                raise RuntimeError(f"expected 206 for segment {index}, got {resp.status_code}")
+            reader = _body_reader(resp)
+            offset = start
+            if mm is not None:
+                target = memoryview(mm)
+                try:
+                    while offset < end:
+                        # 直接读进文件映射，没有任何中间缓冲区
+                        n = reader.readinto(target[offset:min(end, offset + self.buffer_size)])
+                        if not n:
+                            raise ConnectionError(f"segment {index} truncated at {offset}")
+                        offset += n
+                finally:
+                    target.release()
+            else:
+                f.seek(start)
+                while offset < end:
+                    n = reader.readinto(buffer[: min(len(buffer), end - offset)])
+                    if not n:
+                        raise ConnectionError(f"segment {index} truncated at {offset}")
+                    written = 0
+                    while written < n:
+                        written += f.write(buffer[written:n])
+                    offset += n
+            # 已按 Content-Length 读完：把连接还给连接池，供下一个分段复用
+            resp.raw.release_conn()
+
+    def _hash_frontier(self, f: Any, hasher: Any, buffer: memoryview, frontier: int, finished: set[int], size: int) -> int:
+        while frontier < size and frontier // self.segment_size in finished:
+            _, end = self._segment_bounds(frontier // self.segment_size, size)
+            f.seek(frontier)
+            while frontier < end:
+                n = f.readinto(buffer[: min(len(buffer), end - frontier)])
+                hasher.update(buffer[:n])
+                frontier += n
+        return frontier
+
+    def _load_state(self, state_path: Path, dest: Path, size: int, etag: str | None) -> set[int]:
+        if not (state_path.exists() and dest.exists()):
+            return set()
+        state = json.loads(state_path.read_text(encoding="utf-8"))
+        if state.get("size") != size or state.get("etag") != etag or state.get("segment_size") != self.segment_size:
+            return set()  # 远端文件变了，续传数据作废
+        return set(state.get("done", []))
+
+    def _save_state(self, state_path: Path, size: int, etag: str | None, done: set[int]) -> None:
+        tmp = state_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({"size": size, "etag": etag, "segment_size": self.segment_size, "done": sorted(done)}), encoding="utf-8")
+        os.replace(tmp, state_path)
+
+
+class _RangeFileHandler(BaseHTTPRequestHandler):
+    """本地文件服务：支持 HEAD、Range（单区间）与 ETag；fail_after 模拟中途断线"""
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    file_path: Path
+    fail_after: int | None = None  # 处理这么多个 GET 后开始断开连接
+    gets = 0
+    _lock = threading.Lock()
+
+    def _etag(self) -> str:
+        stat = self.file_path.stat()
+        return f'"{stat.st_size:x}-{int(stat.st_mtime):x}"'
+
+    def do_HEAD(self) -> None:  # noqa: N802
+        self.send_response(200)
+        self.send_header("Content-Length", str(self.file_path.stat().st_size))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", self._etag())
+        self.end_headers()
+
+    def do_GET(self) -> None:  # noqa: N802
+        with self._lock:
+            type(self).gets += 1
+            failing = self.fail_after is not None and self.gets > self.fail_after
+        if failing:
+            self.close_connection = True
+            return
+        size = self.file_path.stat().st_size
+        start, end = 0, size - 1
+        range_header = self.headers.get("Range")
+        if range_header and self.headers.get("If-Range", self._etag()) == self._etag():
+            first, _, last = range_header.removeprefix("bytes=").partition("-")
+            start, end = int(first), int(last) if last else size - 1
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", self._etag())
+        self.end_headers()
+        with self.file_path.open("rb") as f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining:
+                chunk = f.read(min(remaining, 1024 * 1024))
+                self.wfile.write(chunk)
+                remaining -= len(chunk)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        return
+
+
+def demo_range_download() -> None:
+    """本地服务上演示：并行分段 / mmap / 断点续传 / 校验"""
+    print("\n=== RangeDownloader（本地服务）===")
+    workdir = Path(tempfile.mkdtemp(prefix="range-download-"))
+    source = workdir / "artifact.bin"
+    with source.open("wb") as f:
+        for _ in range(64):
+            f.write(os.urandom(1024 * 1024))
+    expected = hashlib.sha256(source.read_bytes()).hexdigest()
+
+    _RangeFileHandler.file_path = source
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _RangeFileHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/artifact.bin"
+
+    try:
+        for use_mmap in (False, True):
+            dest = workdir / f"download-{'mmap' if use_mmap else 'file'}.bin"
+            result = RangeDownloader(workers=4, segment_size=4 * 1024 * 1024, use_mmap=use_mmap).download(url, dest, expected)
+            print(f"{'mmap' if use_mmap else 'write'}: {result.size / 1e6:.0f} MB, {result.segments} 段, "
+                  f"{result.throughput_mb_s:.0f} MB/s, sha256 OK")
+
+        # 断点续传：服务端处理 5 个分段后开始断线，第二次运行只下载剩余分段
+        dest = workdir / "download-resume.bin"
+        _RangeFileHandler.gets, _RangeFileHandler.fail_after = 0, 5
+        try:
+            RangeDownloader(workers=2, segment_size=4 * 1024 * 1024).download(url, dest)
+        except (requests.RequestException, ConnectionError, RuntimeError) as exc:
+            print(f"第一次下载中断: {type(exc).__name__}")
+        _RangeFileHandler.fail_after = None
+        result = RangeDownloader(workers=4, segment_size=4 * 1024 * 1024).download(url, dest, expected)
+        print(f"续传完成: 跳过 {result.resumed_bytes / 1e6:.0f} MB，sha256 OK")
+    finally:
+        server.shutdown()
+        server.server_close()
+        for path in workdir.iterdir():
+            path.unlink()
+        workdir.rmdir()
+
+
+def demo_iter_content() -> None:
     with requests.get("https://httpbin.org/stream/5", stream=True, timeout=5) as resp:
         print("状态码 ->", resp.status_code)
         chunks: list[bytes] = []
@@ -27,5 +373,10 @@ def main() -> None:
         print("合并后总长度 ->", len(joined))
 
 
+def main() -> None:
+    demo_range_download()
+    demo_iter_content()
+
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
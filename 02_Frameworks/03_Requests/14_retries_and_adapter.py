@@ -4,21 +4,341 @@
 示例 14：HTTPAdapter + Retry（简单重试策略）。
 Author: Lambert
 
+要点：
+- urllib3 的 Retry：固定次数 + 指数退避，简单但在上游“半瘫痪”时会放大流量
+  （每个请求都重试 3 次 = 上游负载变成 4 倍）
+- AdaptiveRetryAdapter：自定义传输适配器
+  - full jitter 退避：sleep = random(0, min(cap, base * 2**attempt))，避免整批客户端同步重试
+  - 按 host 的令牌桶重试预算：每个请求存入 ratio 个令牌，每次重试消耗 1 个，
+    重试量被限制在流量的一定比例之内
+  - 按 host 的熔断器：closed -> open（快速失败）-> half-open（放少量探测请求）-> closed
+  - metrics()：每个 host 的熔断状态、请求/重试次数、重试比例
+
 运行：
     python3 02_Frameworks/03_Requests/14_retries_and_adapter.py
 """
 
 from __future__ import annotations
 
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from enum import Enum
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+from unittest import mock
+from urllib.parse import urlsplit
+
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
 
-def main() -> None:
+class CircuitOpenError(requests.ConnectionError):
+    """熔断器打开时快速失败，不发请求"""
+
+
+class BreakerState(Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+
+class RetryBudget:
+    """令牌桶重试预算：重试次数 <= ratio * 请求数 + 初始余量"""
+
+    def __init__(self, ratio: float = 0.1, min_tokens: float = 10.0, max_tokens: float = 100.0):
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self.tokens = min_tokens
+
+    def deposit(self) -> None:
+        self.tokens = min(self.max_tokens, self.tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+
+class CircuitBreaker:
+    """连续失败 failure_threshold 次打开；reset_timeout 秒后半开，探测成功则关闭"""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 10.0, half_open_max_calls: int = 1):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.state = BreakerState.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.half_open_calls = 0
+
+    def allow(self) -> bool:
+        if self.state is BreakerState.OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self.state = BreakerState.HALF_OPEN
+            self.half_open_calls = 0
+        if self.state is BreakerState.HALF_OPEN:
+            if self.half_open_calls >= self.half_open_max_calls:
+                return False
+            self.half_open_calls += 1
+        return True
+
+    def record(self, success: bool) -> None:
+        if success:
+            self.state = BreakerState.CLOSED
+            self.failures = 0
+            return
+        self.failures += 1
+        if self.state is BreakerState.HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = BreakerState.OPEN
+            self.opened_at = time.monotonic()
+
+
+@dataclass
+class HostStats:
+    """单个 host 的重试/熔断状态与计数"""
+    budget: RetryBudget
+    breaker: CircuitBreaker
+    requests: int = 0  # 调用方发起的请求数
+    attempts: int = 0  # 实际发到上游的次数（含重试）
+    retries: int = 0
+    budget_exhausted: int = 0  # 想重试但预算不足的次数
+    short_circuited: int = 0  # 熔断打开时被直接拒绝的次数
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+
+class AdaptiveRetryAdapter(HTTPAdapter):
+    """full jitter 退避 + 按 host 的重试预算 + 按 host 的熔断器"""
+
+    RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+    IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE", "TRACE"})
+
+    def __init__(
+        self,
+        max_retries: int = 3,
+        backoff_base: float = 0.1,
+        backoff_cap: float = 5.0,
+        retry_ratio: float = 0.1,
+        retry_min_tokens: float = 10.0,
+        failure_threshold: int = 5,
+        reset_timeout: float = 10.0,
+        **kwargs: Any,
+    ):
+        # 底层不再让 urllib3 重试，所有重试决策都在 send() 里做
+        super().__init__(max_retries=0, **kwargs)
+        self.retry_limit = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.retry_ratio = retry_ratio
+        self.retry_min_tokens = retry_min_tokens
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._hosts: dict[str, HostStats] = {}
+        self._hosts_lock = threading.Lock()
+
+    def _host(self, url: str) -> HostStats:
+        host = urlsplit(url).netloc
+        with self._hosts_lock:
+            stats = self._hosts.get(host)
+            if stats is None:
+                stats = self._hosts[host] = HostStats(
+                    budget=RetryBudget(self.retry_ratio, self.retry_min_tokens),
+                    breaker=CircuitBreaker(self.failure_threshold, self.reset_timeout),
+                )
+            return stats
+
+    def backoff(self, attempt: int, retry_after: str | None = None) -> float:
+        """full jitter；服务端给了 Retry-After（秒）时取两者较大值，但不超过 cap"""
+        delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * 2**attempt))
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, float(retry_after))
+        return min(delay, self.backoff_cap)
+
+    def send(self, request: requests.PreparedRequest, **kwargs: Any) -> requests.Response:
+        stats = self._host(request.url)
+        with stats.lock:
+            stats.requests += 1
+            stats.budget.deposit()
+        retryable_method = request.method in self.IDEMPOTENT_METHODS
+
+        attempt = 0
+        response: requests.Response | None = None
+        error: Exception | None = None
+        while True:
+            with stats.lock:
+                allowed = stats.breaker.allow()
+                if not allowed:
+                    stats.short_circuited += 1
+                else:
+                    stats.attempts += 1
+            if not allowed:
+                # 重试途中熔断器打开：返回上一次的真实结果，而不是熔断异常
+                if error is not None:
+                    raise error
+                if response is not None:
+                    return response
+                raise CircuitOpenError(f"circuit open for {urlsplit(request.url).netloc}", request=request)
+
+            response, error = None, None
+            try:
+                response = super().send(request, **kwargs)
+                failed = response.status_code in self.RETRY_STATUSES
+            except (requests.ConnectionError, requests.Timeout) as exc:
+                error, failed = exc, True
+            except BaseException:
+                # 其余异常（ChunkedEncodingError、SSLError、ContentDecodingError…）不重试，
+                # 但必须记一次失败：否则 HALF_OPEN 的试探名额不会归还，该主机会被永久熔断
+                with stats.lock:
+                    stats.breaker.record(success=False)
+                raise
+
+            with stats.lock:
+                stats.breaker.record(success=not failed)
+                can_retry = failed and retryable_method and attempt < self.retry_limit
+                if can_retry and not stats.budget.try_spend():
+                    stats.budget_exhausted += 1
+                    can_retry = False
+                if can_retry:
+                    stats.retries += 1
+
+            if not can_retry:
+                if error is not None:
+                    raise error
+                return response
+
+            retry_after = None
+            if response is not None:
+                retry_after = response.headers.get("Retry-After")
+                # 先读完响应体再释放连接：万一后续重试被熔断拦下，还能把这次的响应返回给调用方
+                response.content
+                response.close()
+            time.sleep(self.backoff(attempt, retry_after))
+            attempt += 1
+
+    def metrics(self) -> dict[str, dict[str, Any]]:
+        """每个 host 的熔断状态与重试比例（retry_ratio = 重试次数 / 请求数）"""
+        result = {}
+        with self._hosts_lock:
+            hosts = dict(self._hosts)
+        for host, stats in hosts.items():
+            with stats.lock:
+                result[host] = {
+                    "breaker_state": stats.breaker.state.value,
+                    "requests": stats.requests,
+                    "attempts": stats.attempts,
+                    "retries": stats.retries,
+                    "retry_ratio": stats.retries / stats.requests if stats.requests else 0.0,
+                    "budget_tokens": round(stats.budget.tokens, 2),
+                    "budget_exhausted": stats.budget_exhausted,
+                    "short_circuited": stats.short_circuited,
+                }
+        return result
+
+
+class _BrownoutHandler(BaseHTTPRequestHandler):
+    """本地服务：failure_rate 比例的请求返回 503，统计上游实际收到的请求数"""
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True  # 头和 body 分两次写，开着 Nagle 会叠加 delayed ACK 的 40ms 延迟
+    failure_rate = 0.0
+    received = 0
+    _lock = threading.Lock()
+
+    def do_GET(self) -> None:  # noqa: N802
+        with self._lock:
+            type(self).received += 1
+        status = 503 if random.random() < self.failure_rate else 200
+        self.send_response(status)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def log_message(self, format: str, *args: Any) -> None:
+        return
+
+
+def demo_brownout() -> None:
+    """上游部分/全部返回 503 时，对比固定 Retry 与自适应适配器对上游的放大倍数"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _BrownoutHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/api"
+    count = 200
+
+    def run(session: requests.Session) -> tuple[int, int]:
+        _BrownoutHandler.received = 0
+        failed_fast = 0
+        for _ in range(count):
+            try:
+                session.get(url, timeout=5)
+            except CircuitOpenError:
+                failed_fast += 1
+            except requests.RequestException:
+                pass
+        return _BrownoutHandler.received, failed_fast
+
+    fixed = requests.Session()
+    fixed.mount("http://", HTTPAdapter(max_retries=Retry(total=3, backoff_factor=0, status_forcelist=[503], raise_on_status=False)))
+
+    # 1) 一半请求失败：重试预算把重试量压在约 10% 的流量
+    _BrownoutHandler.failure_rate = 0.5
+    received, _ = run(fixed)
+    print(f"[50% 503] 固定 Retry(total=3)：{count} 个请求 -> 上游收到 {received} 次（放大 {received / count:.2f}x）")
+    budget_only = AdaptiveRetryAdapter(max_retries=3, backoff_base=0.001, backoff_cap=0.01, failure_threshold=10**6)
+    session = requests.Session()
+    session.mount("http://", budget_only)
+    received, _ = run(session)
+    print(f"[50% 503] 重试预算：{count} 个请求 -> 上游收到 {received} 次（放大 {received / count:.2f}x）")
+
+    # 2) 全部失败：熔断器打开后快速失败，上游几乎不再收到请求
+    _BrownoutHandler.failure_rate = 1.0
+    received, _ = run(fixed)
+    print(f"[100% 503] 固定 Retry(total=3)：{count} 个请求 -> 上游收到 {received} 次（放大 {received / count:.2f}x）")
+    adapter = AdaptiveRetryAdapter(max_retries=3, backoff_base=0.001, backoff_cap=0.01, reset_timeout=0.2)
+    adaptive = requests.Session()
+    adaptive.mount("http://", adapter)
+    received, failed_fast = run(adaptive)
+    print(f"[100% 503] 预算 + 熔断：{count} 个请求 -> 上游收到 {received} 次（放大 {received / count:.2f}x），"
+          f"快速失败 {failed_fast} 次")
+
+    # 上游恢复：等过 reset_timeout 后半开探测成功，熔断器关闭
+    _BrownoutHandler.failure_rate = 0.0
+    time.sleep(0.25)
+    adaptive.get(url, timeout=5)
+    for host, metrics in adapter.metrics().items():
+        print(f"  {host}: {metrics}")
+
+    # 3) 半开探测抛出非连接类异常（这里模拟 ChunkedEncodingError）也要记为失败，
+    #    否则试探名额一直被占着，上游恢复后该主机仍被永久熔断
+    _BrownoutHandler.failure_rate = 1.0
+    probe = requests.Session()
+    probe.mount("http://", AdaptiveRetryAdapter(max_retries=0, failure_threshold=1, reset_timeout=0.05))
+    probe.get(url, timeout=5)  # 503 -> 熔断打开
+    time.sleep(0.06)
+    with mock.patch.object(HTTPAdapter, "send", side_effect=requests.exceptions.ChunkedEncodingError("boom")):
+        try:
+            probe.get(url, timeout=5)
+        except requests.exceptions.ChunkedEncodingError:
+            pass
+        else:
+            raise AssertionError("half-open probe should have raised")
+    _BrownoutHandler.failure_rate = 0.0
+    time.sleep(0.06)
+    assert probe.get(url, timeout=5).status_code == 200
+    print("[OK] 半开探测异常后熔断器仍能恢复")
+
+    server.shutdown()
+    server.server_close()
+
+
+def demo_urllib3_retry() -> None:
     retry = Retry(
         total=2,
         backoff_factor=0.2,
+        backoff_jitter=0.2,  # urllib3 2.x：在退避时间上叠加随机抖动
         status_forcelist=[500, 502, 503, 504],
         allowed_methods=["GET", "POST"],
     )
@@ -38,5 +358,10 @@ def main() -> None:
         print("未找到 retries 对象（可能 urllib3 版本差异）")
 
 
+def main() -> None:
+    demo_brownout()
+    demo_urllib3_retry()
+
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -10,6 +10,8 @@ Author: Lambert
 - pool_maxsize：每个连接池最大连接数
 - max_retries：最大重试次数
 - 连接复用可以显著提升性能
+- InstrumentedAdapter：按 host 记录连接池遥测（检出次数、等待时间、新建/复用、DNS/建连/TLS 耗时）
+- autotune=True 时根据等待时间与空闲情况自动扩缩 pool_maxsize
 
 运行：
     python3 02_Frameworks/03_Requests/21_connection_pool.py
@@ -17,12 +19,300 @@ Author: Lambert
 
 from __future__ import annotations
 
+import socket
+import threading
 import time
+from collections import deque
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
 import requests
-from requests.adapters import HTTPAdapter
+from requests.adapters import DEFAULT_POOLBLOCK, HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.exceptions import NewConnectionError
 from urllib3.util.retry import Retry
 
 
+# ============================================================================
+# 连接池遥测
+# ============================================================================
+
+def _percentile(samples: Any, q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+@dataclass
+class PoolStats:
+    """单个 host 连接池的遥测数据"""
+    host: str
+    maxsize: int
+    checkouts: int = 0
+    reused: int = 0  # 检出时拿到的是已建立的连接
+    new_connections: int = 0  # 真正发起 TCP 连接的次数（含断线重连）
+    overflow: int = 0  # 并发使用数超过 maxsize 时的检出（只有 pool_block=False 会出现）
+    discarded: int = 0  # 归还时池已满、被直接关闭的连接
+    in_use: int = 0
+    waits: deque[float] = field(default_factory=lambda: deque(maxlen=2048))
+    dns: deque[float] = field(default_factory=lambda: deque(maxlen=256))
+    connect: deque[float] = field(default_factory=lambda: deque(maxlen=256))
+    tls: deque[float] = field(default_factory=lambda: deque(maxlen=256))
+    resizes: list[tuple[int, int, str]] = field(default_factory=list)  # (旧大小, 新大小, 原因)
+    # 当前调优窗口
+    window_started: float = field(default_factory=time.monotonic)
+    window_waits: list[float] = field(default_factory=list)
+    window_overflow: int = 0
+    window_peak: int = 0
+    idle_windows: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, kind: str, seconds: float) -> None:
+        with self.lock:
+            getattr(self, kind).append(seconds)
+
+
+class _TimedConnectionMixin:
+    """分别计时 DNS 解析、TCP 建连和 TLS 握手"""
+    telemetry: PoolStats | None = None
+    _socket_seconds = 0.0
+
+    def _new_conn(self) -> socket.socket:
+        stats = self.telemetry
+        if stats is None:
+            return super()._new_conn()  # type: ignore[misc]
+        started = time.perf_counter()
+        try:
+            infos = socket.getaddrinfo(self._dns_host, self.port, type=socket.SOCK_STREAM)  # type: ignore[attr-defined]
+        except OSError:
+            infos = []  # 解析失败交给 urllib3 抛出它自己的 NameResolutionError
+        resolved = time.perf_counter()
+        original = self._dns_host  # type: ignore[attr-defined]
+        if infos:
+            self._dns_host = infos[0][4][0]  # 用解析好的地址建连，避免重复解析
+        try:
+            sock = super()._new_conn()  # type: ignore[misc]
+        except NewConnectionError:
+            if self._dns_host == original:
+                raise
+            self._dns_host = original  # 第一个地址连不上：交回 urllib3 逐个尝试全部地址
+            sock = super()._new_conn()  # type: ignore[misc]
+        finally:
+            self._dns_host = original
+        connected = time.perf_counter()
+        stats.record("dns", resolved - started)
+        stats.record("connect", connected - resolved)
+        self._socket_seconds = connected - started
+        return sock
+
+    def connect(self) -> None:
+        started = time.perf_counter()
+        super().connect()  # type: ignore[misc]
+        if self.telemetry is not None and isinstance(self, HTTPSConnection):
+            self.telemetry.record("tls", time.perf_counter() - started - self._socket_seconds)
+
+
+class _TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+
+class _TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    pass
+
+
+class _InstrumentedPoolMixin:
+    """在 urllib3 连接池的检出/归还处埋点"""
+    telemetry: PoolStats | None = None
+    adapter: InstrumentedAdapter | None = None
+
+    def _new_conn(self) -> Any:
+        conn = super()._new_conn()  # type: ignore[misc]
+        conn.telemetry = self.telemetry
+        return conn
+
+    def _get_conn(self, timeout: float | None = None) -> Any:
+        started = time.perf_counter()
+        conn = super()._get_conn(timeout)  # type: ignore[misc]
+        waited = time.perf_counter() - started
+        stats = self.telemetry
+        if stats is not None:
+            with stats.lock:
+                stats.checkouts += 1
+                stats.in_use += 1
+                stats.window_peak = max(stats.window_peak, stats.in_use)
+                stats.waits.append(waited)
+                stats.window_waits.append(waited)
+                if conn.sock is not None:
+                    stats.reused += 1
+                else:
+                    stats.new_connections += 1
+                if stats.in_use > self.pool.maxsize:  # type: ignore[attr-defined]
+                    stats.overflow += 1
+                    stats.window_overflow += 1
+            if self.adapter is not None:
+                self.adapter._maybe_tune(self)
+        return conn
+
+    def _put_conn(self, conn: Any) -> None:
+        stats = self.telemetry
+        if stats is not None:
+            full = self.pool is not None and self.pool.full()  # type: ignore[attr-defined]
+            with stats.lock:
+                stats.in_use = max(0, stats.in_use - 1)
+                if full and conn is not None:
+                    stats.discarded += 1
+        super()._put_conn(conn)  # type: ignore[misc]
+
+
+class _InstrumentedHTTPPool(_InstrumentedPoolMixin, HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+
+class _InstrumentedHTTPSPool(_InstrumentedPoolMixin, HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+
+def _resize_pool(pool: Any, size: int) -> int:
+    """在线调整 urllib3 连接池容量，返回实际生效的大小
+
+    池内部是一个预先塞满 None 占位符的 LifoQueue：扩容时在栈底补占位符；
+    缩容只能拿掉当前空闲的条目（栈底是最久没用的），正在使用的连接归还后照常入池。
+    """
+    q = pool.pool
+    dropped = []
+    with q.mutex:
+        if size > q.maxsize:
+            extra = size - q.maxsize
+            q.queue[:0] = [None] * extra
+            q.maxsize = size
+            q.not_empty.notify(extra)  # 唤醒 pool_block=True 时正在等连接的线程
+        else:
+            removable = min(q.maxsize - size, len(q.queue))
+            dropped = q.queue[:removable]
+            del q.queue[:removable]
+            q.maxsize -= removable
+        actual = q.maxsize
+    for conn in dropped:
+        if conn is not None:
+            conn.close()
+    return actual
+
+
+class InstrumentedAdapter(HTTPAdapter):
+    """按 host 采集连接池遥测；autotune=True 时自动调整每个 host 的 pool_maxsize
+
+    扩容：调优窗口内出现 overflow（pool_block=False），或连接全部被占用且等待时间 p95
+    超过 wait_threshold（pool_block=True），容量翻倍。
+    缩容：连续 idle_windows 个窗口的并发峰值不到容量一半，容量减半（不低于 min_size）。
+    """
+
+    def __init__(
+        self,
+        autotune: bool = False,
+        min_size: int = 2,
+        max_size: int = 64,
+        wait_threshold: float = 0.005,
+        tune_interval: float = 1.0,
+        idle_windows: int = 3,
+        **kwargs: Any,
+    ):
+        self.autotune = autotune
+        self.min_size = min_size
+        self.max_size = max_size
+        self.wait_threshold = wait_threshold
+        self.tune_interval = tune_interval
+        self.idle_windows = idle_windows
+        self._stats: dict[str, PoolStats] = {}
+        self._stats_lock = threading.Lock()
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, connections: int, maxsize: int, block: bool = DEFAULT_POOLBLOCK, **pool_kwargs: Any) -> None:
+        super().init_poolmanager(connections, maxsize, block=block, **pool_kwargs)
+        self.poolmanager.pool_classes_by_scheme = {"http": _InstrumentedHTTPPool, "https": _InstrumentedHTTPSPool}
+
+    def get_connection_with_tls_context(self, *args: Any, **kwargs: Any) -> Any:
+        pool = super().get_connection_with_tls_context(*args, **kwargs)
+        if isinstance(pool, _InstrumentedPoolMixin) and pool.telemetry is None:
+            with self._stats_lock:
+                if pool.telemetry is None:
+                    key = f"{pool.scheme}://{pool.host}:{pool.port}"  # type: ignore[attr-defined]
+                    stats = self._stats.get(key)
+                    if stats is None:
+                        stats = self._stats[key] = PoolStats(key, pool.pool.maxsize)  # type: ignore[attr-defined]
+                    elif stats.maxsize != pool.pool.maxsize:  # type: ignore[attr-defined]
+                        # 池被 PoolManager 淘汰后重建：沿用之前调出来的大小
+                        _resize_pool(pool, stats.maxsize)
+                    for conn in pool.pool.queue:  # type: ignore[attr-defined]
+                        if conn is not None:
+                            conn.telemetry = stats
+                    pool.adapter = self
+                    pool.telemetry = stats
+        return pool
+
+    def _maybe_tune(self, pool: Any) -> None:
+        stats: PoolStats = pool.telemetry
+        now = time.monotonic()
+        with stats.lock:
+            if now - stats.window_started < self.tune_interval:
+                return
+            p95 = _percentile(stats.window_waits, 0.95)
+            overflow, peak = stats.window_overflow, stats.window_peak
+            stats.window_started = now
+            stats.window_waits = []
+            stats.window_overflow = 0
+            stats.window_peak = stats.in_use
+            if not self.autotune:
+                return
+            size = stats.maxsize
+            target, reason = size, ""
+            # 并发峰值没到容量时的等待是线程调度抖动，不是池不够用
+            if (overflow or (p95 > self.wait_threshold and peak >= size)) and size < self.max_size:
+                target = min(self.max_size, size * 2)
+                reason = f"overflow={overflow}" if overflow else f"wait_p95={p95 * 1000:.1f}ms"
+                stats.idle_windows = 0
+            elif peak * 2 <= size and size > self.min_size:
+                stats.idle_windows += 1
+                if stats.idle_windows >= self.idle_windows:
+                    target = max(self.min_size, size // 2, peak)
+                    reason = f"peak_in_use={peak}"
+                    stats.idle_windows = 0
+            else:
+                stats.idle_windows = 0
+            if target == size:
+                return
+            actual = _resize_pool(pool, target)
+            stats.resizes.append((size, actual, reason))
+            stats.maxsize = actual
+
+    def metrics(self) -> dict[str, dict[str, Any]]:
+        """每个 host 的连接池遥测（耗时单位 ms）"""
+        result = {}
+        with self._stats_lock:
+            hosts = dict(self._stats)
+        for host, stats in hosts.items():
+            with stats.lock:
+                result[host] = {
+                    "pool_maxsize": stats.maxsize,
+                    "in_use": stats.in_use,
+                    "checkouts": stats.checkouts,
+                    "reused": stats.reused,
+                    "new_connections": stats.new_connections,
+                    "reuse_ratio": round(stats.reused / stats.checkouts, 3) if stats.checkouts else 0.0,
+                    "overflow": stats.overflow,
+                    "discarded": stats.discarded,
+                    "wait_p50_ms": round(_percentile(stats.waits, 0.5) * 1000, 3),
+                    "wait_p95_ms": round(_percentile(stats.waits, 0.95) * 1000, 3),
+                    "dns_p50_ms": round(_percentile(stats.dns, 0.5) * 1000, 3),
+                    "connect_p50_ms": round(_percentile(stats.connect, 0.5) * 1000, 3),
+                    "tls_p50_ms": round(_percentile(stats.tls, 0.5) * 1000, 3),
+                    "resizes": list(stats.resizes),
+                }
+        return result
+
+
 def demo_default_pool() -> None:
     """演示默认连接池配置"""
     print("=== 默认连接池配置 ===")
@@ -82,30 +372,76 @@ def demo_connection_reuse() -> None:
     print(f"性能提升: {speedup:.2f}x")
 
 
-def demo_pool_exhaustion() -> None:
-    """演示连接池耗尽场景"""
-    import concurrent.futures
+class _SlowHandler(BaseHTTPRequestHandler):
+    """本地服务：每个请求耗时 delay 秒，模拟慢接口"""
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    delay = 0.02
 
-    print("\n=== 连接池并发测试 ===")
+    def do_GET(self) -> None:  # noqa: N802
+        time.sleep(self.delay)
+        body = b'{"ok": true}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
 
-    def make_request(idx: int) -> tuple[int, int]:
-        try:
-            resp = requests.get("https://httpbin.org/delay/1", timeout=10)
-            return (idx, resp.status_code)
-        except Exception as e:
-            return (idx, -1)
+    def log_message(self, format: str, *args: Any) -> None:
+        return
 
-    # 使用默认连接池（可能有限制）
-    start = time.time()
-    with concurrent.futures.ThreadPoolExecutor(max_workers=20) as executor:
-        futures = [executor.submit(make_request, i) for i in range(20)]
-        results = [f.result() for f in concurrent.futures.as_completed(futures)]
-    elapsed = time.time() - start
 
-    success = sum(1 for _, code in results if code == 200)
-    print(f"并发请求数: 20")
-    print(f"成功: {success}, 失败: {20 - success}")
-    print(f"总耗时: {elapsed:.3f}s")
+def demo_pool_exhaustion() -> None:
+    """演示连接池耗尽：用 InstrumentedAdapter 把“等连接”和“连接被丢弃”量化出来"""
+    import concurrent.futures
+    import logging
+
+    print("\n=== 连接池耗尽与自动调优（本地服务）===")
+    logging.getLogger("urllib3.connectionpool").setLevel(logging.ERROR)  # 屏蔽 pool is full 警告刷屏
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _SlowHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/slow"
+
+    def run(adapter: InstrumentedAdapter, threads: int, requests_per_thread: int) -> float:
+        session = requests.Session()
+        session.mount("http://", adapter)
+
+        def worker(_: int) -> None:
+            for _ in range(requests_per_thread):
+                session.get(url, timeout=10).content
+
+        start = time.perf_counter()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(worker, range(threads)))
+        return time.perf_counter() - start
+
+    def report(label: str, adapter: InstrumentedAdapter, elapsed: float) -> None:
+        for metrics in adapter.metrics().values():
+            print(f"{label}: {elapsed:.2f}s, pool_maxsize={metrics['pool_maxsize']}, "
+                  f"新建连接 {metrics['new_connections']}, 复用率 {metrics['reuse_ratio']:.0%}, "
+                  f"overflow {metrics['overflow']}, 丢弃 {metrics['discarded']}, 等待 p95 {metrics['wait_p95_ms']:.1f}ms, "
+                  f"DNS p50 {metrics['dns_p50_ms']:.2f}ms, 建连 p50 {metrics['connect_p50_ms']:.2f}ms")
+            for old, new, reason in metrics["resizes"]:
+                print(f"    调整 {old} -> {new}（{reason}）")
+
+    try:
+        # 1) 默认 pool_block=False：池满后每次都新建连接、用完丢弃，复用率很低
+        adapter = InstrumentedAdapter(pool_maxsize=2)
+        report("16 线程, maxsize=2, block=False", adapter, run(adapter, 16, 10))
+
+        # 2) pool_block=True：连接数封顶，代价变成排队等连接
+        adapter = InstrumentedAdapter(pool_maxsize=2, pool_block=True)
+        report("16 线程, maxsize=2, block=True ", adapter, run(adapter, 16, 10))
+
+        # 3) 自动调优：等待变长就扩容，之后低并发阶段空闲就缩容
+        adapter = InstrumentedAdapter(pool_maxsize=2, pool_block=True, autotune=True, tune_interval=0.1, idle_windows=2)
+        elapsed = run(adapter, 16, 20)
+        elapsed += run(adapter, 1, 40)
+        report("autotune（16 线程 -> 1 线程）    ", adapter, elapsed)
+    finally:
+        server.shutdown()
+        server.server_close()
 
 
 def demo_adapter_for_specific_host() -> None:
@@ -131,8 +467,12 @@ def demo_retry_with_backoff() -> None:
     retry_strategy = Retry(
         total=3,  # 最多重试 3 次
         backoff_factor=0.5,  # 指数退避：0.5s, 1s, 2s
+        backoff_jitter=0.5,  # 再叠加 0~0.5s 随机抖动，避免大量客户端同一时刻重试
+        backoff_max=10,  # 单次退避上限
         status_forcelist=[429, 500, 502, 503, 504],
-        allowed_methods=["HEAD", "GET", "OPTIONS", "POST"],
+        # POST 不是幂等的：盲目重试可能重复下单，这里只重试幂等方法
+        allowed_methods=["HEAD", "GET", "OPTIONS"],
+        respect_retry_after_header=True,  # 429/503 带 Retry-After 时按服务端要求等待
     )
 
     adapter = HTTPAdapter(max_retries=retry_strategy)
@@ -140,9 +480,11 @@ def demo_retry_with_backoff() -> None:
     session.mount("https://", adapter)
 
     print(f"总重试次数: {retry_strategy.total}")
-    print(f"退避因子: {retry_strategy.backoff_factor}")
+    print(f"退避因子: {retry_strategy.backoff_factor}（抖动 {retry_strategy.backoff_jitter}s，上限 {retry_strategy.backoff_max}s）")
     print(f"重试状态码: {retry_strategy.status_forcelist}")
     print(f"允许重试的方法: {retry_strategy.allowed_methods}")
+    print("注意：固定次数的重试在上游故障时会把负载放大到 (1 + total) 倍；")
+    print("      按 host 的重试预算与熔断器见 14_retries_and_adapter.py 的 AdaptiveRetryAdapter")
 
 
 def main() -> None:
@@ -156,7 +498,7 @@ def main() -> None:
 
     print("\n使用建议:")
     print("  - 默认连接池已足够大多数场景")
-    print("  - 高并发场景可增大 pool_maxsize")
+    print("  - 高并发场景可增大 pool_maxsize；不确定多大时先用 InstrumentedAdapter 看遥测")
     print("  - 务必使用 Session 以复用连接")
     print("  - 不同主机可配置不同的连接池大小")
 
@@ -87,15 +87,20 @@ def demo_raw_readinto() -> None:
     """演示 readinto() 方法（读取到缓冲区）"""
     print("\n=== raw.readinto() 读取到缓冲区 ===")
 
-    # 预分配缓冲区
-    buffer = bytearray(100)
+    # 预分配缓冲区，整个下载过程反复使用同一块内存
+    buffer = bytearray(64 * 1024)
+    view = memoryview(buffer)
 
-    with requests.get("https://httpbin.org/get", stream=True, timeout=5) as resp:
-        # 读取到 buffer
-        n = resp.raw.readinto(buffer)
+    with requests.get("https://httpbin.org/bytes/200000", stream=True, timeout=5) as resp:
+        total = 0
+        reads = 0
+        while n := resp.raw.readinto(view):
+            # view[:n] 只是切片视图，不复制数据；写文件/算哈希都可以直接用
+            total += n
+            reads += 1
 
-        print(f"实际读取字节数: {n}")
-        print(f"缓冲区内容: {bytes(buffer[:n])}")
+        print(f"读取 {reads} 次，共 {total} 字节，缓冲区大小 {len(buffer)}")
+    print("大文件的分段并行 + mmap + 断点续传见 11_streaming_download.py 的 RangeDownloader")
 
 
 def demo_raw_stream_to_file() -> None:
@@ -198,7 +203,7 @@ def main() -> None:
     print("  - raw 直接访问底层流，需要处理压缩/编码问题")
     print("  - 零拷贝写入文件使用 shutil.copyfileobj(resp.raw, file)")
     print("  - read1() 适合非阻塞/异步场景")
-    print("  - readinto() 适合预分配缓冲区场景")
+    print("  - readinto() 适合预分配缓冲区场景（复用同一块 memoryview）")
 
 
 if __name__ == "__main__":
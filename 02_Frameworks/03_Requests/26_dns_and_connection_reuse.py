@@ -10,6 +10,7 @@ Author: Lambert
 - DNS 解析在首次请求时进行
 - 连接复用显著提升性能
 - 长连接 vs 短连接
+- 读取 PoolManager 里每个 host 连接池的请求数、新建连接数与空闲连接
 
 运行：
     python3 02_Frameworks/03_Requests/26_dns_and_connection_reuse.py
@@ -17,7 +18,11 @@ Author: Lambert
 
 from __future__ import annotations
 
+import threading
 import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
 import requests
 
 
@@ -69,21 +74,54 @@ def demo_dns_caching() -> None:
     print(f"后续请求 (复用连接): {second_elapsed:.3f}s")
 
 
+class _EchoHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_GET(self) -> None:  # noqa: N802
+        body = self.path.encode()
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        return
+
+
 def demo_connection_pool_state() -> None:
-    """演示连接池状态"""
+    """演示连接池状态：直接读 urllib3 连接池的内部计数"""
     print("\n=== 连接池状态 ===")
 
-    session = requests.Session()
-
-    # 查看默认连接池配置
-    print("默认连接池:")
-    print(f"  HTTPAdapter 数量: {len(session.adapters)}")
+    servers = []
+    for _ in range(2):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), _EchoHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
 
-    # 访问底层连接池（内部实现）
-    for key, adapter in session.adapters.items():
-        print(f"\nAdapter for {key}:")
-        print(f"  pool_connections: {adapter.pool_connections}")
-        print(f"  pool_maxsize: {adapter.pool_maxsize}")
+    session = requests.Session()
+    adapter = session.get_adapter("http://")
+    print(f"pool_connections={adapter._pool_connections}（最多缓存几个 host 的池）, "
+          f"pool_maxsize={adapter._pool_maxsize}（每个池最多保留几个空闲连接）")
+
+    try:
+        for index, server in enumerate(servers):
+            for i in range(3 + index * 2):
+                session.get(f"http://127.0.0.1:{server.server_address[1]}/item/{i}", timeout=5)
+
+        # PoolManager 为每个 (scheme, host, port) 建一个 HTTPConnectionPool
+        for key in adapter.poolmanager.pools.keys():
+            pool = adapter.poolmanager.pools[key]
+            idle = sum(conn is not None and conn.sock is not None for conn in pool.pool.queue)
+            print(f"  {pool.scheme}://{pool.host}:{pool.port} -> 请求 {pool.num_requests} 次, "
+                  f"新建连接 {pool.num_connections} 个, 空闲可复用 {idle} 个")
+        print("按 host 统计等待时间、DNS/建连耗时并自动调整 pool_maxsize 见 21_connection_pool.py 的 InstrumentedAdapter")
+    finally:
+        session.close()
+        for server in servers:
+            server.shutdown()
+            server.server_close()
 
 
 def demo_keep_alive() -> None:
@@ -12,8 +12,11 @@ Author: Lambert
 - 对比：同步 vs 异步的性能差异
 
 注意：
-- 对于真正的异步 HTTP，建议使用 aiohttp
+- 对于真正的异步 HTTP，建议使用 aiohttp；
+  不引入依赖时可参考 Exercises/13_async_requests.py（基于 asyncio streams 的
+  HTTP/1.1 客户端：按 host 的 keep-alive 连接池 + 全局并发上限 + 超时）
 - 本示例展示如何在现有 asyncio 代码中复用 requests
+- 线程池里的每个线程持有自己的 Session：连接可以复用，又不跨线程共享 Session
 
 运行：
     python3 02_Frameworks/03_Requests/27_asyncio_integration.py
@@ -22,16 +25,32 @@ Author: Lambert
 from __future__ import annotations
 
 import asyncio
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+
 import requests
 
+# 专用的有界线程池：并发上限明确，不和默认 executor 里的其他阻塞任务抢线程
+_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="requests")
+_local = threading.local()
+
+
+def _thread_session() -> requests.Session:
+    """当前线程专属的 Session（首次使用时创建），同一线程上的请求复用 keep-alive 连接"""
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = _local.session = requests.Session()
+    return session
+
 
 async def fetch_in_thread(url: str, timeout: int = 5) -> dict:
     """在线程池中执行 requests 请求"""
-    loop = asyncio.get_event_loop()
+    loop = asyncio.get_running_loop()
 
-    # 使用 run_in_executor 在线程池中执行同步函数
-    future = loop.run_in_executor(None, lambda: requests.get(url, timeout=timeout))
+    # 使用 run_in_executor 在线程池中执行同步函数；
+    # 用线程专属 Session 而不是模块级 requests.get，避免每次请求都新建 TCP 连接
+    future = loop.run_in_executor(_EXECUTOR, lambda: _thread_session().get(url, timeout=timeout))
     resp = await future
 
     return {
@@ -220,7 +239,8 @@ async def main() -> None:
     print("  - requests + asyncio: 适用于已有代码迁移")
     print("  - 新项目优先使用 aiohttp 实现真正的异步")
     print("  - 线程池大小可通过 executor 限制")
-    print("  - 注意 Session 不能跨线程共享")
+    print("  - 注意 Session 不能跨线程共享（每个线程一个 Session 即可复用连接）")
+    _EXECUTOR.shutdown(wait=True)
 
 
 if __name__ == "__main__":
@@ -24,10 +24,10 @@ TOPICS: list[tuple[str, str]] = [
     ("08_file_upload.py", "文件上传"),
     ("09_cookie_jar.py", "Cookie 持久化"),
     # 进阶练习 (10-13)
-    ("10_rest_client.py", "REST API 客户端"),
+    ("10_rest_client.py", "REST API 客户端（带 HTTP 缓存适配器：LRU + SQLite、ETag/Last-Modified 重新验证；single-flight 去重与微批处理）"),
     ("11_proxy_config.py", "代理配置"),
     ("12_timeout_retry.py", "超时和重试进阶"),
-    ("13_async_requests.py", "AsyncIO 集成"),
+    ("13_async_requests.py", "AsyncIO 集成（原生 asyncio streams 的 HTTP/1.1 客户端，keep-alive 连接池）"),
 ]
 
 
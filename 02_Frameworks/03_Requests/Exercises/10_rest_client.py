@@ -7,6 +7,18 @@ Author: Lambert
 题目：
 实现一个简单的 REST API 客户端，支持 GET/POST/PUT/DELETE。
 
+进阶：HTTP 缓存（以 HTTPAdapter 的形式挂到 Session 上，RESTClient 和普通 Session 都能用）
+- 内存 LRU（按字节预算淘汰）+ 可选 SQLite 二级缓存
+- 遵守 Cache-Control：no-store 不缓存、no-cache 每次重新验证、max-age 内直接命中
+- 过期后带 If-None-Match / If-Modified-Since 条件请求，304 时复用本地响应体
+- 统计命中/未命中/重新验证次数与节省的字节数
+
+进阶：请求合并
+- single-flight：多个线程同时 GET 同一个 URL+参数时只发一次请求，其余线程等待并共享响应
+  （共享的是响应字节，每个调用方各自 json 解码，拿到互不影响的对象）
+- 微批处理：按 ID 查询在几毫秒窗口内攒成一次批量请求（批量端点由调用方注册）
+- 统计节省的上游请求数
+
 参考答案：
 - 本文件函数实现即为参考答案；`main()` 带最小自测。
 
@@ -16,25 +28,494 @@ Author: Lambert
 
 from __future__ import annotations
 
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Hashable
+from urllib.parse import parse_qs, urlsplit
+
 import requests
-from typing import Any
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+
+# =============================================================================
+# HTTP 缓存
+# =============================================================================
+
+
+def parse_cache_control(value: str | None) -> dict[str, str | None]:
+    """解析 Cache-Control 头：'max-age=60, no-cache' -> {'max-age': '60', 'no-cache': None}"""
+    directives: dict[str, str | None] = {}
+    for part in (value or "").split(","):
+        name, sep, arg = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = arg.strip('"') if sep else None
+    return directives
+
+
+@dataclass
+class CacheEntry:
+    """缓存的一条响应"""
+    url: str
+    status_code: int
+    headers: dict[str, str]
+    content: bytes
+    stored_at: float
+    max_age: float  # 新鲜期（秒）；0 表示每次都要重新验证
+
+    @property
+    def etag(self) -> str | None:
+        return self.headers.get("ETag") or self.headers.get("etag")
+
+    @property
+    def last_modified(self) -> str | None:
+        return self.headers.get("Last-Modified") or self.headers.get("last-modified")
+
+    @property
+    def size(self) -> int:
+        return len(self.content)
+
+    def is_fresh(self, now: float | None = None) -> bool:
+        return ((now or time.time()) - self.stored_at) < self.max_age
+
+
+class MemoryLRUCache:
+    """按字节预算淘汰的内存 LRU"""
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._entries: OrderedDict[str, CacheEntry] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> CacheEntry | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, entry: CacheEntry) -> None:
+        if entry.size > self.max_bytes:
+            return  # 单条就超过预算的响应不进内存层
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old.size
+            self._entries[key] = entry
+            self.current_bytes += entry.size
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= evicted.size
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.current_bytes -= old.size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCache:
+    """SQLite 二级缓存：进程重启后仍可用（响应体存 BLOB，元数据存 JSON）"""
+
+    def __init__(self, path: Path | str):
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS http_cache (key TEXT PRIMARY KEY, meta TEXT NOT NULL, body BLOB NOT NULL)"
+            )
+
+    def get(self, key: str) -> CacheEntry | None:
+        with self._lock:
+            row = self._conn.execute("SELECT meta, body FROM http_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        meta = json.loads(row[0])
+        return CacheEntry(content=row[1], **meta)
+
+    def set(self, key: str, entry: CacheEntry) -> None:
+        meta = {
+            "url": entry.url,
+            "status_code": entry.status_code,
+            "headers": entry.headers,
+            "stored_at": entry.stored_at,
+            "max_age": entry.max_age,
+        }
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO http_cache (key, meta, body) VALUES (?, ?, ?)",
+                (key, json.dumps(meta), entry.content),
+            )
+
+    def delete(self, key: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM http_cache WHERE key = ?", (key,))
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+class TieredCache:
+    """内存 LRU 在前、可选磁盘层在后；磁盘命中会提升回内存"""
+
+    def __init__(self, memory: MemoryLRUCache | None = None, disk: SQLiteCache | None = None):
+        self.memory = memory or MemoryLRUCache()
+        self.disk = disk
+
+    def get(self, key: str) -> CacheEntry | None:
+        entry = self.memory.get(key)
+        if entry is None and self.disk is not None:
+            entry = self.disk.get(key)
+            if entry is not None:
+                self.memory.set(key, entry)
+        return entry
+
+    def set(self, key: str, entry: CacheEntry) -> None:
+        self.memory.set(key, entry)
+        if self.disk is not None:
+            self.disk.set(key, entry)
+
+    def delete(self, key: str) -> None:
+        self.memory.delete(key)
+        if self.disk is not None:
+            self.disk.delete(key)
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0  # 新鲜命中：完全不发请求
+    revalidated: int = 0  # 条件请求返回 304：只传了响应头
+    misses: int = 0  # 完整往返
+    bytes_saved: int = 0  # 命中与 304 省下的响应体字节数
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record(self, kind: str, saved: int = 0) -> None:
+        with self._lock:
+            setattr(self, kind, getattr(self, kind) + 1)
+            self.bytes_saved += saved
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.revalidated + self.misses
+        return (self.hits + self.revalidated) / total if total else 0.0
+
+
+class CachingAdapter(HTTPAdapter):
+    """带 HTTP 缓存的 HTTPAdapter：session.mount("https://", CachingAdapter(cache))
+
+    只缓存 GET 的 200 响应；stream=True 的请求直接透传（响应体还没读，无法缓存）。
+    缓存键是完整 URL；带 Authorization 的请求再拼上凭证的哈希，同一个缓存被多个
+    Session/用户共享时不会把 A 的私有响应返回给 B。不处理 Vary。
+    """
+
+    def __init__(self, cache: TieredCache | None = None, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.cache = cache or TieredCache()
+        self.stats = CacheStats()
+
+    def send(self, request: requests.PreparedRequest, **kwargs: Any) -> requests.Response:
+        if request.method != "GET" or kwargs.get("stream"):
+            return super().send(request, **kwargs)
+
+        key = self._cache_key(request)
+        entry = self.cache.get(key)
+        request_cc = parse_cache_control(request.headers.get("Cache-Control"))
+        if entry is not None and entry.is_fresh() and "no-cache" not in request_cc:
+            self.stats.record("hits", entry.size)
+            return self._build_response(request, entry)
+
+        if entry is not None:
+            if entry.etag:
+                request.headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                request.headers["If-Modified-Since"] = entry.last_modified
+
+        response = super().send(request, **kwargs)
+
+        if response.status_code == 304 and entry is not None:
+            # 304 的响应头（新的 max-age / ETag）合并进旧条目，响应体沿用本地副本
+            fresh_headers = {
+                name: value for name, value in response.headers.items()
+                if name.lower() not in ("content-length", "transfer-encoding", "content-encoding")
+            }
+            headers = {**entry.headers, **fresh_headers}
+            refreshed = self._make_entry(request.url, entry.status_code, headers, entry.content)
+            response.close()
+            if refreshed is None:
+                self.cache.delete(key)
+                refreshed = entry
+            else:
+                self.cache.set(key, refreshed)
+            self.stats.record("revalidated", entry.size)
+            return self._build_response(request, refreshed)
+
+        self.stats.record("misses")
+        if response.status_code == 200:
+            stored = self._make_entry(request.url, 200, dict(response.headers), response.content)
+            if stored is not None:
+                self.cache.set(key, stored)
+        return response
+
+    @staticmethod
+    def _cache_key(request: requests.PreparedRequest) -> str:
+        """URL + 凭证哈希：只存哈希，缓存（尤其 SQLite 落盘那一层）里不出现明文 token"""
+        auth = request.headers.get("Authorization")
+        if not auth:
+            return request.url
+        return f"{request.url}#auth={hashlib.sha256(auth.encode('utf-8')).hexdigest()[:32]}"
+
+    @staticmethod
+    def _make_entry(url: str, status_code: int, headers: dict[str, str], content: bytes) -> CacheEntry | None:
+        """按响应头决定是否可缓存以及新鲜期；既没有 max-age 也没有校验器的不缓存"""
+        headers.pop("Content-Encoding", None)  # content 已解压
+        headers.pop("content-encoding", None)
+        cc = parse_cache_control(headers.get("Cache-Control") or headers.get("cache-control"))
+        if "no-store" in cc:
+            return None
+        try:
+            max_age = float(cc.get("max-age") or 0)
+        except ValueError:
+            max_age = 0.0
+        if "no-cache" in cc:
+            max_age = 0.0
+        has_validator = any(h in headers for h in ("ETag", "etag", "Last-Modified", "last-modified"))
+        if max_age <= 0 and not has_validator:
+            return None
+        return CacheEntry(url, status_code, headers, content, time.time(), max_age)
+
+    def _build_response(self, request: requests.PreparedRequest, entry: CacheEntry) -> requests.Response:
+        response = requests.Response()
+        response.status_code = entry.status_code
+        response.reason = "OK"
+        response.headers = CaseInsensitiveDict(entry.headers)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = entry.content
+        response.url = entry.url
+        response.request = request
+        response.connection = self
+        response.from_cache = True
+        return response
+
+
+# =============================================================================
+# 请求合并：single-flight 与微批处理
+# =============================================================================
+
+
+class SingleFlight:
+    """相同 key 的并发调用只执行一次，其余调用等待同一个结果（或同一个异常）"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._inflight: dict[Hashable, Future] = {}
+        self.executed = 0
+        self.shared = 0  # 搭便车的调用数 = 省下的请求数
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+                self.executed += 1
+            else:
+                self.shared += 1
+        if not leader:
+            return future.result()
+
+        try:
+            future.set_result(fn())
+        except BaseException as exc:
+            future.set_exception(exc)
+        finally:
+            with self._lock:
+                del self._inflight[key]
+        return future.result()
+
+
+@dataclass(frozen=True)
+class BatchEndpoint:
+    """批量端点映射：GET {endpoint}?{ids_param}=1,2,3 返回对象列表，按 id_field 对回各个请求"""
+    endpoint: str
+    ids_param: str = "ids"
+    id_field: str = "id"
+    separator: str = ","
+
+
+class MicroBatcher:
+    """把 max_wait 秒内到达的单个 ID 查询攒成一批，交给 fetch_batch 一次取回
+
+    - 批满 max_batch 立即发送，否则等第一个请求到达后 max_wait 秒再发送
+    - 同一批里重复的 ID 只查一次
+    - 批量结果里缺失的 ID 以 KeyError 通知对应调用方
+    """
+
+    def __init__(
+        self,
+        fetch_batch: Callable[[list[Hashable]], dict[Hashable, Any]],
+        max_batch: int = 100,
+        max_wait: float = 0.005,
+    ):
+        self.fetch_batch = fetch_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._cond = threading.Condition()
+        self._pending: dict[Hashable, list[Future]] = {}
+        self._first_at = 0.0
+        self._closed = False
+        self.requested = 0
+        self.batches = 0
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    @property
+    def saved(self) -> int:
+        return max(0, self.requested - self.batches)
+
+    def submit(self, key: Hashable) -> Future:
+        future: Future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("batcher is closed")
+            if not self._pending:
+                self._first_at = time.monotonic()
+            self._pending.setdefault(key, []).append(future)
+            self.requested += 1
+            if len(self._pending) == 1 or len(self._pending) >= self.max_batch:
+                self._cond.notify()
+        return future
+
+    def get(self, key: Hashable, timeout: float | None = None) -> Any:
+        return self.submit(key).result(timeout)
+
+    def _take_batch(self) -> dict[Hashable, list[Future]] | None:
+        with self._cond:
+            while True:
+                if self._pending:
+                    remaining = self._first_at + self.max_wait - time.monotonic()
+                    if len(self._pending) >= self.max_batch or remaining <= 0 or self._closed:
+                        break
+                    self._cond.wait(remaining)
+                elif self._closed:
+                    return None
+                else:
+                    self._cond.wait()
+            keys = list(self._pending)[: self.max_batch]
+            batch = {key: self._pending.pop(key) for key in keys}
+            self._first_at = time.monotonic()  # 剩下的请求重新计时
+            self.batches += 1
+            return batch
+
+    def _run(self) -> None:
+        while (batch := self._take_batch()) is not None:
+            try:
+                results = self.fetch_batch(list(batch))
+            except BaseException as exc:
+                for futures in batch.values():
+                    for future in futures:
+                        future.set_exception(exc)
+                continue
+            for key, futures in batch.items():
+                for future in futures:
+                    if key in results:
+                        future.set_result(results[key])
+                    else:
+                        future.set_exception(KeyError(key))
+
+    def close(self) -> None:
+        """发送剩余请求后停止后台线程"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+
+
+# =============================================================================
+# REST 客户端
+# =============================================================================
 
 
 class RESTClient:
     """简单的 REST API 客户端"""
 
-    def __init__(self, base_url: str, timeout: int = 10):
+    def __init__(
+        self,
+        base_url: str,
+        timeout: int = 10,
+        cache: TieredCache | None = None,
+        coalesce_gets: bool = True,
+    ):
         self.base_url = base_url.rstrip("/")
         self.timeout = timeout
         self.session = requests.Session()
+        self.single_flight = SingleFlight() if coalesce_gets else None
+        self._batchers: dict[str, MicroBatcher] = {}
+        self.cache_adapter: CachingAdapter | None = None
+        if cache is not None:
+            self.cache_adapter = CachingAdapter(cache)
+            self.session.mount("http://", self.cache_adapter)
+            self.session.mount("https://", self.cache_adapter)
+
+    @property
+    def cache_stats(self) -> CacheStats | None:
+        return self.cache_adapter.stats if self.cache_adapter else None
 
     def get(self, endpoint: str, params: dict | None = None) -> dict:
-        """GET 请求"""
+        """GET 请求（开启合并时，相同 URL+参数的并发请求只发一次）"""
         url = f"{self.base_url}/{endpoint.lstrip('/')}"
-        response = self.session.get(url, params=params, timeout=self.timeout)
+
+        def fetch() -> requests.Response:
+            return self.session.get(url, params=params, timeout=self.timeout)
+
+        if self.single_flight is None:
+            response = fetch()
+        else:
+            # 用 requests 编码后的完整 URL 作为键：列表参数（{"id": [1, 2]}）也能正确合并
+            key = requests.Request("GET", url, params=params).prepare().url
+            response = self.single_flight.do(key, fetch)
         response.raise_for_status()
         return response.json()
 
+    def register_batch(
+        self,
+        name: str,
+        batch: BatchEndpoint,
+        max_batch: int = 100,
+        max_wait: float = 0.005,
+    ) -> None:
+        """注册一个批量端点，之后用 get_by_id(name, id) 做按 ID 查询"""
+
+        def fetch_batch(ids: list[Hashable]) -> dict[Hashable, Any]:
+            params = {batch.ids_param: batch.separator.join(str(i) for i in ids)}
+            items = self.get(batch.endpoint, params=params)
+            by_text = {str(item[batch.id_field]): item for item in items}
+            return {i: by_text[str(i)] for i in ids if str(i) in by_text}
+
+        self._batchers[name] = MicroBatcher(fetch_batch, max_batch=max_batch, max_wait=max_wait)
+
+    def get_by_id(self, name: str, item_id: Hashable) -> dict:
+        """按 ID 查询，经由 register_batch 注册的微批处理器合并成批量请求"""
+        return self._batchers[name].get(item_id, timeout=self.timeout)
+
+    @property
+    def requests_saved(self) -> int:
+        """single-flight 与微批处理一共省下的上游请求数"""
+        shared = self.single_flight.shared if self.single_flight else 0
+        return shared + sum(b.saved for b in self._batchers.values())
+
     def post(self, endpoint: str, data: dict | None = None) -> dict:
         """POST JSON 数据"""
         url = f"{self.base_url}/{endpoint.lstrip('/')}"
@@ -58,10 +539,146 @@ class RESTClient:
 
     def close(self) -> None:
         """关闭 Session"""
+        for batcher in self._batchers.values():
+            batcher.close()
         self.session.close()
 
 
+# =============================================================================
+# 自测
+# =============================================================================
+
+
+class _CacheDemoHandler(BaseHTTPRequestHandler):
+    """本地服务：/fresh 带 max-age=60，/etag 只带 ETag（每次都要重新验证），统计收到的请求"""
+    protocol_version = "HTTP/1.1"
+    counts: dict[str, int] = {}
+    body = json.dumps({"items": list(range(200))}).encode("utf-8")
+
+    def do_GET(self) -> None:  # noqa: N802
+        path = self.path.split("?", 1)[0]
+        self.counts[path] = self.counts.get(path, 0) + 1
+        etag = '"v1"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(self.body)))
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "max-age=60" if path == "/fresh" else "no-cache")
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        return
+
+
+def demo_http_cache() -> None:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _CacheDemoHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    client = RESTClient(base, cache=TieredCache(MemoryLRUCache(max_bytes=1024 * 1024), SQLiteCache(":memory:")))
+    for _ in range(10):
+        assert len(client.get("/fresh")["items"]) == 200
+        assert len(client.get("/etag")["items"]) == 200
+    stats = client.cache_stats
+    assert _CacheDemoHandler.counts == {"/fresh": 1, "/etag": 10}
+    assert (stats.hits, stats.revalidated, stats.misses) == (9, 9, 2)
+    print(f"[OK] HTTP cache: {stats.hits} hits, {stats.revalidated} revalidated (304), "
+          f"{stats.misses} misses, {stats.bytes_saved} bytes saved")
+
+    # 普通 Session 也能挂同一个适配器
+    session = requests.Session()
+    session.mount("http://", CachingAdapter(client.cache_adapter.cache))
+    assert getattr(session.get(f"{base}/fresh"), "from_cache", False)
+    print("[OK] CachingAdapter on a plain Session")
+
+    # 共享缓存按凭证隔离：带不同 token 的 Session 不会拿到彼此（或匿名）缓存的响应
+    for token in ("alice", "bob", "alice"):
+        session.headers["Authorization"] = f"Bearer {token}"
+        session.get(f"{base}/fresh")
+    assert _CacheDemoHandler.counts["/fresh"] == 3
+    print("[OK] cache entries keyed per Authorization header")
+
+    client.close()
+    server.shutdown()
+    server.server_close()
+
+
+class _CoalesceDemoHandler(BaseHTTPRequestHandler):
+    """本地服务：/slow 延迟 200ms；/items?ids=1,2 批量返回；统计收到的请求"""
+    protocol_version = "HTTP/1.1"
+    counts: dict[str, int] = {}
+    _lock = threading.Lock()
+
+    def do_GET(self) -> None:  # noqa: N802
+        parts = urlsplit(self.path)
+        with self._lock:
+            self.counts[parts.path] = self.counts.get(parts.path, 0) + 1
+        if parts.path == "/slow":
+            time.sleep(0.2)
+            payload: Any = {"value": 42}
+        else:
+            ids = parse_qs(parts.query).get("ids", [""])[0].split(",")
+            payload = [{"id": int(i), "name": f"item-{i}"} for i in ids if i and int(i) < 1000]
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        return
+
+
+def demo_request_coalescing() -> None:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _CoalesceDemoHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = RESTClient(f"http://127.0.0.1:{server.server_address[1]}")
+    client.register_batch("items", BatchEndpoint("/items"), max_batch=100, max_wait=0.005)
+
+    with ThreadPoolExecutor(max_workers=50) as pool:
+        results = list(pool.map(lambda _: client.get("/slow"), range(50)))
+    assert all(r == {"value": 42} for r in results) and results[0] is not results[1]
+    print(f"[OK] single-flight: 50 concurrent GETs -> {_CoalesceDemoHandler.counts['/slow']} upstream call(s)")
+
+    # 多值查询参数：合并键不能依赖参数可哈希
+    before = _CoalesceDemoHandler.counts["/slow"]
+    with ThreadPoolExecutor(max_workers=10) as pool:
+        results = list(pool.map(lambda _: client.get("/slow", params={"id": [1, 2]}), range(10)))
+    assert all(r == {"value": 42} for r in results)
+    assert _CoalesceDemoHandler.counts["/slow"] - before == 1
+    print("[OK] single-flight with list-valued params")
+
+    with ThreadPoolExecutor(max_workers=50) as pool:
+        items = list(pool.map(lambda i: client.get_by_id("items", i % 300), range(1000)))
+    assert [item["id"] for item in items] == [i % 300 for i in range(1000)]
+    try:
+        client.get_by_id("items", 5000)
+    except KeyError:
+        pass
+    else:
+        raise AssertionError("missing id should raise KeyError")
+    print(f"[OK] micro-batching: 1000 lookups -> {_CoalesceDemoHandler.counts['/items']} batch call(s); "
+          f"requests saved in total: {client.requests_saved}")
+
+    client.close()
+    server.shutdown()
+    server.server_close()
+
+
 def main() -> None:
+    demo_http_cache()
+    demo_request_coalescing()
+
     client = RESTClient("https://httpbin.org")
 
     # GET 测试
@@ -89,4 +706,4 @@ def main() -> None:
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -5,10 +5,17 @@
 Author: Lambert
 
 题目：
-实现一个异步 HTTP 客户端，使用 run_in_executor 并发执行多个请求。
+实现一个原生 asyncio 的 HTTP/1.1 客户端（不借助线程池），要求：
+- 基于 asyncio streams（open_connection）收发请求/响应
+- 按 (scheme, host, port) 维护 keep-alive 连接池，连接用完放回复用
+- 全局并发上限 + 每个 host 的连接上限
+- 超时（整个请求的总预算）
+- 保持 get/post 返回 JSON 的接口：`await client.get(url, params=..., timeout=...)`
+
+这样 1 万个并发请求既不需要 1 万个线程，也不需要 1 万次 TCP 握手。
 
 参考答案：
-- 本文件函数实现即为参考答案；`main()` 带最小自测。
+- 本文件函数实现即为参考答案；`main()` 带最小自测（本地 http.server 充当服务端）。
 
 运行：
     python3 02_Frameworks/03_Requests/Exercises/13_async_requests.py
@@ -17,40 +24,260 @@ Author: Lambert
 from __future__ import annotations
 
 import asyncio
-import requests
-from concurrent.futures import ThreadPoolExecutor
+import json
+import ssl
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from typing import Any
+from urllib.parse import urlencode, urlsplit
+
+
+class HTTPError(Exception):
+    """非 2xx 响应"""
+
+    def __init__(self, response: AsyncResponse):
+        super().__init__(f"{response.status_code} {response.reason} for url: {response.url}")
+        self.response = response
+
+
+@dataclass
+class AsyncResponse:
+    url: str
+    status_code: int
+    reason: str
+    headers: dict[str, str]
+    content: bytes
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self) -> Any:
+        return json.loads(self.content)
+
+    def raise_for_status(self) -> None:
+        if not 200 <= self.status_code < 300:
+            raise HTTPError(self)
+
+
+@dataclass
+class _Connection:
+    """一条 keep-alive 连接"""
+    reader: asyncio.StreamReader
+    writer: asyncio.StreamWriter
+    reused: bool = False  # 是否从池里取出（复用的连接可能已被服务端关闭）
+
+    def is_usable(self) -> bool:
+        return not self.writer.is_closing() and not self.reader.at_eof()
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+@dataclass
+class _HostPool:
+    """单个 (scheme, host, port) 的连接池"""
+    limit: asyncio.Semaphore
+    idle: deque[_Connection] = field(default_factory=deque)
 
 
 class AsyncRequestsClient:
-    """AsyncIO 兼容的 requests 客户端"""
+    """原生 asyncio 的 HTTP/1.1 客户端
 
-    def __init__(self, max_workers: int = 5):
-        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+    - max_concurrency：全局同时在途的请求数
+    - max_per_host：每个 host 同时打开的连接数（也是池中最多保留的空闲连接数）
+    """
 
-    async def get(self, url: str, **kwargs: Any) -> dict:
-        """异步 GET 请求"""
-        loop = asyncio.get_event_loop()
-        response = await loop.run_in_executor(
-            self.executor,
-            lambda: requests.get(url, **kwargs)
-        )
+    def __init__(self, max_concurrency: int = 100, max_per_host: int = 20, timeout: float = 10.0):
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self._global_limit = asyncio.Semaphore(max_concurrency)
+        self._pools: dict[tuple[str, str, int], _HostPool] = {}
+        self._ssl_context = ssl.create_default_context()
+        self.connections_opened = 0
+        self.requests_sent = 0
+
+    async def __aenter__(self) -> AsyncRequestsClient:
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.close()
+
+    async def get(self, url: str, **kwargs: Any) -> Any:
+        """异步 GET 请求，返回 JSON"""
+        response = await self.request("GET", url, **kwargs)
         response.raise_for_status()
         return response.json()
 
-    async def post(self, url: str, **kwargs: Any) -> dict:
-        """异步 POST 请求"""
-        loop = asyncio.get_event_loop()
-        response = await loop.run_in_executor(
-            self.executor,
-            lambda: requests.post(url, **kwargs)
-        )
+    async def post(self, url: str, **kwargs: Any) -> Any:
+        """异步 POST 请求，返回 JSON"""
+        response = await self.request("POST", url, **kwargs)
         response.raise_for_status()
         return response.json()
 
+    async def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        params: dict[str, Any] | None = None,
+        json: Any = None,
+        data: bytes | str | dict[str, Any] | None = None,
+        headers: dict[str, str] | None = None,
+        timeout: float | None = None,
+    ) -> AsyncResponse:
+        """发送请求并读取完整响应；timeout 覆盖排队、建连、发送与读取的总时间"""
+        parts = urlsplit(url)
+        scheme = parts.scheme or "http"
+        host = parts.hostname or ""
+        port = parts.port or (443 if scheme == "https" else 80)
+        target = parts.path or "/"
+        query = "&".join(q for q in (parts.query, urlencode(params or {}, doseq=True)) if q)
+        if query:
+            target += "?" + query
+
+        body, content_type = _encode_body(json, data)
+        request_headers = {
+            "Host": parts.netloc,
+            "User-Agent": "async-requests-exercise/1.0",
+            "Accept": "application/json, */*",
+            "Connection": "keep-alive",
+        }
+        if content_type:
+            request_headers["Content-Type"] = content_type
+        if body or method in ("POST", "PUT", "PATCH"):
+            request_headers["Content-Length"] = str(len(body))
+        request_headers.update(headers or {})
+        head = f"{method} {target} HTTP/1.1\r\n" + "".join(f"{k}: {v}\r\n" for k, v in request_headers.items())
+        payload = head.encode("latin-1") + b"\r\n" + body
+
+        key = (scheme, host, port)
+        return await asyncio.wait_for(
+            self._send(key, url, method, payload),
+            timeout=self.timeout if timeout is None else timeout,
+        )
+
+    async def _send(self, key: tuple[str, str, int], url: str, method: str, payload: bytes) -> AsyncResponse:
+        pool = self._pools.get(key)
+        if pool is None:
+            pool = self._pools[key] = _HostPool(asyncio.Semaphore(self.max_per_host))
+
+        # 先排每主机的队，再拿全局名额：排在饱和主机上的请求不占全局名额，
+        # 否则它们会把发往空闲主机的请求一起堵住（队头阻塞）
+        async with pool.limit:
+            # 复用的连接可能在空闲期间被服务端关掉：发送失败且尚未收到任何响应时换新连接重试一次
+            for _ in range(2):
+                async with self._global_limit:
+                    conn = await self._acquire(key, pool)
+                    try:
+                        conn.writer.write(payload)
+                        await conn.writer.drain()
+                        self.requests_sent += 1
+                        response, keep_alive = await _read_response(conn.reader, url, method)
+                    except (ConnectionError, asyncio.IncompleteReadError) as exc:
+                        conn.close()
+                        if conn.reused and not getattr(exc, "partial", b""):
+                            continue
+                        raise
+                    except BaseException:
+                        # 超时（CancelledError）等：连接上可能残留半个响应，不能放回池
+                        conn.close()
+                        raise
+                    self._release(pool, conn, keep_alive)
+                    return response
+        raise ConnectionError(f"connection to {key[1]}:{key[2]} closed unexpectedly")
+
+    async def _acquire(self, key: tuple[str, str, int], pool: _HostPool) -> _Connection:
+        while pool.idle:
+            conn = pool.idle.pop()  # LIFO：优先用最近用过的连接，冷连接自然被服务端超时回收
+            if conn.is_usable():
+                conn.reused = True
+                return conn
+            conn.close()
+        scheme, host, port = key
+        reader, writer = await asyncio.open_connection(
+            host,
+            port,
+            ssl=self._ssl_context if scheme == "https" else None,
+        )
+        self.connections_opened += 1
+        return _Connection(reader, writer)
+
+    def _release(self, pool: _HostPool, conn: _Connection, keep_alive: bool) -> None:
+        if keep_alive and conn.is_usable() and len(pool.idle) < self.max_per_host:
+            pool.idle.append(conn)
+        else:
+            conn.close()
+
     async def close(self) -> None:
-        """关闭 executor"""
-        self.executor.shutdown(wait=True)
+        """关闭所有空闲连接"""
+        writers = []
+        for pool in self._pools.values():
+            while pool.idle:
+                conn = pool.idle.pop()
+                conn.close()
+                writers.append(conn.writer)
+        for writer in writers:
+            try:
+                await writer.wait_closed()
+            except (ConnectionError, ssl.SSLError):
+                pass
+        self._pools.clear()
+
+
+def _encode_body(json_body: Any, data: bytes | str | dict[str, Any] | None) -> tuple[bytes, str | None]:
+    if json_body is not None:
+        return json.dumps(json_body).encode("utf-8"), "application/json"
+    if isinstance(data, dict):
+        return urlencode(data, doseq=True).encode("utf-8"), "application/x-www-form-urlencoded"
+    if isinstance(data, str):
+        return data.encode("utf-8"), None
+    return data or b"", None
+
+
+async def _read_response(reader: asyncio.StreamReader, url: str, method: str) -> tuple[AsyncResponse, bool]:
+    """读取一个完整响应，返回 (响应, 连接是否可复用)"""
+    status_line = await reader.readuntil(b"\r\n")
+    version, status, *reason = status_line.decode("latin-1").rstrip("\r\n").split(" ", 2)
+    status_code = int(status)
+
+    headers: dict[str, str] = {}
+    while True:
+        line = await reader.readuntil(b"\r\n")
+        if line == b"\r\n":
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    connection = headers.get("connection", "").lower()
+    keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+
+    if method == "HEAD" or status_code in (204, 304) or 100 <= status_code < 200:
+        content = b""
+    elif "chunked" in headers.get("transfer-encoding", "").lower():
+        chunks = []
+        while True:
+            size = int((await reader.readuntil(b"\r\n")).split(b";", 1)[0], 16)
+            if size == 0:
+                # 跳过 trailer
+                while await reader.readuntil(b"\r\n") != b"\r\n":
+                    pass
+                break
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
+        content = b"".join(chunks)
+    elif "content-length" in headers:
+        content = await reader.readexactly(int(headers["content-length"]))
+    else:
+        # 既没有长度也不是 chunked：读到连接关闭为止
+        content = await reader.read()
+        keep_alive = False
+
+    response = AsyncResponse(url, status_code, reason[0] if reason else "", headers, content)
+    return response, keep_alive
 
 
 async def fetch_multiple_urls(client: AsyncRequestsClient, urls: list[str]) -> list[dict]:
@@ -59,32 +286,102 @@ async def fetch_multiple_urls(client: AsyncRequestsClient, urls: list[str]) -> l
     return await asyncio.gather(*tasks)
 
 
+class _JSONHandler(BaseHTTPRequestHandler):
+    """本地测试服务：GET 回显 path，POST 回显 JSON 请求体"""
+    protocol_version = "HTTP/1.1"  # 默认 HTTP/1.0 每个响应后都会断开，无法演示 keep-alive
+    disable_nagle_algorithm = True  # 头和 body 分两次写，开着 Nagle 会叠加 delayed ACK 的 40ms 延迟
+
+    def _send_json(self, payload: Any, status: int = 200) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # 客户端已超时断开
+
+    def do_GET(self) -> None:  # noqa: N802
+        if self.path.startswith("/status/"):
+            self._send_json({"status": int(self.path.rsplit("/", 1)[1])}, status=int(self.path.rsplit("/", 1)[1]))
+            return
+        if self.path.startswith("/delay"):
+            time.sleep(1)
+        self._send_json({"path": self.path, "args": {}})
+
+    def do_POST(self) -> None:  # noqa: N802
+        length = int(self.headers.get("Content-Length", 0))
+        self._send_json({"json": json.loads(self.rfile.read(length) or b"null")})
+
+    def log_message(self, format: str, *args: Any) -> None:
+        return
+
+
 async def main() -> None:
-    client = AsyncRequestsClient()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _JSONHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    async with AsyncRequestsClient(max_concurrency=50, max_per_host=20) as client:
+        # 单个请求测试
+        result = await client.get(f"{base}/get", params={"q": "1"})
+        assert "args" in result and result["path"] == "/get?q=1"
+        print("[OK] async GET request")
+
+        result = await client.post(f"{base}/post", json={"name": "Alice"})
+        assert result["json"] == {"name": "Alice"}
+        print("[OK] async POST JSON")
+
+        try:
+            await client.get(f"{base}/status/404")
+        except HTTPError as exc:
+            assert exc.response.status_code == 404
+            print("[OK] raise_for_status -> HTTPError")
+        else:
+            raise AssertionError("404 response did not raise HTTPError")
 
-    # 单个请求测试
-    result = await client.get("https://httpbin.org/get")
-    assert "args" in result
-    print("[OK] async GET request")
+        try:
+            await client.get(f"{base}/delay", timeout=0.2)
+        except asyncio.TimeoutError:
+            print("[OK] timeout enforced")
+        else:
+            raise AssertionError("request to /delay did not time out")
 
-    # 并发多个请求
-    urls = [
-        "https://httpbin.org/get?n=1",
-        "https://httpbin.org/get?n=2",
-        "https://httpbin.org/get?n=3",
-    ]
+        # 大量并发：连接数受 max_per_host 约束，而不是请求数
+        total = 10_000
+        urls = [f"{base}/get?n={i}" for i in range(total)]
+        opened_before = client.connections_opened
+        start = time.perf_counter()
+        results = await fetch_multiple_urls(client, urls)
+        elapsed = time.perf_counter() - start
 
-    import time
-    start = time.time()
-    results = await fetch_multiple_urls(client, urls)
-    elapsed = time.time() - start
+        assert len(results) == total
+        opened = client.connections_opened - opened_before
+        assert opened <= client.max_per_host
+        print(f"[OK] fetched {total} URLs in {elapsed:.2f}s with {opened} new connections (no threads)")
 
-    assert len(results) == 3
-    print(f"[OK] fetched {len(results)} URLs in {elapsed:.2f}s (concurrent)")
+    # 一台主机饱和时，发往另一台空闲主机的请求不应排在它后面
+    other = ThreadingHTTPServer(("127.0.0.1", 0), _JSONHandler)
+    other.daemon_threads = True
+    threading.Thread(target=other.serve_forever, daemon=True).start()
+    async with AsyncRequestsClient(max_concurrency=4, max_per_host=2) as client:
+        slow = [asyncio.create_task(client.get(f"{base}/delay?n={i}")) for i in range(10)]
+        await asyncio.sleep(0.05)
+        start = time.perf_counter()
+        await client.get(f"http://127.0.0.1:{other.server_address[1]}/get")
+        waited = time.perf_counter() - start
+        await asyncio.gather(*slow)
+    assert waited < 0.5, f"idle host waited {waited:.2f}s behind a saturated host"
+    print(f"[OK] no head-of-line blocking across hosts ({waited * 1000:.0f} ms)")
+    other.shutdown()
+    other.server_close()
 
-    await client.close()
+    server.shutdown()
+    server.server_close()
     print("[OK] AsyncIO integration exercise complete")
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
@@ -17,6 +17,10 @@ Author: Lambert
 5. 数据保存到 JSON/CSV
 6. 异常处理和自动重试
 7. 日志记录和进度显示
+8. 异步并发采集引擎（上下文/页面池 + 按 host 限速 + 逐页流式产出）
+9. 批量提取：字段声明表 + 一次 evaluate_all 读取整页商品
+10. 图片下载器：线程池并发 + keep-alive 连接复用 + 内容哈希去重 + manifest 断点续传
+11. 流式增量导出：逐页追加 JSONL/CSV/列式分片，定期 fsync + 检查点续写
 
 ## 涉及的 Playwright API
 - launch_persistent_context: 持久化登录状态
@@ -29,18 +33,31 @@ Author: Lambert
 - screenshot: 保存截图
 - clock: 时间控制（模拟时间加速）
 - tracing: 追踪记录
+- async_playwright: 异步 API，多个页面并发采集
+- locator.evaluate_all: 一次往返批量读取所有匹配元素
 """
 
 from __future__ import annotations
 
+import asyncio
 import csv
+import hashlib
+import http.client
 import json
+import mimetypes
+import os
 import random
+import re
+import threading
 import time
-from dataclasses import dataclass, field
+from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator, Callable
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field, fields
 from datetime import datetime
 from pathlib import Path
 from typing import Any
+from urllib.parse import urlsplit
 
 # =============================================================================
 # 数据模型
@@ -76,6 +93,39 @@ class ProductInfo:
         }
 
 
+# dataclass field 默认值工厂函数（使用命名函数而非 lambda）
+# 统一使用 /tmp/playwright_demo 目录
+CRAWLER_DEMO_DIR = Path("/tmp/playwright_demo/crawler")
+
+
+def _default_user_data_dir() -> Path:
+    return CRAWLER_DEMO_DIR / "crawler_profile"
+
+
+def _default_storage_state_file() -> Path:
+    return CRAWLER_DEMO_DIR / "storage_state.json"
+
+
+def _default_output_dir() -> Path:
+    return CRAWLER_DEMO_DIR / "output"
+
+
+def _default_images_dir() -> Path:
+    return CRAWLER_DEMO_DIR / "images"
+
+
+def _default_screenshots_dir() -> Path:
+    return CRAWLER_DEMO_DIR / "screenshots"
+
+
+def _default_traces_dir() -> Path:
+    return CRAWLER_DEMO_DIR / "traces"
+
+
+def _default_viewport() -> dict[str, int]:
+    return {"width": 1920, "height": 1080}
+
+
 @dataclass
 class CrawlerConfig:
     """爬虫配置类"""
@@ -97,7 +147,19 @@ class CrawlerConfig:
     max_pages: int = 5  # 最大翻页数
     max_retries: int = 3  # 最大重试次数
     delay_between_pages: tuple[float, float] = (1.0, 3.0)  # 页面间延迟（秒）
-    delay_between_items: tuple[float, float] = (0.1, 0.5)  # 商品间延迟（秒）
+    delay_between_items: tuple[float, float] = (0.1, 0.5)  # 商品间延迟（秒，仅逐个提取模式）
+    bulk_extract: bool = True  # 一次 evaluate_all 批量提取整页商品（False 则逐个 locator 提取）
+
+    # 异步并发配置（AsyncCrawlEngine 使用）
+    pool_contexts: int = 2  # 浏览器上下文池大小
+    pages_per_context: int = 2  # 每个上下文的页面数（并发度 = 两者相乘）
+    per_host_rps: float = 4.0  # 每个 host 每秒最多请求数（替代阻塞 sleep）
+
+    # 增量导出配置（create_exporter 使用）
+    export_format: str = "jsonl"  # "jsonl" | "csv" | "columnar"
+    export_commit_every_pages: int = 1  # 每 N 页 fsync 一次并更新检查点
+    columnar_batch_rows: int = 10_000  # 列式导出每个分片的行数
+    keep_products_in_memory: bool = True  # 使用导出器时是否仍把商品留在 self.products
 
     # 下载配置
     download_images: bool = True
@@ -117,39 +179,6 @@ class CrawlerConfig:
     timezone_id: str = "Asia/Shanghai"
 
 
-# dataclass field 默认值工厂函数（使用命名函数而非 lambda）
-# 统一使用 /tmp/playwright_demo 目录
-CRAWLER_DEMO_DIR = Path("/tmp/playwright_demo/crawler")
-
-
-def _default_user_data_dir() -> Path:
-    return CRAWLER_DEMO_DIR / "crawler_profile"
-
-
-def _default_storage_state_file() -> Path:
-    return CRAWLER_DEMO_DIR / "storage_state.json"
-
-
-def _default_output_dir() -> Path:
-    return CRAWLER_DEMO_DIR / "output"
-
-
-def _default_images_dir() -> Path:
-    return CRAWLER_DEMO_DIR / "images"
-
-
-def _default_screenshots_dir() -> Path:
-    return CRAWLER_DEMO_DIR / "screenshots"
-
-
-def _default_traces_dir() -> Path:
-    return CRAWLER_DEMO_DIR / "traces"
-
-
-def _default_viewport() -> dict[str, int]:
-    return {"width": 1920, "height": 1080}
-
-
 # =============================================================================
 # 模拟网站（用于演示）
 # =============================================================================
@@ -163,6 +192,7 @@ def create_mock_ecommerce_html(page: int = 1) -> str:
         price = round(random.uniform(10, 1000), 2)
         original_price = round(price * random.uniform(1.1, 1.5), 2) if random.random() > 0.5 else None
         discount = f"{int((1 - price / original_price) * 100)}%" if original_price else None
+        name = f"商品{idx}"
 
         products.append(
             f"""
@@ -187,7 +217,6 @@ def create_mock_ecommerce_html(page: int = 1) -> str:
         </div>
         """
         )
-        name = f"商品{idx}"
 
     return f"""
     <!DOCTYPE html>
@@ -234,6 +263,522 @@ def create_mock_api_handler():
     return MockAPIHandler()
 
 
+# =============================================================================
+# 文本解析工具（同步 / 异步采集共用）
+# =============================================================================
+
+_DIGITS_RE = re.compile(r"(\d+)")
+
+
+def parse_price(text: str) -> float:
+    """解析 "¥1,299.00" 格式的价格（无法解析时抛出 ValueError）"""
+    return float(text.replace("¥", "").replace(",", "").strip())
+
+
+def parse_sales(text: str) -> int | None:
+    """解析 "月销 1000+" 格式的销量"""
+    match = _DIGITS_RE.search(text)
+    return int(match.group(1)) if match else None
+
+
+def parse_rating(text: str) -> float | None:
+    """解析 "4.8分" 格式的评分"""
+    try:
+        return float(text.replace("分", "").strip())
+    except ValueError:
+        return None
+
+
+# =============================================================================
+# 批量提取（一次 evaluate_all 取回整页所有商品字段）
+# =============================================================================
+
+# 字段声明表：(ProductInfo 字段, 卡片内 CSS 选择器, 取值方式)
+# 取值方式："text" 取可见元素的 innerText；"attr:<name>" 取属性值
+PRODUCT_FIELD_SPECS: tuple[tuple[str, str, str], ...] = (
+    ("title", ".product-title", "text"),
+    ("price", ".price", "text"),
+    ("original_price", ".original-price", "text"),
+    ("discount", ".discount-badge", "text"),
+    ("image_url", ".product-image img", "attr:data-original"),
+    ("detail_url", ".product-link", "attr:data-url"),
+    ("sales_count", ".sales", "text"),
+    ("rating", ".rating", "text"),
+    ("shop_name", ".shop-name", "text"),
+)
+
+# 在浏览器里按字段表遍历所有卡片，返回 [{字段: 原始字符串 | null}, ...]
+# 注意：只做 DOM 读取，不做解析，解析统一在 Python 侧一次完成
+BULK_EXTRACT_JS = """
+(cards, specs) => cards.map((card) => {
+    const row = {};
+    for (const [name, selector, how] of specs) {
+        const el = card.querySelector(selector);
+        if (!el) {
+            row[name] = null;
+        } else if (how === "text") {
+            const visible = el.getClientRects().length > 0;
+            const text = visible ? el.innerText.trim() : "";
+            row[name] = text || null;
+        } else {
+            row[name] = el.getAttribute(how.slice(5));
+        }
+    }
+    return row;
+})
+"""
+
+
+def product_from_row(row: dict[str, str | None]) -> ProductInfo | None:
+    """把 evaluate_all 返回的一行原始字符串解析为 ProductInfo（价格缺失/非法时返回 None）"""
+    try:
+        price = parse_price(row["price"] or "")
+    except ValueError:
+        return None
+
+    original_price = None
+    if row.get("original_price"):
+        try:
+            original_price = parse_price(row["original_price"])
+        except ValueError:
+            pass
+
+    sales_text = row.get("sales_count")
+    rating_text = row.get("rating")
+    return ProductInfo(
+        title=row.get("title") or "无标题",
+        price=price,
+        original_price=original_price,
+        discount=row.get("discount"),
+        image_url=row.get("image_url"),
+        detail_url=row.get("detail_url"),
+        sales_count=parse_sales(sales_text) if sales_text else None,
+        rating=parse_rating(rating_text) if rating_text else None,
+        shop_name=row.get("shop_name"),
+    )
+
+
+def products_from_rows(rows: list[dict[str, str | None]]) -> list[ProductInfo]:
+    """一次遍历解析整页原始行，跳过无法解析的商品"""
+    products = []
+    for row in rows:
+        product = product_from_row(row)
+        if product:
+            products.append(product)
+    return products
+
+
+# =============================================================================
+# 图片下载器（并发 + 内容去重 + 断点续传）
+# =============================================================================
+
+
+@dataclass
+class DownloadStats:
+    """一次下载任务的统计"""
+
+    requested: int = 0  # 传入的 URL 数（含重复）
+    unique: int = 0  # 去重后的 URL 数
+    resumed: int = 0  # manifest 中已有、直接跳过的 URL
+    downloaded: int = 0  # 本次实际下载的 URL
+    deduplicated: int = 0  # 内容与已有文件相同、未新增文件的 URL
+    failed: int = 0
+    bytes_written: int = 0
+
+
+class _KeepAliveConnections:
+    """按线程复用的 HTTP 长连接池：每个工作线程对每个 host 只保留一条连接"""
+
+    def __init__(self, timeout: float):
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def get(self, scheme: str, netloc: str) -> http.client.HTTPConnection:
+        conns: dict[tuple[str, str], http.client.HTTPConnection] = self._local.__dict__.setdefault("conns", {})
+        key = (scheme, netloc)
+        conn = conns.get(key)
+        if conn is None:
+            conn_cls = http.client.HTTPSConnection if scheme == "https" else http.client.HTTPConnection
+            conn = conn_cls(netloc, timeout=self.timeout)
+            conns[key] = conn
+        return conn
+
+    def discard(self, scheme: str, netloc: str) -> None:
+        """出错后丢弃连接，下次请求重新建立"""
+        conn = self._local.__dict__.get("conns", {}).pop((scheme, netloc), None)
+        if conn:
+            conn.close()
+
+
+class ImageDownloader:
+    """商品图片下载器
+
+    - 线程池并发（并发数 = CrawlerConfig.max_concurrent_downloads）
+    - 每线程复用 keep-alive 连接，不为每张图片重新握手
+    - 边下载边计算 sha256，按内容哈希存储：相同图片只落盘一份
+    - manifest.jsonl 逐行追加记录 url -> 文件，中断后重跑会跳过已完成的 URL
+    """
+
+    MANIFEST_NAME = "manifest.jsonl"
+
+    def __init__(
+        self,
+        images_dir: Path,
+        max_workers: int = 3,
+        chunk_size: int = 64 * 1024,
+        timeout: float = 30.0,
+        max_retries: int = 3,
+    ):
+        self.images_dir = images_dir
+        self.max_workers = max(1, max_workers)
+        self.chunk_size = chunk_size
+        self.max_retries = max(1, max_retries)
+        self.manifest_path = images_dir / self.MANIFEST_NAME
+        self._connections = _KeepAliveConnections(timeout)
+        self._lock = threading.Lock()
+        self.images_dir.mkdir(parents=True, exist_ok=True)
+        # url -> 相对 images_dir 的文件路径
+        self.completed: dict[str, str] = self._load_manifest()
+
+    def _load_manifest(self) -> dict[str, str]:
+        completed: dict[str, str] = {}
+        if not self.manifest_path.exists():
+            return completed
+        with open(self.manifest_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # 中断时可能写了半行，忽略即可
+                if (self.images_dir / entry["file"]).exists():
+                    completed[entry["url"]] = entry["file"]
+        return completed
+
+    def _record(self, url: str, relative_file: str, sha256: str, size: int) -> None:
+        line = json.dumps({"url": url, "file": relative_file, "sha256": sha256, "bytes": size}, ensure_ascii=False)
+        with self._lock:
+            self.completed[url] = relative_file
+            with open(self.manifest_path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+    def _fetch_to_temp(self, url: str, temp_path: Path) -> tuple[str, int, str]:
+        """流式下载到临时文件，返回 (sha256, 字节数, 扩展名)"""
+        parts = urlsplit(url)
+        target = parts.path or "/"
+        if parts.query:
+            target += f"?{parts.query}"
+
+        conn = self._connections.get(parts.scheme, parts.netloc)
+        try:
+            conn.request("GET", target, headers={"Accept": "image/*", "Connection": "keep-alive"})
+            response = conn.getresponse()
+            if response.status != 200:
+                response.read()  # 读完响应体，连接才能继续复用
+                raise OSError(f"HTTP {response.status}")
+
+            digest = hashlib.sha256()
+            size = 0
+            with open(temp_path, "wb") as f:
+                while chunk := response.read(self.chunk_size):
+                    digest.update(chunk)
+                    f.write(chunk)
+                    size += len(chunk)
+        except (OSError, http.client.HTTPException):
+            self._connections.discard(parts.scheme, parts.netloc)
+            temp_path.unlink(missing_ok=True)
+            raise
+
+        content_type = response.getheader("Content-Type", "").split(";")[0].strip()
+        suffix = mimetypes.guess_extension(content_type) or Path(parts.path).suffix or ".bin"
+        return digest.hexdigest(), size, suffix
+
+    def _download_one(self, url: str) -> str:
+        """下载单个 URL，返回 "downloaded" 或 "deduplicated" """
+        temp_path = self.images_dir / f".{hashlib.sha1(url.encode()).hexdigest()}.part"
+        for attempt in range(1, self.max_retries + 1):
+            try:
+                sha256, size, suffix = self._fetch_to_temp(url, temp_path)
+                break
+            except (OSError, http.client.HTTPException):
+                if attempt == self.max_retries:
+                    raise
+                time.sleep(0.2 * attempt)
+
+        # 按内容哈希分目录存储：ab/abcdef....jpg
+        relative_file = f"{sha256[:2]}/{sha256}{suffix}"
+        final_path = self.images_dir / relative_file
+        final_path.parent.mkdir(exist_ok=True)
+        with self._lock:
+            duplicate = final_path.exists()
+            if duplicate:
+                temp_path.unlink()
+            else:
+                temp_path.replace(final_path)
+        self._record(url, relative_file, sha256, size)
+        return "deduplicated" if duplicate else "downloaded"
+
+    def download_all(self, urls: list[str]) -> DownloadStats:
+        """并发下载一批 URL（自动去重、跳过 manifest 中已完成的）"""
+        stats = DownloadStats(requested=len(urls))
+        unique_urls = list(dict.fromkeys(u for u in urls if u))
+        stats.unique = len(unique_urls)
+
+        pending = [u for u in unique_urls if u not in self.completed]
+        stats.resumed = stats.unique - len(pending)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="img") as executor:
+            futures = {executor.submit(self._download_one, url): url for url in pending}
+            for future in as_completed(futures):
+                try:
+                    outcome = future.result()
+                except Exception as exc:
+                    stats.failed += 1
+                    print(f"下载失败: {futures[future]} ({exc})")
+                    continue
+                if outcome == "downloaded":
+                    stats.downloaded += 1
+                    stats.bytes_written += (self.images_dir / self.completed[futures[future]]).stat().st_size
+                else:
+                    stats.deduplicated += 1
+        return stats
+
+    def path_for(self, url: str) -> Path | None:
+        """查询某个 URL 对应的本地文件"""
+        relative_file = self.completed.get(url)
+        return self.images_dir / relative_file if relative_file else None
+
+
+# =============================================================================
+# 流式增量导出（JSONL / CSV / 列式批量）
+# =============================================================================
+
+PRODUCT_COLUMNS: tuple[str, ...] = tuple(f.name for f in fields(ProductInfo))
+
+
+class ExportCheckpoint:
+    """导出检查点：记录已落盘的页码、文件偏移和行数（原子替换写入）"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.pages: set[int] = set()
+        self.offset = 0  # 行式导出为文件字节偏移；列式导出为已写批次数
+        self.rows = 0
+        if path.exists():
+            data = json.loads(path.read_text(encoding="utf-8"))
+            self.pages = set(data["pages"])
+            self.offset = data["offset"]
+            self.rows = data["rows"]
+
+    def save(self) -> None:
+        data = {
+            "pages": sorted(self.pages),
+            "last_page": max(self.pages, default=None),
+            "offset": self.offset,
+            "rows": self.rows,
+            "updated_at": datetime.now().isoformat(),
+        }
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        tmp_path.write_text(json.dumps(data), encoding="utf-8")
+        os.replace(tmp_path, self.path)
+
+
+class PageExporter(ABC):
+    """逐页导出器基类
+
+    write_page() 每来一页就写出该页的行；每 commit_every_pages 页执行一次
+    flush + fsync 并更新检查点。重新打开时把文件截断到检查点偏移，
+    丢弃崩溃前写了一半、尚未提交的页面，所以崩溃最多丢失未提交的页。
+    """
+
+    suffix = ""
+
+    def __init__(self, path: Path, commit_every_pages: int = 1):
+        self.path = path
+        self.commit_every_pages = max(1, commit_every_pages)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.checkpoint = ExportCheckpoint(path.with_name(path.name + ".ckpt.json"))
+        self.rows = self.checkpoint.rows
+        self._pending_pages: list[int] = []
+        self._pending_rows = 0
+        self._open()
+
+    @property
+    def completed_pages(self) -> set[int]:
+        """已提交（可安全跳过）的页码"""
+        return self.checkpoint.pages
+
+    def write_page(self, page_num: int, products: list[ProductInfo]) -> None:
+        if page_num in self.checkpoint.pages:
+            return
+        self._write_rows([p.to_dict() for p in products])
+        self._pending_pages.append(page_num)
+        self._pending_rows += len(products)
+        if self._should_commit():
+            self.commit()
+
+    def _should_commit(self) -> bool:
+        """攒够多少再提交；行式导出按页数，列式导出按行数"""
+        return len(self._pending_pages) >= self.commit_every_pages
+
+    def commit(self) -> None:
+        """持久化已写出的页并推进检查点"""
+        if not self._pending_pages:
+            return
+        self.checkpoint.offset = self._sync()
+        self.checkpoint.pages.update(self._pending_pages)
+        self.rows += self._pending_rows
+        self.checkpoint.rows = self.rows
+        self.checkpoint.save()
+        self._pending_pages.clear()
+        self._pending_rows = 0
+
+    def close(self) -> None:
+        self.commit()
+        self._close()
+
+    def __enter__(self) -> PageExporter:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    # 子类实现：缺任何一个，实例化时就报 TypeError，而不是导出到一半才失败
+    @abstractmethod
+    def _open(self) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def _write_rows(self, rows: list[dict[str, Any]]) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def _sync(self) -> int:
+        raise NotImplementedError
+
+    @abstractmethod
+    def _close(self) -> None:
+        raise NotImplementedError
+
+
+class _LineFileExporter(PageExporter):
+    """行式文件导出的公共逻辑：截断到检查点偏移后追加写"""
+
+    def _open(self) -> None:
+        if self.path.exists():
+            os.truncate(self.path, self.checkpoint.offset)
+        self._file = self._open_append()
+
+    @abstractmethod
+    def _open_append(self) -> Any:
+        raise NotImplementedError
+
+    def _sync(self) -> int:
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        return self._file.tell()
+
+    def _close(self) -> None:
+        self._file.close()
+
+
+class JsonLinesExporter(_LineFileExporter):
+    """JSON Lines：每个商品一行，内存中只保留当前页"""
+
+    suffix = ".jsonl"
+
+    def _open_append(self) -> Any:
+        return open(self.path, "ab")
+
+    def _write_rows(self, rows: list[dict[str, Any]]) -> None:
+        # 整页拼成一次 write，减少系统调用
+        self._file.write(b"".join(json.dumps(row, ensure_ascii=False).encode("utf-8") + b"\n" for row in rows))
+
+
+class CsvExporter(_LineFileExporter):
+    """CSV：首次创建时写表头，之后逐页追加"""
+
+    suffix = ".csv"
+
+    def _open_append(self) -> Any:
+        f = open(self.path, "a", newline="", encoding="utf-8-sig")
+        self._writer = csv.DictWriter(f, fieldnames=PRODUCT_COLUMNS)
+        if self.checkpoint.offset == 0:
+            self._writer.writeheader()
+        return f
+
+    def _write_rows(self, rows: list[dict[str, Any]]) -> None:
+        self._writer.writerows(rows)
+
+
+class ColumnarBatchExporter(PageExporter):
+    """列式批量导出：按列缓冲，攒够 batch_rows 行写出一个分片文件
+
+    已安装 pyarrow 时写 Parquet 分片；否则写列式 JSON 分片（{列名: [值...]}），
+    两者都可以直接用 pandas 读取合并。检查点只在分片落盘后推进。
+    """
+
+    suffix = ".parts"
+
+    def __init__(self, path: Path, batch_rows: int = 10_000):
+        self.batch_rows = max(1, batch_rows)
+        self._columns: dict[str, list[Any]] = {name: [] for name in PRODUCT_COLUMNS}
+        super().__init__(path, commit_every_pages=1)
+
+    def _open(self) -> None:
+        self.path.mkdir(parents=True, exist_ok=True)
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            self._use_parquet = False
+        else:
+            self._use_parquet = True
+
+    def _should_commit(self) -> bool:
+        return self._pending_rows >= self.batch_rows
+
+    def _write_rows(self, rows: list[dict[str, Any]]) -> None:
+        # 行转列追加到缓冲区，真正落盘在 _sync 写分片时
+        for name, values in self._columns.items():
+            values.extend(row[name] for row in rows)
+
+    def _sync(self) -> int:
+        part_index = self.checkpoint.offset
+        if self._use_parquet:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            part_file = self.path / f"part-{part_index:05d}.parquet"
+            pq.write_table(pa.table(self._columns), part_file)
+        else:
+            part_file = self.path / f"part-{part_index:05d}.json"
+            with open(part_file, "w", encoding="utf-8") as f:
+                json.dump(self._columns, f, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+        for values in self._columns.values():
+            values.clear()
+        return part_index + 1
+
+    def _close(self) -> None:
+        return
+
+
+EXPORTERS: dict[str, type[PageExporter]] = {
+    "jsonl": JsonLinesExporter,
+    "csv": CsvExporter,
+    "columnar": ColumnarBatchExporter,
+}
+
+
+def create_exporter(config: CrawlerConfig, run_name: str = "products") -> PageExporter:
+    """按配置创建导出器；相同 run_name 再次运行会从检查点续写"""
+    exporter_cls = EXPORTERS[config.export_format]
+    path = config.output_dir / f"{run_name}{exporter_cls.suffix}"
+    if exporter_cls is ColumnarBatchExporter:
+        return ColumnarBatchExporter(path, batch_rows=config.columnar_batch_rows)
+    return exporter_cls(path, commit_every_pages=config.export_commit_every_pages)
+
+
 # =============================================================================
 # 爬虫核心类
 # =============================================================================
@@ -432,6 +977,13 @@ class ECommerceCrawler:
 
         # 定位所有商品
         products_locator = self.page.locator(".product-item")
+
+        if self.config.bulk_extract:
+            # 批量模式：整页商品一次 IPC 往返
+            products = self._extract_products_bulk(products_locator)
+            print(f"批量提取 {len(products)} 个商品")
+            return products
+
         count = products_locator.count()
         print(f"找到 {count} 个商品")
 
@@ -453,8 +1005,13 @@ class ECommerceCrawler:
 
         return products
 
+    def _extract_products_bulk(self, products_locator: Any) -> list[ProductInfo]:
+        """批量提取：一次 evaluate_all 读取所有卡片的全部字段，再在 Python 侧统一解析"""
+        rows = products_locator.evaluate_all(BULK_EXTRACT_JS, PRODUCT_FIELD_SPECS)
+        return products_from_rows(rows)
+
     def _extract_product_info(self, locator: Any) -> ProductInfo | None:
-        """从商品元素中提取信息"""
+        """从商品元素中提取信息（逐字段 locator 调用，每个商品约 15 次往返）"""
         try:
             # 等待元素可见
             locator.wait_for(state="visible", timeout=5000)
@@ -465,15 +1022,14 @@ class ECommerceCrawler:
 
             # 提取价格
             price_text = locator.locator(".price").first.inner_text()
-            price = float(price_text.replace("¥", "").replace(",", "").strip())
+            price = parse_price(price_text)
 
             # 提取原价
             original_price_elem = locator.locator(".original-price").first
             original_price = None
             if original_price_elem.is_visible():
                 try:
-                    original_price_text = original_price_elem.inner_text()
-                    original_price = float(original_price_text.replace("¥", "").replace(",", "").strip())
+                    original_price = parse_price(original_price_elem.inner_text())
                 except ValueError:
                     pass
 
@@ -493,19 +1049,13 @@ class ECommerceCrawler:
             sales_elem = locator.locator(".sales").first
             sales_count = None
             if sales_elem.is_visible():
-                sales_text = sales_elem.inner_text()
-                # 解析 "月销 1000+" 格式
-                import re
-                match = re.search(r'(\d+)', sales_text)
-                if match:
-                    sales_count = int(match.group(1))
+                sales_count = parse_sales(sales_elem.inner_text())
 
             # 提取评分
             rating_elem = locator.locator(".rating").first
             rating = None
             if rating_elem.is_visible():
-                rating_text = rating_elem.inner_text()
-                rating = float(rating_text.replace("分", ""))
+                rating = parse_rating(rating_elem.inner_text())
 
             # 提取店铺名称
             shop_elem = locator.locator(".shop-name").first
@@ -527,16 +1077,23 @@ class ECommerceCrawler:
             print(f"提取商品信息失败: {exc}")
             return None
 
-    def scrape_all_pages(self) -> list[ProductInfo]:
-        """采集所有页面"""
+    def scrape_all_pages(self, exporter: PageExporter | None = None) -> list[ProductInfo]:
+        """采集所有页面；传入 exporter 时每页采集完立即写出，并跳过检查点中已完成的页"""
         print(f"\n== 开始采集，共 {self.config.max_pages} 页 ==")
 
         all_products = []
+        keep_in_memory = exporter is None or self.config.keep_products_in_memory
 
         for page_num in range(1, self.config.max_pages + 1):
+            if exporter and page_num in exporter.completed_pages:
+                print(f"第 {page_num} 页已在检查点中，跳过")
+                continue
             try:
                 products = self.scrape_page(page_num)
-                all_products.extend(products)
+                if exporter:
+                    exporter.write_page(page_num, products)
+                if keep_in_memory:
+                    all_products.extend(products)
                 print(f"第 {page_num} 页采集完成，获得 {len(products)} 个商品")
 
                 # 截图保存（调试用）
@@ -557,49 +1114,26 @@ class ECommerceCrawler:
     # 图片下载
     # -------------------------------------------------------------------------
 
-    def download_images(self) -> None:
-        """下载商品图片"""
+    def download_images(self) -> DownloadStats | None:
+        """下载商品图片（并发、按内容去重、可断点续传）"""
         if not self.config.download_images:
             print("图片下载已禁用")
-            return
-
-        print(f"\n== 开始下载图片，共 {len(self.products)} 个商品 ==")
-
-        downloaded = 0
-        skipped = 0
-        failed = 0
-
-        for idx, product in enumerate(self.products):
-            if not product.image_url:
-                skipped += 1
-                continue
-
-            try:
-                # 构建文件名
-                filename = f"product_{idx+1}_{int(datetime.now().timestamp())}.jpg"
-                filepath = self.config.images_dir / filename
-
-                # 下载图片
-                # 实际项目中可以使用 page.goto() + expect_download()
-                # 这里模拟下载
-                print(f"下载 [{idx+1}/{len(self.products)}]: {product.title[:20]}... -> {filename}")
-
-                # 模拟下载延迟
-                time.sleep(random.uniform(0.1, 0.3))
-
-                # 在实际项目中，可以使用以下代码：
-                # response = self.page.goto(product.image_url)
-                # if response:
-                #     with open(filepath, 'wb') as f:
-                #         f.write(response.body())
-
-                downloaded += 1
+            return None
 
-            except Exception as exc:
-                print(f"下载失败: {exc}")
-                failed += 1
+        urls = [p.image_url for p in self.products if p.image_url]
+        print(f"\n== 开始下载图片，共 {len(self.products)} 个商品，{len(urls)} 个图片 URL ==")
 
-        print(f"\n下载完成: 成功 {downloaded}, 跳过 {skipped}, 失败 {failed}")
+        downloader = ImageDownloader(
+            self.config.images_dir,
+            max_workers=self.config.max_concurrent_downloads,
+            max_retries=self.config.max_retries,
+        )
+        stats = downloader.download_all(urls)
+        print(
+            f"\n下载完成: 新下载 {stats.downloaded}, 内容重复 {stats.deduplicated}, "
+            f"续传跳过 {stats.resumed}, 失败 {stats.failed}, 写入 {stats.bytes_written} 字节"
+        )
+        return stats
 
     # -------------------------------------------------------------------------
     # 数据保存
@@ -700,6 +1234,288 @@ class ECommerceCrawler:
         print("浏览器已关闭")
 
 
+# =============================================================================
+# 异步并发采集引擎
+# =============================================================================
+
+
+class HostRateLimiter:
+    """按 host 限速器：为每个请求预约一个发送时间槽，用 asyncio.sleep 等待。
+
+    与同步版的 time.sleep 不同，等待期间事件循环仍在驱动其他页面，
+    浏览器不会因为"人工延迟"而空转。
+    """
+
+    def __init__(self, rate_per_second: float, jitter: float = 0.2):
+        self.interval = 1.0 / rate_per_second if rate_per_second > 0 else 0.0
+        self.jitter = jitter
+        self._next_slot: dict[str, float] = {}
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, url: str) -> float:
+        """等待直到该 host 允许发出下一个请求，返回实际等待秒数"""
+        host = urlsplit(url).netloc
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            now = loop.time()
+            slot = max(now, self._next_slot.get(host, now))
+            # 预约下一个时间槽（带抖动，避免固定节奏被识别）
+            spacing = self.interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+            self._next_slot[host] = slot + spacing
+        delay = slot - now
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return delay
+
+
+class AsyncCrawlEngine:
+    """异步多页并发采集引擎
+
+    - 启动一个浏览器，创建 pool_contexts 个上下文，每个上下文 pages_per_context 个页面
+    - 页面放进 asyncio.Queue 组成页面池，worker 借出页面 -> 采集 -> 归还
+    - 按 host 限速替代 time.sleep
+    - stream() 每完成一页就产出 (page_num, products)，不必等全部页面结束
+    """
+
+    def __init__(self, config: CrawlerConfig):
+        self.config = config
+        self.rate_limiter = HostRateLimiter(config.per_host_rps)
+        self.stats: dict[str, float] = {"pages": 0, "failed_pages": 0, "products": 0, "rate_wait": 0.0}
+        self._playwright: Any | None = None
+        self._browser: Any | None = None
+        self._contexts: list[Any] = []
+        self._page_pool: asyncio.Queue[Any] | None = None
+
+    @property
+    def concurrency(self) -> int:
+        return max(1, self.config.pool_contexts) * max(1, self.config.pages_per_context)
+
+    async def start(self) -> None:
+        """启动浏览器并预热上下文/页面池"""
+        from playwright.async_api import async_playwright
+
+        self._playwright = await async_playwright().start()
+        self._browser = await self._playwright.chromium.launch(
+            headless=self.config.headless,
+            args=["--disable-blink-features=AutomationControlled", "--disable-dev-shm-usage"],
+        )
+
+        context_args: dict[str, Any] = {
+            "viewport": self.config.viewport,
+            "user_agent": self.config.user_agent,
+            "locale": self.config.locale,
+            "timezone_id": self.config.timezone_id,
+            "ignore_https_errors": True,
+        }
+        # 复用同步版保存的登录状态，所有上下文共享同一会话
+        if self.config.storage_state_file.exists():
+            context_args["storage_state"] = str(self.config.storage_state_file)
+
+        self._page_pool = asyncio.Queue()
+        for _ in range(max(1, self.config.pool_contexts)):
+            context = await self._browser.new_context(**context_args)
+            context.set_default_navigation_timeout(60000)
+            context.set_default_timeout(30000)
+            self._contexts.append(context)
+            for _ in range(max(1, self.config.pages_per_context)):
+                self._page_pool.put_nowait(await context.new_page())
+
+        print(f"异步引擎已启动: {len(self._contexts)} 个上下文, 并发页面 {self.concurrency}")
+
+    async def close(self) -> None:
+        """关闭所有上下文和浏览器"""
+        for context in self._contexts:
+            await context.close()
+        self._contexts.clear()
+        if self._browser:
+            await self._browser.close()
+        if self._playwright:
+            await self._playwright.stop()
+
+    async def scrape_page(self, page: Any, page_num: int) -> list[ProductInfo]:
+        """用池中的一个页面采集单页商品"""
+        url = f"{self.config.base_url}/search?page={page_num}"
+        self.stats["rate_wait"] += await self.rate_limiter.acquire(url)
+
+        # 与同步版一致，用 set_content 模拟；实际项目改为 await page.goto(url)
+        await page.set_content(create_mock_ecommerce_html(page_num))
+        await page.wait_for_load_state("networkidle")
+
+        items = page.locator(".product-item")
+        if self.config.bulk_extract:
+            rows = await items.evaluate_all(BULK_EXTRACT_JS, PRODUCT_FIELD_SPECS)
+            return products_from_rows(rows)
+
+        products: list[ProductInfo] = []
+        for i in range(await items.count()):
+            product = await self._extract_product_info(items.nth(i))
+            if product:
+                products.append(product)
+        return products
+
+    async def _extract_product_info(self, locator: Any) -> ProductInfo | None:
+        """异步版商品信息提取（字段与 ECommerceCrawler._extract_product_info 一致）"""
+
+        async def text_of(selector: str) -> str | None:
+            elem = locator.locator(selector).first
+            return await elem.inner_text() if await elem.is_visible() else None
+
+        async def attr_of(selector: str, name: str) -> str | None:
+            elem = locator.locator(selector).first
+            return await elem.get_attribute(name) if await elem.count() else None
+
+        try:
+            price_text = await text_of(".price")
+            if price_text is None:
+                return None
+            original_price_text = await text_of(".original-price")
+            try:
+                original_price = parse_price(original_price_text) if original_price_text else None
+            except ValueError:
+                original_price = None
+            sales_text = await text_of(".sales")
+            rating_text = await text_of(".rating")
+
+            return ProductInfo(
+                title=await text_of(".product-title") or "无标题",
+                price=parse_price(price_text),
+                original_price=original_price,
+                discount=await text_of(".discount-badge"),
+                image_url=await attr_of(".product-image img", "data-original"),
+                detail_url=await attr_of(".product-link", "data-url"),
+                sales_count=parse_sales(sales_text) if sales_text else None,
+                rating=parse_rating(rating_text) if rating_text else None,
+                shop_name=await text_of(".shop-name"),
+            )
+        except Exception as exc:
+            print(f"提取商品信息失败: {exc}")
+            return None
+
+    async def _worker(
+        self,
+        jobs: asyncio.Queue[int],
+        results: asyncio.Queue[tuple[int, list[ProductInfo] | None]],
+    ) -> None:
+        """worker：取页码 -> 借页面 -> 采集（带重试）-> 归还页面 -> 投递结果"""
+        assert self._page_pool is not None
+        while True:
+            try:
+                page_num = jobs.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+
+            page = await self._page_pool.get()
+            products: list[ProductInfo] | None = None
+            try:
+                for attempt in range(1, self.config.max_retries + 1):
+                    try:
+                        products = await self.scrape_page(page, page_num)
+                        break
+                    except Exception as exc:
+                        print(f"采集第 {page_num} 页失败（第 {attempt} 次）: {exc}")
+            finally:
+                self._page_pool.put_nowait(page)
+            await results.put((page_num, products))
+
+    async def stream(self, page_nums: list[int]) -> AsyncIterator[tuple[int, list[ProductInfo]]]:
+        """并发采集多页，按完成顺序逐页产出结果"""
+        if self._page_pool is None:
+            raise RuntimeError("请先调用 start() 启动引擎")
+
+        jobs: asyncio.Queue[int] = asyncio.Queue()
+        for page_num in page_nums:
+            jobs.put_nowait(page_num)
+        # 结果队列有界：消费端处理慢时 worker 会自然减速，内存不会堆积
+        results: asyncio.Queue[tuple[int, list[ProductInfo] | None]] = asyncio.Queue(maxsize=self.concurrency * 2)
+
+        workers = [
+            asyncio.create_task(self._worker(jobs, results))
+            for _ in range(min(self.concurrency, len(page_nums)))
+        ]
+        try:
+            for _ in range(len(page_nums)):
+                page_num, products = await results.get()
+                if products is None:
+                    self.stats["failed_pages"] += 1
+                    continue
+                self.stats["pages"] += 1
+                self.stats["products"] += len(products)
+                yield page_num, products
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+    async def run(
+        self,
+        page_nums: list[int] | None = None,
+        on_page: Callable[[int, list[ProductInfo]], None] | None = None,
+    ) -> list[ProductInfo]:
+        """采集并汇总全部商品；on_page 可用于边采集边落盘"""
+        if page_nums is None:
+            page_nums = list(range(1, self.config.max_pages + 1))
+
+        all_products: list[ProductInfo] = []
+        started = time.perf_counter()
+        await self.start()
+        try:
+            async for page_num, products in self.stream(page_nums):
+                print(f"[async] 第 {page_num} 页完成，获得 {len(products)} 个商品")
+                all_products.extend(products)
+                if on_page:
+                    on_page(page_num, products)
+        finally:
+            await self.close()
+
+        elapsed = time.perf_counter() - started
+        print(
+            f"[async] 完成 {self.stats['pages']:.0f} 页（失败 {self.stats['failed_pages']:.0f}），"
+            f"{len(all_products)} 个商品，耗时 {elapsed:.2f}s，限速等待累计 {self.stats['rate_wait']:.2f}s"
+        )
+        return all_products
+
+
+# =============================================================================
+# 图片下载器本地演示（http.server 充当图片 CDN）
+# =============================================================================
+
+
+def demo_image_downloader(config: CrawlerConfig) -> None:
+    """用本地 http.server 演示：并发下载、内容去重、重跑时断点续传"""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    png = create_mock_api_handler().handle_image_request("")[0]
+
+    class ImageHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # 支持 keep-alive
+
+        def do_GET(self) -> None:  # noqa: N802
+            # /img/<n>.png：n 为偶数时返回同一张图，模拟不同 URL 相同内容
+            idx = int(Path(self.path).stem)
+            body = png if idx % 2 == 0 else png + idx.to_bytes(4, "big")
+            self.send_response(200)
+            self.send_header("Content-Type", "image/png")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: object) -> None:
+            return
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ImageHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    try:
+        images_dir = config.images_dir / "demo"
+        urls = [f"{base}/img/{i}.png" for i in range(20)] * 2  # 每个 URL 出现两次
+        downloader = ImageDownloader(images_dir, max_workers=config.max_concurrent_downloads)
+        print("第一次运行:", downloader.download_all(urls))
+        # 新实例只从 manifest 恢复状态，模拟进程重启后的续传
+        print("重跑（续传）:", ImageDownloader(images_dir).download_all(urls))
+    finally:
+        server.shutdown()
+
+
 # =============================================================================
 # 主程序
 # =============================================================================
@@ -739,15 +1555,18 @@ def main() -> None:
         # 4. 登录（演示中跳过，实际项目中可能需要）
         print("\n[演示] 跳过登录步骤")
 
-        # 5. 采集商品
-        products = crawler.scrape_all_pages()
+        # 5. 采集商品（逐页增量写出 JSONL，崩溃后重跑会从检查点续写）
+        with create_exporter(config, run_name=f"products_{datetime.now():%Y%m%d}") as exporter:
+            products = crawler.scrape_all_pages(exporter=exporter)
+        print(f"增量导出: {exporter.path}（累计 {exporter.rows} 行）")
 
         # 6. 保存数据
         crawler.save_to_json()
         crawler.save_to_csv()
 
-        # 7. 下载图片（演示中禁用）
+        # 7. 下载图片（演示中禁用；商品图片 URL 是虚构域名，改用本地服务演示下载器）
         # crawler.download_images()
+        demo_image_downloader(config)
 
         # 8. 停止 Trace 记录
         crawler.stop_tracing()
@@ -774,6 +1593,7 @@ def main() -> None:
         if crawler.products:
             crawler.save_to_json()
             crawler.save_to_csv()
+        return
     except Exception as exc:
         print(f"\n发生错误: {exc}")
         import traceback
@@ -782,6 +1602,13 @@ def main() -> None:
         # 清理资源
         crawler.close()
 
+    # 10. 异步并发引擎（同样的页数，多页同时采集）
+    # 必须在 crawler.close() 之后：sync_playwright 存活期间已有事件循环，asyncio.run() 会报错；
+    # 放在 try 外面，引擎出错时直接抛出而不是被上面的 except 吞掉
+    print("\n== 异步并发采集引擎 ==")
+    async_products = asyncio.run(AsyncCrawlEngine(config).run())
+    print(f"异步引擎商品数: {len(async_products)}")
+
 
 if __name__ == "__main__":
     main()
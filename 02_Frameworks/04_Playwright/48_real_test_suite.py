@@ -17,15 +17,17 @@ Author: Lambert
 5. 多浏览器兼容性测试
 6. 移动端设备模拟测试
 7. 测试报告生成
-8. 失败截图和 Trace 记录
+8. 失败截图和 Trace 记录（off / on / retain-on-failure / on-first-retry 保留策略，附采集开销明细）
 9. 数据驱动测试
+10. 并行分片执行（多进程，按历史耗时负载均衡，结果合并进同一份报告）
 
 ## 涉及的 Playwright API
 - browser.new_context: 创建隔离测试环境
 - expect: 各种断言方法
 - set_input_files: 文件上传
 - expect_dialog: 处理弹窗
-- tracing.start/stop: 记录测试 trace
+- tracing.start/start_chunk/stop_chunk: 按保留策略记录测试 trace
+- record_video_dir / video.path: 按保留策略录制视频
 - devices: 模拟移动设备
 - locator: 元素定位和操作
 - wait_for: 等待条件
@@ -36,8 +38,16 @@ Author: Lambert
 from __future__ import annotations
 
 import dataclasses
+import heapq
 import json
+import multiprocessing
+import os
+import shutil
+import statistics
+import tempfile
+import time
 import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
@@ -57,6 +67,32 @@ class TestStatus(Enum):
     ERROR = "error"
 
 
+class CaptureMode(Enum):
+    """Trace / 视频的保留策略（与 pytest-playwright 的 --tracing / --video 取值一致）"""
+    OFF = "off"  # 不录制
+    ON = "on"  # 每个测试都录制并保留
+    RETAIN_ON_FAILURE = "retain-on-failure"  # 每次都录制，只保留失败的
+    ON_FIRST_RETRY = "on-first-retry"  # 只在第一次重试时录制并保留
+
+    def should_record(self, attempt: int) -> bool:
+        """第 attempt 次执行（0 为首次）是否需要录制"""
+        if self is CaptureMode.OFF:
+            return False
+        if self is CaptureMode.ON_FIRST_RETRY:
+            return attempt == 1
+        return True
+
+    def should_keep(self, attempt: int, failed: bool) -> bool:
+        """录制结束后是否落盘"""
+        if self is CaptureMode.ON:
+            return True
+        if self is CaptureMode.RETAIN_ON_FAILURE:
+            return failed
+        if self is CaptureMode.ON_FIRST_RETRY:
+            return attempt == 1
+        return False
+
+
 @dataclass
 class TestResult:
     """单个测试结果"""
@@ -66,6 +102,9 @@ class TestResult:
     error_message: str | None = None
     screenshot_path: str | None = None
     trace_path: str | None = None
+    video_path: str | None = None
+    attempts: int = 1  # 执行次数（含重试）
+    overhead: dict[str, float] = field(default_factory=dict)  # 采集开销明细（秒）
 
 
 @dataclass
@@ -356,6 +395,10 @@ class WebTestRunner:
         screenshots_dir: Path | None = None,
         traces_dir: Path | None = None,
         reports_dir: Path | None = None,
+        trace_mode: CaptureMode = CaptureMode.RETAIN_ON_FAILURE,
+        video_mode: CaptureMode = CaptureMode.OFF,
+        retries: int = 0,
+        videos_dir: Path | None = None,
     ):
         # 使用脚本所在目录下的 test_output 子目录
         demo_root = Path(__file__).parent / "test_output"
@@ -364,11 +407,20 @@ class WebTestRunner:
         self.screenshots_dir = screenshots_dir or demo_root / "screenshots"
         self.traces_dir = traces_dir or demo_root / "traces"
         self.reports_dir = reports_dir or demo_root / "reports"
+        self.videos_dir = videos_dir or demo_root / "videos"
 
         # 创建目录
-        for dir_path in [self.screenshots_dir, self.traces_dir, self.reports_dir]:
+        for dir_path in [self.screenshots_dir, self.traces_dir, self.reports_dir, self.videos_dir]:
             dir_path.mkdir(parents=True, exist_ok=True)
 
+        # 采集策略
+        self.trace_mode = trace_mode
+        self.video_mode = video_mode
+        self.retries = retries
+        self._tracing_active = False  # 当前 context 是否已 tracing.start
+        self._context_failed = False  # 当前 context 内是否有测试失败（决定视频去留）
+        self._context_retried = False  # 当前 context 内是否发生过重试
+
         # 测试结果
         self.suite_results: list[TestSuiteResult] = []
         self.playwright: Any = None
@@ -405,7 +457,18 @@ class WebTestRunner:
             if device in devices:
                 context_args = devices[device]
 
+        self.open_context(context_args)
+
+    def open_context(self, context_args: dict[str, Any] | None = None) -> None:
+        """在当前浏览器上创建新的 context 和页面（需要录视频时先录到临时目录）"""
+        context_args = dict(context_args or {})
+        if self.video_mode is not CaptureMode.OFF:
+            context_args["record_video_dir"] = tempfile.mkdtemp(prefix="pw-video-")
+
         self.context = self.browser.new_context(**context_args)
+        self._tracing_active = False
+        self._context_failed = False
+        self._context_retried = False
 
         # 创建页面
         self.page = self.context.new_page()
@@ -413,11 +476,41 @@ class WebTestRunner:
         # 设置默认超时
         self.page.set_default_timeout(10000)
 
+    def close_context(self, result: TestResult | None = None) -> str | None:
+        """关闭当前 context；按视频策略保留或删除视频，返回保留的视频路径
+
+        视频覆盖整个 context 的生命周期，所以按 context 内是否有失败/重试决定去留；
+        传入 result 时（每个测试独立 context）把视频路径和开销记到该测试上。
+        """
+        if not self.context:
+            return None
+        video = self.page.video if self.page and self.video_mode is not CaptureMode.OFF else None
+        if self._tracing_active:
+            self.context.tracing.stop()  # 不传 path：丢弃未导出的数据
+            self._tracing_active = False
+        self.context.close()
+        self.context = None
+
+        kept_path = None
+        if video:
+            started = time.perf_counter()
+            keep = self.video_mode.should_keep(1 if self._context_retried else 0, self._context_failed)
+            temp_path = Path(video.path())
+            if keep:
+                kept_path = str(self.videos_dir / f"{self.current_test_name or 'context'}_{datetime.now():%Y%m%d_%H%M%S}{temp_path.suffix}")
+                shutil.move(temp_path, kept_path)
+            else:
+                temp_path.unlink(missing_ok=True)
+            shutil.rmtree(temp_path.parent, ignore_errors=True)
+            if result is not None:
+                result.video_path = kept_path
+                result.overhead["video_finalize"] = time.perf_counter() - started
+        return kept_path
+
     def teardown_browser(self) -> None:
         """关闭浏览器"""
         if self.context:
-            self.context.close()
-            self.context = None
+            self.close_context()
         if self.browser:
             self.browser.close()
             self.browser = None
@@ -479,56 +572,115 @@ class WebTestRunner:
         return suite_result
 
     def run_single_test(self, test_case: TestCase) -> TestResult:
-        """运行单个测试用例"""
-        import time
-
+        """运行单个测试用例（失败时按 retries 重试），附带采集开销明细"""
         self.current_test_name = test_case.name
-        start_time = time.time()
-
-        # 开始 Trace 记录
-        self.current_trace_file = self.traces_dir / f"{test_case.name}_{datetime.now():%Y%m%d_%H%M%S}.zip"
-        self.context.tracing.start(screenshots=True, snapshots=True)
-
+        overhead: dict[str, float] = {}
+        started = time.perf_counter()
+
+        for attempt in range(self.retries + 1):
+            if attempt > 0:
+                self._context_retried = True
+                mark = time.perf_counter()
+                self._reset_page_state()
+                overhead["retry_reset"] = overhead.get("retry_reset", 0.0) + time.perf_counter() - mark
+            result = self._run_attempt(test_case, attempt, overhead)
+            if result.status == TestStatus.PASSED:
+                break
+
+        if result.status != TestStatus.PASSED:
+            self._context_failed = True
+        result.attempts = attempt + 1
+        result.duration = time.perf_counter() - started
+        result.overhead = overhead
+        return result
+
+    def _reset_page_state(self) -> None:
+        """重试前清掉上一次尝试留下的状态，避免重试"继承"脏数据而假通过/假失败
+
+        不重建 context：那样会打断 context 级的视频录制和 tracing；
+        而是清 cookie/权限、清当前源的 localStorage/sessionStorage、关掉测试额外打开的页面，
+        最后回到 about:blank，让下一次尝试从干净的起点开始。
+        """
+        for extra in self.context.pages:
+            if extra is not self.page:
+                extra.close()
+        self.context.clear_cookies()
+        self.context.clear_permissions()
+        try:
+            self.page.evaluate("() => { localStorage.clear(); sessionStorage.clear(); }")
+        except Exception:
+            pass  # about:blank 等页面无权访问 storage
+        self.page.goto("about:blank")
+
+    def _run_attempt(self, test_case: TestCase, attempt: int, overhead: dict[str, float]) -> TestResult:
+        """执行一次测试；只有策略要求时才录制 Trace，只有需要保留时才导出"""
+        record_trace = self.trace_mode.should_record(attempt)
+        if record_trace:
+            mark = time.perf_counter()
+            if not self._tracing_active:
+                # 每个 context 只 start 一次，之后每个测试一个 chunk
+                self.context.tracing.start(screenshots=True, snapshots=True)
+                self._tracing_active = True
+            self.context.tracing.start_chunk(title=test_case.name)
+            overhead["trace_start"] = overhead.get("trace_start", 0.0) + time.perf_counter() - mark
+
+        start_time = time.perf_counter()
+        status = TestStatus.PASSED
+        error_message = None
+        screenshot_path = None
         try:
             # 执行测试
             test_case.test_func(self)
-
-            duration = time.time() - start_time
-            return TestResult(
-                name=test_case.name,
-                status=TestStatus.PASSED,
-                duration=duration,
-            )
-
         except AssertionError as exc:
-            duration = time.time() - start_time
-            screenshot_path = self._take_failure_screenshot(test_case.name)
-
-            return TestResult(
-                name=test_case.name,
-                status=TestStatus.FAILED,
-                duration=duration,
-                error_message=str(exc),
-                screenshot_path=str(screenshot_path) if screenshot_path else None,
-                trace_path=str(self.current_trace_file) if self.current_trace_file else None,
-            )
-
+            status, error_message = TestStatus.FAILED, str(exc)
         except Exception as exc:
-            duration = time.time() - start_time
-            screenshot_path = self._take_failure_screenshot(test_case.name)
+            status, error_message = TestStatus.ERROR, f"{type(exc).__name__}: {exc}"
+        test_time = time.perf_counter() - start_time
+        overhead["test_body"] = overhead.get("test_body", 0.0) + test_time
 
-            return TestResult(
-                name=test_case.name,
-                status=TestStatus.ERROR,
-                duration=duration,
-                error_message=f"{type(exc).__name__}: {exc}",
-                screenshot_path=str(screenshot_path) if screenshot_path else None,
-                trace_path=str(self.current_trace_file) if self.current_trace_file else None,
-            )
+        failed = status != TestStatus.PASSED
+        if failed:
+            mark = time.perf_counter()
+            screenshot_path = self._take_failure_screenshot(test_case.name)
+            overhead["screenshot"] = overhead.get("screenshot", 0.0) + time.perf_counter() - mark
+
+        trace_path = None
+        if record_trace:
+            mark = time.perf_counter()
+            if self.trace_mode.should_keep(attempt, failed):
+                self.current_trace_file = self.traces_dir / f"{test_case.name}_try{attempt}_{datetime.now():%Y%m%d_%H%M%S}.zip"
+                self.context.tracing.stop_chunk(path=str(self.current_trace_file))
+                trace_path = str(self.current_trace_file)
+                key = "trace_export"
+            else:
+                # 不传 path：chunk 数据直接丢弃，不写磁盘
+                self.context.tracing.stop_chunk()
+                key = "trace_discard"
+            overhead[key] = overhead.get(key, 0.0) + time.perf_counter() - mark
+
+        return TestResult(
+            name=test_case.name,
+            status=status,
+            duration=test_time,
+            error_message=error_message,
+            screenshot_path=str(screenshot_path) if screenshot_path else None,
+            trace_path=trace_path,
+        )
 
-        finally:
-            # 停止 Trace 记录
-            self.context.tracing.stop(path=str(self.current_trace_file))
+    def print_overhead_summary(self) -> None:
+        """汇总所有测试的采集开销：看清 Trace/截图/视频各花了多少时间"""
+        totals: dict[str, float] = {}
+        for suite in self.suite_results:
+            for result in suite.results:
+                for key, value in result.overhead.items():
+                    totals[key] = totals.get(key, 0.0) + value
+        if not totals:
+            return
+        body = totals.get("test_body", 0.0)
+        print(f"\n采集开销明细（trace={self.trace_mode.value}, video={self.video_mode.value}）:")
+        for key, value in sorted(totals.items(), key=lambda kv: kv[1], reverse=True):
+            ratio = f"（相对测试本身 {value / body * 100:.1f}%）" if body and key != "test_body" else ""
+            print(f"  {key:<16} {value:.3f}s{ratio}")
 
     def _take_failure_screenshot(self, test_name: str) -> Path | None:
         """测试失败时截图"""
@@ -611,6 +763,7 @@ class WebTestRunner:
         total_passed = sum(r.passed for r in self.suite_results)
         total_failed = sum(r.failed for r in self.suite_results)
         total_errors = sum(r.errors for r in self.suite_results)
+        total_skipped = sum(r.skipped for r in self.suite_results)
 
         pass_rate = (total_passed / total_tests * 100) if total_tests > 0 else 0
 
@@ -761,6 +914,9 @@ class WebTestRunner:
                             "error_message": result.error_message,
                             "screenshot_path": result.screenshot_path,
                             "trace_path": result.trace_path,
+                            "video_path": result.video_path,
+                            "attempts": result.attempts,
+                            "overhead": result.overhead,
                         }
                         for result in suite.results
                     ],
@@ -951,6 +1107,185 @@ class TabSwitchTests:
         runner.assert_hidden("#login-tab", "登录内容应该隐藏")
 
 
+# =============================================================================
+# 并行分片执行
+# =============================================================================
+
+
+@dataclass
+class SuiteSpec:
+    """并行执行时的套件描述：套件名 + 用例 + 浏览器/设备"""
+    name: str
+    test_cases: list[TestCase]
+    browser_type: str = "chromium"
+    device: str | None = None
+
+
+@dataclass
+class ShardItem:
+    """分配给某个 worker 的单个用例（用例函数按限定名 pickle，需为模块级可导入对象）"""
+    suite_index: int
+    case_index: int
+    suite_name: str
+    test_case: TestCase
+    browser_type: str
+    device: str | None
+    estimated_duration: float = 0.0
+
+    @property
+    def history_key(self) -> str:
+        return f"{self.suite_name}::{self.test_case.name}"
+
+
+def _run_shard(
+    items: list[ShardItem],
+    html: str,
+    headless: bool,
+    dirs: tuple[Path, Path, Path, Path],
+    capture: tuple[CaptureMode, CaptureMode, int],
+) -> list[tuple[int, int, TestResult]]:
+    """worker 进程入口：独立的 playwright + 浏览器，每个用例一个全新 context"""
+    from playwright.sync_api import sync_playwright
+
+    screenshots_dir, traces_dir, reports_dir, videos_dir = dirs
+    trace_mode, video_mode, retries = capture
+    runner = WebTestRunner(
+        headless=headless,
+        screenshots_dir=screenshots_dir,
+        traces_dir=traces_dir,
+        reports_dir=reports_dir,
+        trace_mode=trace_mode,
+        video_mode=video_mode,
+        retries=retries,
+        videos_dir=videos_dir,
+    )
+    runner.playwright = sync_playwright().start()
+    browsers: dict[str, Any] = {}
+    outcomes: list[tuple[int, int, TestResult]] = []
+    try:
+        for item in items:
+            browser = browsers.get(item.browser_type)
+            if browser is None:
+                browser = getattr(runner.playwright, item.browser_type).launch(headless=headless)
+                browsers[item.browser_type] = browser
+            context_args = runner.playwright.devices.get(item.device, {}) if item.device else {}
+
+            runner.browser = browser
+            runner.open_context(context_args)
+            result = None
+            try:
+                runner.page.set_content(html)
+                result = runner.run_single_test(item.test_case)
+            finally:
+                # 每个用例独立 context，视频正好对应这一个用例
+                runner.close_context(result)
+            outcomes.append((item.suite_index, item.case_index, result))
+    finally:
+        for browser in browsers.values():
+            browser.close()
+        runner.playwright.stop()
+    return outcomes
+
+
+class ParallelTestRunner:
+    """把多个套件的用例分片到多个 worker 进程并行执行
+
+    - 每个 worker 进程有自己的 playwright 和浏览器，每个用例一个隔离 context
+    - 按历史耗时做负载均衡（最长处理时间优先的贪心分配），没有历史的用例按中位数估计
+    - 结果按原始套件/用例顺序合并回 TestSuiteResult，沿用 WebTestRunner 的 HTML/JSON 报告
+    """
+
+    def __init__(
+        self,
+        runner: WebTestRunner,
+        html: str,
+        workers: int | None = None,
+        history_file: Path | None = None,
+    ):
+        self.runner = runner
+        self.html = html
+        self.workers = workers or os.cpu_count() or 1
+        self.history_file = history_file or runner.reports_dir / "test_durations.json"
+        self.history: dict[str, float] = (
+            json.loads(self.history_file.read_text(encoding="utf-8")) if self.history_file.exists() else {}
+        )
+
+    def _estimate(self, key: str) -> float:
+        if key in self.history:
+            return self.history[key]
+        return statistics.median(self.history.values()) if self.history else 1.0
+
+    def plan_shards(self, items: list[ShardItem]) -> list[list[ShardItem]]:
+        """LPT 贪心：用例按预计耗时从长到短，依次放进当前总耗时最小的分片"""
+        for item in items:
+            item.estimated_duration = self._estimate(item.history_key)
+        shard_count = max(1, min(self.workers, len(items)))
+        heap = [(0.0, i) for i in range(shard_count)]
+        shards: list[list[ShardItem]] = [[] for _ in range(shard_count)]
+        for item in sorted(items, key=lambda it: it.estimated_duration, reverse=True):
+            load, index = heapq.heappop(heap)
+            shards[index].append(item)
+            heapq.heappush(heap, (load + item.estimated_duration, index))
+        return [shard for shard in shards if shard]
+
+    def _update_history(self, items: list[ShardItem], outcomes: list[tuple[int, int, TestResult]]) -> None:
+        """指数滑动平均更新历史耗时"""
+        by_position = {(it.suite_index, it.case_index): it for it in items}
+        for suite_index, case_index, result in outcomes:
+            key = by_position[(suite_index, case_index)].history_key
+            previous = self.history.get(key)
+            self.history[key] = result.duration if previous is None else 0.7 * previous + 0.3 * result.duration
+        self.history_file.parent.mkdir(parents=True, exist_ok=True)
+        self.history_file.write_text(json.dumps(self.history, ensure_ascii=False, indent=2), encoding="utf-8")
+
+    def run(self, suites: list[SuiteSpec]) -> list[TestSuiteResult]:
+        start_time = datetime.now()
+        items: list[ShardItem] = []
+        skipped: list[tuple[int, int, TestResult]] = []
+        for s_idx, suite in enumerate(suites):
+            for c_idx, case in enumerate(suite.test_cases):
+                if not case.enabled:
+                    skipped.append((s_idx, c_idx, TestResult(name=case.name, status=TestStatus.SKIPPED, duration=0.0)))
+                    continue
+                items.append(ShardItem(s_idx, c_idx, suite.name, case, suite.browser_type, suite.device))
+
+        shards = self.plan_shards(items)
+        print(f"\n并行执行 {len(items)} 个用例，{len(shards)} 个分片：")
+        for i, shard in enumerate(shards):
+            print(f"  分片 {i}: {len(shard)} 个用例，预计 {sum(it.estimated_duration for it in shard):.2f}s")
+
+        dirs = (self.runner.screenshots_dir, self.runner.traces_dir, self.runner.reports_dir, self.runner.videos_dir)
+        capture = (self.runner.trace_mode, self.runner.video_mode, self.runner.retries)
+        outcomes: list[tuple[int, int, TestResult]] = []
+        # spawn：子进程从干净状态启动 playwright，不继承父进程的事件循环/浏览器连接
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=len(shards) or 1, mp_context=ctx) as executor:
+            futures = [
+                executor.submit(_run_shard, shard, self.html, self.runner.headless, dirs, capture)
+                for shard in shards
+            ]
+            for future in as_completed(futures):
+                outcomes.extend(future.result())
+
+        self._update_history(items, outcomes)
+
+        # 按原始顺序合并为各套件结果
+        merged = sorted(outcomes + skipped, key=lambda o: (o[0], o[1]))
+        end_time = datetime.now()
+        suite_results = [
+            TestSuiteResult(suite_name=suite.name, start_time=start_time, end_time=end_time)
+            for suite in suites
+        ]
+        for s_idx, _, result in merged:
+            suite_results[s_idx].add_result(result)
+        self.runner.suite_results.extend(suite_results)
+
+        wall = (end_time - start_time).total_seconds()
+        serial = sum(r.duration for _, _, r in outcomes)
+        print(f"并行耗时 {wall:.2f}s，用例耗时之和 {serial:.2f}s")
+        return suite_results
+
+
 # =============================================================================
 # 主程序
 # =============================================================================
@@ -1043,6 +1378,28 @@ def main() -> None:
             )
             runner.teardown_browser()
 
+        # 并行分片执行：同样的套件，按历史耗时分片到多个进程
+        print("\n" + "="*60)
+        print("并行分片执行")
+        print("="*60)
+
+        # 并行执行顺便演示采集策略：失败重试一次，只在重试时录 Trace，失败用例保留视频
+        parallel_runner = WebTestRunner(
+            headless=True,
+            trace_mode=CaptureMode.ON_FIRST_RETRY,
+            video_mode=CaptureMode.RETAIN_ON_FAILURE,
+            retries=1,
+        )
+        ParallelTestRunner(parallel_runner, html=test_html).run([
+            SuiteSpec("用户认证测试", auth_tests),
+            SuiteSpec("文件上传测试", upload_tests),
+            SuiteSpec("Tab 切换测试", tab_tests),
+            SuiteSpec("移动端测试", mobile_tests, device="iPhone 13"),
+        ])
+        parallel_runner.generate_html_report()
+        parallel_runner.generate_json_report()
+        parallel_runner.print_overhead_summary()
+
         # 生成报告
         print("\n" + "="*60)
         print("生成测试报告")
@@ -1050,6 +1407,7 @@ def main() -> None:
 
         runner.generate_html_report()
         runner.generate_json_report()
+        runner.print_overhead_summary()
 
         # 打印最终汇总
         print("\n" + "="*60)
@@ -11,13 +11,15 @@ Author: Lambert
 
 ## 业务场景
 1. 定期检查多个 URL 的可用性
-2. 视觉回归测试（截图对比）
+2. 视觉回归测试（感知哈希 aHash/dHash + 分块差异，基准指纹缓存）
 3. 性能监控（响应时间、资源加载）
 4. API 健康检查
 5. 关键字内容验证
 6. SSL 证书检查
 7. 错误告警（截图 + Trace 记录）
 8. 监控报告生成
+9. 并发检查调度器（每个目标独立间隔/抖动/超时，页面池限流）
+10. 时序指标库（按天分区列存储 + memmap，滚动 p50/p95/p99、错误率、SLO 消耗速度）
 
 ## 涉及的 Playwright API
 - APIRequestContext: 快速 API 健康检查
@@ -33,18 +35,31 @@ Author: Lambert
 
 from __future__ import annotations
 
+import asyncio
 import dataclasses
 import hashlib
+import heapq
 import json
+import os
+import random
 import smtplib
+import struct
+import threading
+import time
+import zlib
+from collections import Counter, OrderedDict
+from collections.abc import Callable
 from dataclasses import dataclass, field
 from datetime import datetime
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from enum import Enum
+from functools import cached_property
 from pathlib import Path
 from typing import Any
 
+import numpy as np
+
 # =============================================================================
 # 监控结果模型
 # =============================================================================
@@ -116,31 +131,73 @@ class MonitorReport:
     end_time: datetime
     results: list[UrlMonitorResult] = field(default_factory=list)
 
+    @cached_property
+    def _summary(self) -> tuple[Counter[MonitorStatus], float]:
+        """一次遍历得到各状态计数和平均响应时间（报告生成后结果不再变化，只算一次）"""
+        counts: Counter[MonitorStatus] = Counter()
+        total_time = 0.0
+        for r in self.results:
+            counts[r.status] += 1
+            total_time += r.response_time
+        return counts, (total_time / len(self.results) if self.results else 0.0)
+
     @property
     def total_urls(self) -> int:
         return len(self.results)
 
     @property
     def healthy_count(self) -> int:
-        return sum(1 for r in self.results if r.status == MonitorStatus.HEALTHY)
+        return self._summary[0][MonitorStatus.HEALTHY]
 
     @property
     def degraded_count(self) -> int:
-        return sum(1 for r in self.results if r.status == MonitorStatus.DEGRADED)
+        return self._summary[0][MonitorStatus.DEGRADED]
 
     @property
     def unhealthy_count(self) -> int:
-        return sum(1 for r in self.results if r.status == MonitorStatus.UNHEALTHY)
+        return self._summary[0][MonitorStatus.UNHEALTHY]
 
     @property
     def error_count(self) -> int:
-        return sum(1 for r in self.results if r.status == MonitorStatus.ERROR)
+        return self._summary[0][MonitorStatus.ERROR]
 
     @property
     def avg_response_time(self) -> float:
-        if not self.results:
-            return 0.0
-        return sum(r.response_time for r in self.results) / len(self.results)
+        return self._summary[1]
+
+
+# dataclass field 默认值工厂函数（使用命名函数而非 lambda）
+def _monitor_demo_root() -> Path:
+    """获取监控演示根目录（脚本所在目录下的 monitoring_output 子目录）"""
+    return Path(__file__).parent / "monitoring_output"
+
+
+def _monitor_output_dir() -> Path:
+    return _monitor_demo_root()
+
+
+def _monitor_screenshots_dir() -> Path:
+    return _monitor_demo_root() / "screenshots"
+
+
+def _monitor_baselines_dir() -> Path:
+    return _monitor_demo_root() / "baselines"
+
+
+def _monitor_traces_dir() -> Path:
+    return _monitor_demo_root() / "traces"
+
+
+def _monitor_reports_dir() -> Path:
+    return _monitor_demo_root() / "reports"
+
+
+def _monitor_metrics_dir() -> Path:
+    return _monitor_demo_root() / "metrics"
+
+
+def _monitor_viewport() -> dict[str, int]:
+    return {"width": 1920, "height": 1080}
 
 
 @dataclass
@@ -159,12 +216,17 @@ class MonitorConfig:
     baselines_dir: Path = field(default_factory=_monitor_baselines_dir)
     traces_dir: Path = field(default_factory=_monitor_traces_dir)
     reports_dir: Path = field(default_factory=_monitor_reports_dir)
+    metrics_dir: Path = field(default_factory=_monitor_metrics_dir)
 
     # 功能开关
     enable_visual_regression: bool = True  # 启用视觉回归
+    visual_diff_threshold: float = 0.1  # 视觉差异分数超过该值判定为回归（0-1）
+    visual_block_tolerance: int = 12  # 分块平均亮度差的容差（0-255），吸收渲染噪声
+    baseline_cache_size: int = 1024  # 内存中缓存的基准指纹数
     enable_performance_monitoring: bool = True  # 启用性能监控
     enable_keyword_check: bool = True  # 启用关键字检查
     save_trace_on_error: bool = True  # 错误时保存 Trace
+    enable_metrics_store: bool = True  # 结果写入时序指标库（MetricsStore）
 
     # 告警配置
     alert_on_degraded: bool = True  # 性能下降时告警
@@ -176,40 +238,635 @@ class MonitorConfig:
     smtp_password: str = ""
     alert_recipients: list[str] = field(default_factory=list)
 
+    # 并发调度配置（AsyncCheckScheduler 使用）
+    max_concurrent_health_checks: int = 100  # 同时在途的健康检查数
+    max_concurrent_full_checks: int = 4  # 同时打开的浏览器页面数
+    default_check_interval: float = 60.0  # 目标未指定 interval 时的检查间隔（秒）
+    default_check_jitter: float = 0.1  # 间隔抖动比例
+
     # 浏览器配置
     headless: bool = True
     viewport: dict[str, int] = field(default_factory=_monitor_viewport)
     user_agent: str = "Playwright-Monitor/1.0"
 
 
-# dataclass field 默认值工厂函数（使用命名函数而非 lambda）
-def _monitor_demo_root() -> Path:
-    """获取监控演示根目录（脚本所在目录下的 monitoring_output 子目录）"""
-    return Path(__file__).parent / "monitoring_output"
+# =============================================================================
+# 公共工具（同步检查与并发调度器共用）
+# =============================================================================
 
+PERFORMANCE_TIMING_JS = """() => {
+    const timing = performance.timing;
+    const navigation = performance.getEntriesByType('navigation')[0];
+
+    return {
+        dns_lookup: timing.domainLookupEnd - timing.domainLookupStart,
+        connection: timing.connectEnd - timing.connectStart,
+        tls_negotiation: timing.connectEnd - timing.secureConnectionStart,
+        ttfb: timing.responseStart - timing.requestStart,
+        download: timing.responseEnd - timing.responseStart,
+        total: timing.loadEventEnd - timing.navigationStart,
+        dom_content_loaded: timing.domContentLoadedEventEnd - timing.navigationStart,
+        load_complete: timing.loadEventEnd - timing.navigationStart,
+        first_contentful_paint: navigation?.loadEventEnd,  // 简化
+    };
+}"""
+
+RESOURCE_STATS_JS = """() => {
+    const resources = performance.getEntriesByType('resource');
+    return {
+        count: resources.length,
+        transferSize: resources.reduce((sum, r) => sum + (r.transferSize || 0), 0),
+    };
+}"""
+
+
+def build_performance_metrics(metrics: dict[str, Any], resource_stats: dict[str, Any]) -> PerformanceMetrics:
+    """把页面里取回的毫秒值转换为 PerformanceMetrics（秒）"""
+
+    def seconds(key: str) -> float | None:
+        value = metrics.get(key)
+        return value / 1000 if value else None
+
+    return PerformanceMetrics(
+        dns_lookup_time=seconds("dns_lookup"),
+        connection_time=seconds("connection"),
+        tls_negotiation_time=seconds("tls_negotiation"),
+        ttfb=seconds("ttfb"),
+        download_time=seconds("download"),
+        total_time=seconds("total"),
+        dom_content_loaded=seconds("dom_content_loaded"),
+        load_complete=seconds("load_complete"),
+        total_requests=resource_stats.get("count", 0),
+        total_transfer_size=resource_stats.get("transferSize", 0),
+    )
 
-def _monitor_output_dir() -> Path:
-    return _monitor_demo_root()
 
+def classify_status(
+    status_code: int | None,
+    response_time: float,
+    degraded_threshold: float,
+    unhealthy_threshold: float | None = None,
+) -> MonitorStatus:
+    """根据状态码和响应时间判断监控状态"""
+    if status_code is not None and status_code >= 400:
+        return MonitorStatus.UNHEALTHY
+    if unhealthy_threshold is not None and response_time > unhealthy_threshold:
+        return MonitorStatus.UNHEALTHY
+    if response_time > degraded_threshold:
+        return MonitorStatus.DEGRADED
+    return MonitorStatus.HEALTHY
 
-def _monitor_screenshots_dir() -> Path:
-    return _monitor_demo_root() / "screenshots"
 
+def url_digest(url: str) -> str:
+    """URL 的短哈希，用作截图/Trace 文件名前缀"""
+    return hashlib.md5(url.encode()).hexdigest()
 
-def _monitor_baselines_dir() -> Path:
-    return _monitor_demo_root() / "baselines"
 
+# =============================================================================
+# 视觉回归（感知哈希 + 分块差异 + 基准缓存）
+# =============================================================================
 
-def _monitor_traces_dir() -> Path:
-    return _monitor_demo_root() / "traces"
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+_PNG_CHANNELS = {0: 1, 2: 3, 4: 2, 6: 4}  # color type -> 通道数
+
+
+def _unfilter_sequential(line: bytes, prev: bytes, bpp: int, filter_type: int) -> bytes:
+    """Average / Paeth 过滤器依赖同一行左侧已还原的字节，只能逐字节还原"""
+    cur = bytearray(line)
+    for i in range(len(cur)):
+        a = cur[i - bpp] if i >= bpp else 0
+        b = prev[i]
+        if filter_type == 3:
+            cur[i] = (cur[i] + ((a + b) >> 1)) & 0xFF
+        else:
+            c = prev[i - bpp] if i >= bpp else 0
+            p = a + b - c
+            pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+            predictor = a if pa <= pb and pa <= pc else (b if pb <= pc else c)
+            cur[i] = (cur[i] + predictor) & 0xFF
+    return bytes(cur)
+
+
+def decode_png_numpy(data: bytes) -> np.ndarray:
+    """用 NumPy 解码 8 位非隔行 PNG（Playwright 截图格式），返回 (H, W, C) uint8
+
+    None / Sub / Up 三种过滤器整行向量化还原；Average / Paeth 逐字节还原。
+    """
+    if not data.startswith(_PNG_SIGNATURE):
+        raise ValueError("不是 PNG 数据")
+
+    pos = len(_PNG_SIGNATURE)
+    idat = bytearray()
+    width = height = channels = 0
+    while pos < len(data):
+        length, chunk_type = struct.unpack(">I4s", data[pos:pos + 8])
+        chunk = data[pos + 8:pos + 8 + length]
+        pos += 12 + length
+        if chunk_type == b"IHDR":
+            width, height, bit_depth, color_type, _, _, interlace = struct.unpack(">IIBBBBB", chunk)
+            if bit_depth != 8 or interlace or color_type not in _PNG_CHANNELS:
+                raise ValueError(f"不支持的 PNG 格式: bit_depth={bit_depth}, color_type={color_type}, interlace={interlace}")
+            channels = _PNG_CHANNELS[color_type]
+        elif chunk_type == b"IDAT":
+            idat += chunk
+        elif chunk_type == b"IEND":
+            break
+
+    stride = width * channels
+    raw = np.frombuffer(zlib.decompress(bytes(idat)), dtype=np.uint8).reshape(height, stride + 1)
+    pixels = np.empty((height, stride), dtype=np.uint8)
+    prev = np.zeros(stride, dtype=np.uint8)
+    for y in range(height):
+        filter_type, line = raw[y, 0], raw[y, 1:]
+        if filter_type == 0:
+            cur = line
+        elif filter_type == 1:
+            # Sub：Recon(x) = Filt(x) + Recon(a)，即按通道做 uint8 累加（自动按 256 回绕）
+            cur = line.reshape(width, channels).cumsum(axis=0, dtype=np.uint8).reshape(stride)
+        elif filter_type == 2:
+            cur = line + prev
+        else:
+            cur = np.frombuffer(_unfilter_sequential(line.tobytes(), prev.tobytes(), channels, filter_type), dtype=np.uint8)
+        pixels[y] = cur
+        prev = pixels[y]
+    return pixels.reshape(height, width, channels)
+
+
+def load_grayscale(png: bytes) -> np.ndarray:
+    """PNG 字节 -> (H, W) float32 灰度图；装了 Pillow 时用 Pillow 解码（更快）"""
+    try:
+        from PIL import Image
+    except ImportError:
+        pixels = decode_png_numpy(png).astype(np.float32)
+    else:
+        import io
+
+        pixels = np.asarray(Image.open(io.BytesIO(png)).convert("RGB"), dtype=np.float32)
+
+    if pixels.ndim == 2 or pixels.shape[2] <= 2:
+        return pixels if pixels.ndim == 2 else pixels[:, :, 0]
+    # ITU-R BT.601 亮度，忽略 alpha
+    return pixels[:, :, :3] @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+
+def resize_mean(gray: np.ndarray, rows: int, cols: int) -> np.ndarray:
+    """按区域均值缩放到 rows x cols（每个输出像素是对应块的平均亮度）"""
+    height, width = gray.shape
+    row_edges = np.linspace(0, height, rows + 1).astype(int)
+    col_edges = np.linspace(0, width, cols + 1).astype(int)
+    # 图像比目标还小时，保证每块至少 1 个像素
+    row_starts = np.minimum(row_edges[:-1], height - 1)
+    col_starts = np.minimum(col_edges[:-1], width - 1)
+    sums = np.add.reduceat(np.add.reduceat(gray, row_starts, axis=0), col_starts, axis=1)
+    counts = np.outer(np.maximum(np.diff(row_edges), 1), np.maximum(np.diff(col_edges), 1))
+    return sums / counts
+
+
+def _bits_to_int(bits: np.ndarray) -> int:
+    return int.from_bytes(np.packbits(bits.ravel()).tobytes(), "big")
+
+
+@dataclass(frozen=True)
+class VisualFingerprint:
+    """截图指纹：aHash + dHash（各 64 位）+ 16x16 分块平均亮度"""
+    ahash: int
+    dhash: int
+    width: int
+    height: int
+    blocks: bytes  # BLOCK_GRID * BLOCK_GRID 个 uint8
+
+    BLOCK_GRID = 16
+    # 亮度差小于该值不置位：大面积纯色区域里的微小噪声不会翻转哈希位
+    HASH_MARGIN = 2.0
+    RECORD = struct.Struct(f"<16sQQII{BLOCK_GRID * BLOCK_GRID}s")  # 每条索引记录 296 字节
+
+    @classmethod
+    def from_png(cls, png: bytes) -> VisualFingerprint:
+        gray = load_grayscale(png)
+        small = resize_mean(gray, 8, 8)
+        wide = resize_mean(gray, 8, 9)
+        blocks = resize_mean(gray, cls.BLOCK_GRID, cls.BLOCK_GRID)
+        return cls(
+            ahash=_bits_to_int(small > small.mean() + cls.HASH_MARGIN),
+            dhash=_bits_to_int(wide[:, 1:] > wide[:, :-1] + cls.HASH_MARGIN),
+            width=gray.shape[1],
+            height=gray.shape[0],
+            blocks=np.clip(blocks, 0, 255).astype(np.uint8).tobytes(),
+        )
 
+    @property
+    def hex(self) -> str:
+        """用于 UrlMonitorResult.screenshot_hash 的紧凑表示"""
+        return f"{self.ahash:016x}{self.dhash:016x}"
 
-def _monitor_reports_dir() -> Path:
-    return _monitor_demo_root() / "reports"
+    def pack(self, key: bytes) -> bytes:
+        return self.RECORD.pack(key, self.ahash, self.dhash, self.width, self.height, self.blocks)
 
+    @classmethod
+    def unpack(cls, record: bytes) -> tuple[bytes, VisualFingerprint]:
+        key, ahash, dhash, width, height, blocks = cls.RECORD.unpack(record)
+        return key, cls(ahash, dhash, width, height, blocks)
 
-def _monitor_viewport() -> dict[str, int]:
-    return {"width": 1920, "height": 1080}
+
+@dataclass
+class VisualDiff:
+    """两张截图指纹的差异"""
+    ahash_distance: int  # 0-64
+    dhash_distance: int  # 0-64
+    block_diff_ratio: float  # 亮度变化超过容差的分块比例
+    max_block_delta: int  # 单个分块最大亮度差
+    size_changed: bool
+
+    @property
+    def score(self) -> float:
+        """0 表示完全一致，1 表示完全不同"""
+        if self.size_changed:
+            return 1.0
+        return max(self.dhash_distance / 64, self.ahash_distance / 64, self.block_diff_ratio)
+
+
+def compare_fingerprints(baseline: VisualFingerprint, current: VisualFingerprint, block_tolerance: int = 12) -> VisualDiff:
+    """比较两个指纹（纯整数/小数组运算，微秒级）
+
+    抗锯齿、字体渲染等噪声只会让个别像素变化，平均到 8x8 哈希和 16x16 分块后
+    几乎不产生差异；真正的布局/内容变化会同时改变哈希位和多个分块。
+    """
+    base_blocks = np.frombuffer(baseline.blocks, dtype=np.uint8).astype(np.int16)
+    cur_blocks = np.frombuffer(current.blocks, dtype=np.uint8).astype(np.int16)
+    deltas = np.abs(base_blocks - cur_blocks)
+    return VisualDiff(
+        ahash_distance=(baseline.ahash ^ current.ahash).bit_count(),
+        dhash_distance=(baseline.dhash ^ current.dhash).bit_count(),
+        block_diff_ratio=float((deltas > block_tolerance).mean()),
+        max_block_delta=int(deltas.max()),
+        size_changed=(baseline.width, baseline.height) != (current.width, current.height),
+    )
+
+
+class BaselineStore:
+    """基准指纹存储：内存 LRU + 磁盘紧凑索引
+
+    磁盘上是一个追加写的定长记录文件（每条 296 字节，后写覆盖先写），
+    启动时只扫描一遍建立 key -> 文件偏移 的映射；查询先查 LRU，
+    未命中再按偏移读一条记录，不需要重新读取、解码基准 PNG。
+    """
+
+    def __init__(self, index_path: Path, capacity: int = 1024):
+        self.index_path = index_path
+        self.capacity = capacity
+        self._cache: OrderedDict[bytes, VisualFingerprint] = OrderedDict()
+        self._offsets: dict[bytes, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self._load_offsets()
+
+    @staticmethod
+    def key_for(url: str) -> bytes:
+        return hashlib.md5(url.encode()).digest()
+
+    def _load_offsets(self) -> None:
+        if not self.index_path.exists():
+            return
+        size = VisualFingerprint.RECORD.size
+        with open(self.index_path, "rb") as f:
+            offset = 0
+            while len(record := f.read(size)) == size:
+                self._offsets[record[:16]] = offset
+                offset += size
+
+    def _remember(self, key: bytes, fingerprint: VisualFingerprint) -> None:
+        self._cache[key] = fingerprint
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.capacity:
+            self._cache.popitem(last=False)
+
+    def get(self, url: str) -> VisualFingerprint | None:
+        key = self.key_for(url)
+        fingerprint = self._cache.get(key)
+        if fingerprint is not None:
+            self.hits += 1
+            self._cache.move_to_end(key)
+            return fingerprint
+
+        offset = self._offsets.get(key)
+        if offset is None:
+            return None
+        self.misses += 1
+        with open(self.index_path, "rb") as f:
+            f.seek(offset)
+            _, fingerprint = VisualFingerprint.unpack(f.read(VisualFingerprint.RECORD.size))
+        self._remember(key, fingerprint)
+        return fingerprint
+
+    def put(self, url: str, fingerprint: VisualFingerprint) -> None:
+        key = self.key_for(url)
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.index_path, "ab") as f:
+            self._offsets[key] = f.tell()
+            f.write(fingerprint.pack(key))
+        self._remember(key, fingerprint)
+
+    def compact(self) -> None:
+        """只保留每个 URL 的最新记录，重写索引文件"""
+        size = VisualFingerprint.RECORD.size
+        tmp_path = self.index_path.with_name(self.index_path.name + ".tmp")
+        new_offsets: dict[bytes, int] = {}
+        with open(self.index_path, "rb") as src, open(tmp_path, "wb") as dst:
+            for key, offset in self._offsets.items():
+                src.seek(offset)
+                new_offsets[key] = dst.tell()
+                dst.write(src.read(size))
+        os.replace(tmp_path, self.index_path)
+        self._offsets = new_offsets
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+
+# =============================================================================
+# 时序指标存储（按天分区、按列追加、memmap 读取）
+# =============================================================================
+
+STATUS_CODES: dict[MonitorStatus, int] = {
+    MonitorStatus.HEALTHY: 0,
+    MonitorStatus.DEGRADED: 1,
+    MonitorStatus.UNHEALTHY: 2,
+    MonitorStatus.ERROR: 3,
+}
+
+# 列名 -> dtype；浮点列用 NaN 表示缺失值
+METRIC_COLUMNS: dict[str, str] = {
+    "ts": "<f8",  # Unix 时间戳（秒）
+    "target": "<i4",  # 目标 ID（见 targets.json）
+    "status": "i1",  # STATUS_CODES
+    "status_code": "<i2",  # HTTP 状态码，缺失为 0
+    "response_time": "<f4",
+    "ttfb": "<f4",
+    "dom_content_loaded": "<f4",
+    "load_complete": "<f4",
+    "total_requests": "<i4",
+    "total_transfer_size": "<i8",
+    "visual_diff_score": "<f4",
+}
+
+
+class MetricsStore:
+    """监控结果的追加式列存储
+
+    目录结构：<root>/<YYYY-MM-DD>/<列名>.bin，每列一个定长二进制文件，
+    写入只追加，读取用 np.memmap 映射，不需要反序列化 JSON。
+    查询只映射时间范围覆盖到的那几天，几个月的历史也只是若干次 mmap。
+    """
+
+    def __init__(self, root: Path, flush_every: int = 1000):
+        self.root = root
+        self.flush_every = flush_every
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._targets_path = root / "targets.json"
+        self.targets: dict[str, int] = (
+            json.loads(self._targets_path.read_text(encoding="utf-8")) if self._targets_path.exists() else {}
+        )
+        self._buffer: dict[str, list[list[Any]]] = {}  # 分区 -> 行列表
+
+    # -------------------------------------------------------------------------
+    # 写入
+    # -------------------------------------------------------------------------
+
+    def target_id(self, url: str) -> int:
+        if url not in self.targets:
+            self.targets[url] = len(self.targets)
+            tmp_path = self._targets_path.with_name("targets.json.tmp")
+            tmp_path.write_text(json.dumps(self.targets, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp_path, self._targets_path)
+        return self.targets[url]
+
+    def append(self, result: UrlMonitorResult) -> None:
+        perf = result.performance or PerformanceMetrics()
+        nan = float("nan")
+        row = [
+            result.timestamp.timestamp(),
+            self.target_id(result.url),
+            STATUS_CODES[result.status],
+            result.status_code or 0,
+            result.response_time,
+            nan if perf.ttfb is None else perf.ttfb,
+            nan if perf.dom_content_loaded is None else perf.dom_content_loaded,
+            nan if perf.load_complete is None else perf.load_complete,
+            perf.total_requests,
+            perf.total_transfer_size,
+            nan if result.visual_diff_score is None else result.visual_diff_score,
+        ]
+        partition = result.timestamp.strftime("%Y-%m-%d")
+        rows = self._buffer.setdefault(partition, [])
+        rows.append(row)
+        if sum(len(r) for r in self._buffer.values()) >= self.flush_every:
+            self.flush()
+
+    def extend(self, results: list[UrlMonitorResult]) -> None:
+        for result in results:
+            self.append(result)
+        self.flush()
+
+    def flush(self) -> None:
+        """把缓冲的行按列追加到各分区文件"""
+        for partition, rows in self._buffer.items():
+            part_dir = self.root / partition
+            part_dir.mkdir(exist_ok=True)
+            columns = list(zip(*rows))
+            for (name, dtype), values in zip(METRIC_COLUMNS.items(), columns):
+                with open(part_dir / f"{name}.bin", "ab") as f:
+                    f.write(np.asarray(values, dtype=dtype).tobytes())
+        self._buffer.clear()
+
+    # -------------------------------------------------------------------------
+    # 读取
+    # -------------------------------------------------------------------------
+
+    def _partition_columns(self, part_dir: Path, names: list[str]) -> dict[str, np.ndarray]:
+        """映射一个分区的指定列；行数以最短的列为准（容忍写入中断留下的半行）"""
+        rows = min(
+            (part_dir / f"{name}.bin").stat().st_size // np.dtype(dtype).itemsize
+            for name, dtype in METRIC_COLUMNS.items()
+        )
+        if rows == 0:
+            return {name: np.empty(0, dtype=METRIC_COLUMNS[name]) for name in names}
+        return {
+            name: np.memmap(part_dir / f"{name}.bin", dtype=METRIC_COLUMNS[name], mode="r", shape=(rows,))
+            for name in names
+        }
+
+    def query(
+        self,
+        start: datetime,
+        end: datetime,
+        url: str | None = None,
+        columns: list[str] | None = None,
+    ) -> dict[str, np.ndarray]:
+        """读取 [start, end) 时间范围内的列数据（可选按目标过滤、只取部分列）"""
+        self.flush()
+        names = list(METRIC_COLUMNS) if columns is None else list(dict.fromkeys(["ts", "target", *columns]))
+        empty = {name: np.empty(0, dtype=METRIC_COLUMNS[name]) for name in names}
+        start_ts, end_ts = start.timestamp(), end.timestamp()
+        first, last = start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")
+        target = self.targets.get(url) if url is not None else None
+        if url is not None and target is None:
+            return empty
+
+        chunks: dict[str, list[np.ndarray]] = {name: [] for name in names}
+        for part_dir in sorted(p for p in self.root.iterdir() if p.is_dir()):
+            if not first <= part_dir.name <= last:
+                continue
+            part = self._partition_columns(part_dir, names)
+            mask = None
+            # 完全落在时间范围内的中间分区不需要按时间过滤
+            if part_dir.name in (first, last):
+                mask = (part["ts"] >= start_ts) & (part["ts"] < end_ts)
+            if target is not None:
+                target_mask = part["target"] == target
+                mask = target_mask if mask is None else mask & target_mask
+            for name, values in part.items():
+                chunks[name].append(values if mask is None else values[mask])
+        return {name: np.concatenate(parts) if parts else empty[name] for name, parts in chunks.items()}
+
+    # -------------------------------------------------------------------------
+    # 聚合
+    # -------------------------------------------------------------------------
+
+    @staticmethod
+    def _window_index(ts: np.ndarray, start: datetime, window: float) -> np.ndarray:
+        return ((ts - start.timestamp()) // window).astype(np.int64)
+
+    def rolling_percentiles(
+        self,
+        start: datetime,
+        end: datetime,
+        window: float = 300.0,
+        url: str | None = None,
+        column: str = "response_time",
+        quantiles: tuple[float, ...] = (0.5, 0.95, 0.99),
+    ) -> dict[str, np.ndarray]:
+        """按固定时间窗计算分位数（全向量化：一次排序 + 索引取值）
+
+        返回 {"window_start": 各窗口起点时间戳, "count": 样本数, "p50": ..., "p95": ..., "p99": ...}
+        """
+        data = self.query(start, end, url, columns=[column])
+        values = data[column].astype(np.float64)
+        valid = ~np.isnan(values)
+        values, ts = values[valid], data["ts"][valid]
+        n_windows = max(1, int(np.ceil((end.timestamp() - start.timestamp()) / window)))
+        windows = self._window_index(ts, start, window)
+
+        # 先按窗口、再按值排序，每个窗口的数据在数组中连续且有序。
+        # 把值归一化到 [0, 1) 叠加到窗口号上，一次 argsort 代替 lexsort
+        span = values.max() - values.min() if len(values) else 0.0
+        scaled = (values - values.min()) / (span * (1 + 1e-9)) if span > 0 else np.zeros_like(values)
+        order = np.argsort(windows + scaled, kind="stable")
+        sorted_values = values[order]
+        counts = np.bincount(windows, minlength=n_windows)[:n_windows]
+        offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+        result: dict[str, np.ndarray] = {
+            "window_start": start.timestamp() + np.arange(n_windows) * window,
+            "count": counts,
+        }
+        has_data = counts > 0
+        for q in quantiles:
+            # 最近秩法：第 ceil(q * n) 个样本
+            rank = np.maximum(np.ceil(q * counts).astype(np.int64) - 1, 0)
+            out = np.full(n_windows, np.nan)
+            out[has_data] = sorted_values[(offsets + rank)[has_data]]
+            result[f"p{round(q * 100):g}"] = out
+        return result
+
+    def error_rate_windows(
+        self,
+        start: datetime,
+        end: datetime,
+        window: float = 300.0,
+        url: str | None = None,
+    ) -> dict[str, np.ndarray]:
+        """按时间窗统计错误率（UNHEALTHY + ERROR 计为失败）"""
+        data = self.query(start, end, url, columns=["status"])
+        n_windows = max(1, int(np.ceil((end.timestamp() - start.timestamp()) / window)))
+        windows = self._window_index(data["ts"], start, window)
+        failed = data["status"] >= STATUS_CODES[MonitorStatus.UNHEALTHY]
+        totals = np.bincount(windows, minlength=n_windows)[:n_windows]
+        errors = np.bincount(windows, weights=failed, minlength=n_windows)[:n_windows]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            rate = np.where(totals > 0, errors / totals, np.nan)
+        return {
+            "window_start": start.timestamp() + np.arange(n_windows) * window,
+            "total": totals,
+            "errors": errors.astype(np.int64),
+            "error_rate": rate,
+        }
+
+    def slo_burn_rates(
+        self,
+        end: datetime,
+        window: float = 3600.0,
+        slo: float = 0.999,
+        latency_threshold: float | None = None,
+    ) -> dict[str, float]:
+        """每个目标在最近 window 秒内的 SLO 错误预算消耗速度
+
+        burn rate = 实际失败比例 / 允许失败比例（1 - slo）；
+        1.0 表示恰好按预算消耗，> 1 表示会提前耗尽预算。
+        设置 latency_threshold 时，响应时间超过阈值的检查也计为失败。
+        """
+        start = datetime.fromtimestamp(end.timestamp() - window)
+        data = self.query(start, end, columns=["status", "response_time"])
+        bad = data["status"] >= STATUS_CODES[MonitorStatus.UNHEALTHY]
+        if latency_threshold is not None:
+            bad |= data["response_time"] > latency_threshold
+
+        n_targets = len(self.targets)
+        totals = np.bincount(data["target"], minlength=n_targets)
+        bad_counts = np.bincount(data["target"], weights=bad, minlength=n_targets)
+        budget = 1.0 - slo
+        return {
+            url: float(bad_counts[tid] / totals[tid] / budget)
+            for url, tid in self.targets.items()
+            if tid < len(totals) and totals[tid] > 0
+        }
+
+
+def demo_metrics_store(root: Path, days: int = 30, targets: int = 50, interval: float = 300.0) -> None:
+    """写入几十天的模拟数据，然后测量聚合查询耗时"""
+    store = MetricsStore(root, flush_every=50_000)
+    if not store.targets:
+        rng = np.random.default_rng(42)
+        now = datetime.now().timestamp()
+        start = now - days * 86400
+        statuses = list(STATUS_CODES)
+        for step in range(int(days * 86400 / interval)):
+            ts = datetime.fromtimestamp(start + step * interval)
+            latencies = rng.lognormal(mean=-1.5, sigma=0.6, size=targets)
+            failures = rng.random(targets) < 0.002
+            for i in range(targets):
+                store.append(UrlMonitorResult(
+                    url=f"https://service-{i}.example.com/health",
+                    status=statuses[3] if failures[i] else statuses[0],
+                    timestamp=ts,
+                    response_time=float(latencies[i]),
+                    status_code=200,
+                ))
+        store.flush()
+
+    end = datetime.now()
+    begin = datetime.fromtimestamp(end.timestamp() - days * 86400)
+    started = time.perf_counter()
+    pct = store.rolling_percentiles(begin, end, window=3600.0)
+    errors = store.error_rate_windows(begin, end, window=86400.0)
+    burn = store.slo_burn_rates(end, window=7 * 86400.0, slo=0.999)
+    elapsed = (time.perf_counter() - started) * 1000
+
+    print(f"指标库: {int(pct['count'].sum())} 个样本，{len(store.targets)} 个目标，{days} 天")
+    print(f"  逐小时 p50/p95/p99 + 逐日错误率 + 7 天 SLO 消耗速度，共耗时 {elapsed:.1f}ms")
+    print(f"  最近一小时 p95: {np.nanmax(pct['p95'][-1:]):.3f}s；最近一天错误率: {errors['error_rate'][-1]:.4f}")
+    worst = max(burn.items(), key=lambda item: item[1], default=None)
+    if worst:
+        print(f"  SLO 消耗最快: {worst[0]}（burn rate {worst[1]:.2f}）")
 
 
 # =============================================================================
@@ -228,6 +885,15 @@ class WebsiteMonitor:
         # 创建目录
         self._ensure_directories()
 
+        # 视觉回归基准（内存 LRU + 磁盘索引）
+        self.baselines = BaselineStore(
+            self.config.baselines_dir / "baselines.idx",
+            capacity=self.config.baseline_cache_size,
+        )
+
+        # 时序指标库（按天分区的列存储）
+        self.metrics = MetricsStore(self.config.metrics_dir) if self.config.enable_metrics_store else None
+
     def _ensure_directories(self) -> None:
         """确保所有必要的目录存在"""
         for dir_path in [
@@ -350,14 +1016,12 @@ class WebsiteMonitor:
             status_code = response.status if response else None
 
             # 判断基本状态
-            if status_code and status_code >= 400:
-                status = MonitorStatus.UNHEALTHY
-            elif response_time > self.config.response_time_threshold:
-                status = MonitorStatus.UNHEALTHY
-            elif response_time > self.config.degraded_threshold:
-                status = MonitorStatus.DEGRADED
-            else:
-                status = MonitorStatus.HEALTHY
+            status = classify_status(
+                status_code,
+                response_time,
+                self.config.degraded_threshold,
+                self.config.response_time_threshold,
+            )
 
             # 收集性能指标
             performance = None
@@ -378,12 +1042,17 @@ class WebsiteMonitor:
             # 截图
             screenshot_path = None
             screenshot_hash = None
+            visual_diff = None
             if status != MonitorStatus.HEALTHY or self.config.enable_visual_regression:
                 screenshot_path = self.config.screenshots_dir / f"{hashlib.md5(url.encode()).hexdigest()}_{datetime.now():%Y%m%d_%H%M%S}.png"
-                page.screenshot(path=str(screenshot_path), full_page=True)
+                png = page.screenshot(path=str(screenshot_path), full_page=True)
 
-                # 计算截图哈希（用于视觉回归）
-                screenshot_hash = self._calculate_screenshot_hash(screenshot_path)
+                # 计算感知哈希并与基准对比（用于视觉回归）
+                fingerprint = self._fingerprint_screenshot(png)
+                if fingerprint:
+                    screenshot_hash = fingerprint.hex
+                    if self.config.enable_visual_regression:
+                        visual_diff = self.compare_with_baseline(url, fingerprint)
 
             # 停止 Trace
             context.tracing.stop(path=str(trace_file))
@@ -400,6 +1069,8 @@ class WebsiteMonitor:
                 screenshot_path=str(screenshot_path) if screenshot_path else None,
                 trace_path=str(trace_file) if self.config.save_trace_on_error else None,
                 screenshot_hash=screenshot_hash,
+                visual_diff_detected=bool(visual_diff and visual_diff.score > self.config.visual_diff_threshold),
+                visual_diff_score=visual_diff.score if visual_diff else None,
             )
 
             # 清理资源
@@ -438,48 +1109,10 @@ class WebsiteMonitor:
     def _collect_performance_metrics(self, page: Any) -> PerformanceMetrics:
         """收集页面性能指标"""
         try:
-            metrics = page.evaluate(
-                """() => {
-                    const timing = performance.timing;
-                    const navigation = performance.getEntriesByType('navigation')[0];
-
-                    return {
-                        dns_lookup: timing.domainLookupEnd - timing.domainLookupStart,
-                        connection: timing.connectEnd - timing.connectStart,
-                        tls_negotiation: timing.connectEnd - timing.secureConnectionStart,
-                        ttfb: timing.responseStart - timing.requestStart,
-                        download: timing.responseEnd - timing.responseStart,
-                        total: timing.loadEventEnd - timing.navigationStart,
-                        dom_content_loaded: timing.domContentLoadedEventEnd - timing.navigationStart,
-                        load_complete: timing.loadEventEnd - timing.navigationStart,
-                        first_contentful_paint: navigation?.loadEventEnd,  // 简化
-                    };
-                }"""
-            )
-
+            metrics = page.evaluate(PERFORMANCE_TIMING_JS)
             # 获取资源统计
-            resource_stats = page.evaluate(
-                """() => {
-                    const resources = performance.getEntriesByType('resource');
-                    return {
-                        count: resources.length,
-                        transferSize: resources.reduce((sum, r) => sum + (r.transferSize || 0), 0),
-                    };
-                }"""
-            )
-
-            return PerformanceMetrics(
-                dns_lookup_time=metrics.get("dns_lookup") / 1000 if metrics.get("dns_lookup") else None,
-                connection_time=metrics.get("connection") / 1000 if metrics.get("connection") else None,
-                tls_negotiation_time=metrics.get("tls_negotiation") / 1000 if metrics.get("tls_negotiation") else None,
-                ttfb=metrics.get("ttfb") / 1000 if metrics.get("ttfb") else None,
-                download_time=metrics.get("download") / 1000 if metrics.get("download") else None,
-                total_time=metrics.get("total") / 1000 if metrics.get("total") else None,
-                dom_content_loaded=metrics.get("dom_content_loaded") / 1000 if metrics.get("dom_content_loaded") else None,
-                load_complete=metrics.get("load_complete") / 1000 if metrics.get("load_complete") else None,
-                total_requests=resource_stats.get("count", 0),
-                total_transfer_size=resource_stats.get("transferSize", 0),
-            )
+            resource_stats = page.evaluate(RESOURCE_STATS_JS)
+            return build_performance_metrics(metrics, resource_stats)
 
         except Exception as exc:
             print(f"收集性能指标失败: {exc}")
@@ -489,20 +1122,28 @@ class WebsiteMonitor:
     # 视觉回归
     # -------------------------------------------------------------------------
 
-    def _calculate_screenshot_hash(self, screenshot_path: Path) -> str:
-        """计算截图哈希值"""
+    def _fingerprint_screenshot(self, png: bytes) -> VisualFingerprint | None:
+        """计算截图的感知指纹（aHash/dHash + 分块亮度）"""
         try:
-            with open(screenshot_path, "rb") as f:
-                return hashlib.md5(f.read()).hexdigest()
-        except Exception:
-            return ""
+            return VisualFingerprint.from_png(png)
+        except Exception as exc:
+            print(f"计算截图指纹失败: {exc}")
+            return None
+
+    def compare_with_baseline(self, url: str, fingerprint: VisualFingerprint) -> VisualDiff | None:
+        """与基准指纹对比；没有基准时返回 None"""
+        baseline = self.baselines.get(url)
+        if baseline is None:
+            return None
+        return compare_fingerprints(baseline, fingerprint, self.config.visual_block_tolerance)
 
     def save_baseline(self, url: str, screenshot_path: Path) -> None:
-        """保存基准截图"""
-        baseline_path = self.config.baselines_dir / f"{hashlib.md5(url.encode()).hexdigest()}_baseline.png"
-        import shutil
-        shutil.copy(screenshot_path, baseline_path)
-        print(f"基准截图已保存: {baseline_path}")
+        """保存基准指纹（只存 296 字节的指纹记录，不再复制整张 PNG）"""
+        fingerprint = self._fingerprint_screenshot(screenshot_path.read_bytes())
+        if fingerprint is None:
+            return
+        self.baselines.put(url, fingerprint)
+        print(f"基准指纹已保存: {url} -> {fingerprint.hex}（索引 {self.baselines.index_path}）")
 
     # -------------------------------------------------------------------------
     # 报告生成
@@ -516,6 +1157,10 @@ class WebsiteMonitor:
             results=results,
         )
 
+        # 追加到时序指标库（供 rolling 分位数 / 错误率 / SLO 查询）
+        if self.metrics:
+            self.metrics.extend(results)
+
         # 生成 JSON 报告
         json_file = self.config.reports_dir / f"report_{datetime.now():%Y%m%d_%H%M%S}.json"
         with open(json_file, "w", encoding="utf-8") as f:
@@ -611,6 +1256,328 @@ class WebsiteMonitor:
         #     self._send_email_alert(result)
 
 
+# =============================================================================
+# 并发检查调度器（每个目标独立的检查间隔 / 抖动 / 超时预算）
+# =============================================================================
+
+
+@dataclass
+class MonitorTarget:
+    """调度器中的单个监控目标"""
+    url: str
+    name: str = ""
+    keywords: list[str] = field(default_factory=list)
+    interval: float = 60.0  # 检查间隔（秒）
+    jitter: float = 0.1  # 间隔抖动比例，避免所有目标同一时刻扎堆
+    timeout: float = 10.0  # 单次检查的总超时预算（秒）
+    full_check: bool = False  # 是否用浏览器做完整检查
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any], config: MonitorConfig) -> MonitorTarget:
+        """从 target_urls 里的字典创建；未指定的字段用配置中的默认值"""
+        return cls(
+            url=data["url"],
+            name=data.get("name", ""),
+            keywords=list(data.get("keywords", [])),
+            interval=data.get("interval", config.default_check_interval),
+            jitter=data.get("jitter", config.default_check_jitter),
+            timeout=data.get("timeout", config.response_time_threshold * 2),
+            full_check=data.get("full_check", False),
+        )
+
+    def next_delay(self) -> float:
+        """下一次检查前的等待时间（带抖动）"""
+        return max(0.0, self.interval * (1 + random.uniform(-self.jitter, self.jitter)))
+
+
+class AsyncCheckScheduler:
+    """并发监控调度器（async_playwright）
+
+    - 健康检查：共享一个 APIRequestContext，信号量限制同时在途的请求数
+    - 完整检查：共享一个浏览器，每次检查创建独立 context（保持隔离），
+      信号量限制同时打开的页面数，避免每次检查都重新启动浏览器
+    - 每个检查都有独立的超时预算，超时记为 ERROR 而不会拖住整轮
+    - run_cycle() 一轮全部并发执行，耗时约等于最慢的几个检查
+    - run_forever() 按各目标自己的间隔（带抖动）持续调度
+    """
+
+    def __init__(self, config: MonitorConfig):
+        self.config = config
+        self._playwright: Any | None = None
+        self._api_context: Any | None = None
+        self._browser: Any | None = None
+        self._health_slots = asyncio.Semaphore(config.max_concurrent_health_checks)
+        self._page_slots = asyncio.Semaphore(config.max_concurrent_full_checks)
+        self._browser_lock = asyncio.Lock()
+        self.baselines = BaselineStore(config.baselines_dir / "baselines.idx", capacity=config.baseline_cache_size)
+
+    async def start(self) -> None:
+        from playwright.async_api import async_playwright
+
+        self._playwright = await async_playwright().start()
+        self._api_context = await self._playwright.request.new_context(
+            user_agent=self.config.user_agent,
+            ignore_https_errors=True,
+        )
+
+    async def close(self) -> None:
+        if self._api_context:
+            await self._api_context.dispose()
+        if self._browser:
+            await self._browser.close()
+        if self._playwright:
+            await self._playwright.stop()
+
+    async def _get_browser(self) -> Any:
+        """首次需要完整检查时才启动浏览器"""
+        async with self._browser_lock:
+            if self._browser is None:
+                self._browser = await self._playwright.chromium.launch(headless=self.config.headless)
+        return self._browser
+
+    # -------------------------------------------------------------------------
+    # 单次检查
+    # -------------------------------------------------------------------------
+
+    async def health_check(self, target: MonitorTarget) -> UrlMonitorResult:
+        """异步快速健康检查"""
+        timestamp = datetime.now()
+        start = time.perf_counter()
+        response = await self._api_context.get(target.url, timeout=target.timeout * 1000)
+        try:
+            response_time = time.perf_counter() - start
+            status_code = response.status
+            status = (
+                classify_status(status_code, response_time, self.config.degraded_threshold)
+                if response.ok
+                else MonitorStatus.UNHEALTHY
+            )
+        finally:
+            # 共享的 _api_context 会一直缓存响应体，run_forever 下不释放就会越积越多
+            await response.dispose()
+        return UrlMonitorResult(
+            url=target.url,
+            status=status,
+            timestamp=timestamp,
+            response_time=response_time,
+            status_code=status_code,
+        )
+
+    async def full_check(self, target: MonitorTarget) -> UrlMonitorResult:
+        """异步完整检查：导航、性能指标、关键字、截图；仅失败时保存 Trace"""
+        browser = await self._get_browser()
+        context = await browser.new_context(
+            viewport=self.config.viewport,
+            user_agent=self.config.user_agent,
+        )
+        if self.config.save_trace_on_error:
+            await context.tracing.start(screenshots=True, snapshots=True)
+        trace_path: str | None = None
+        try:
+            page = await context.new_page()
+            page.set_default_navigation_timeout(target.timeout * 1000)
+            timestamp = datetime.now()
+            start = time.perf_counter()
+
+            response = await page.goto(target.url, wait_until="networkidle")
+            response_time = time.perf_counter() - start
+            status_code = response.status if response else None
+            status = classify_status(
+                status_code,
+                response_time,
+                self.config.degraded_threshold,
+                self.config.response_time_threshold,
+            )
+
+            performance = None
+            if self.config.enable_performance_monitoring:
+                performance = build_performance_metrics(
+                    await page.evaluate(PERFORMANCE_TIMING_JS),
+                    await page.evaluate(RESOURCE_STATS_JS),
+                )
+
+            keywords_found: list[str] = []
+            keywords_missing: list[str] = []
+            if self.config.enable_keyword_check and target.keywords:
+                page_text = await page.inner_text("body")
+                for keyword in target.keywords:
+                    (keywords_found if keyword in page_text else keywords_missing).append(keyword)
+
+            screenshot_path = None
+            fingerprint = None
+            visual_diff = None
+            if status != MonitorStatus.HEALTHY or self.config.enable_visual_regression:
+                screenshot_path = self.config.screenshots_dir / f"{url_digest(target.url)}_{datetime.now():%Y%m%d_%H%M%S}.png"
+                png = await page.screenshot(path=str(screenshot_path), full_page=True)
+                # PNG 解码是 CPU 工作，放到线程里，避免阻塞其他检查
+                try:
+                    fingerprint = await asyncio.to_thread(VisualFingerprint.from_png, png)
+                except Exception as exc:
+                    print(f"计算截图指纹失败: {exc}")
+                baseline = self.baselines.get(target.url) if fingerprint else None
+                if baseline and self.config.enable_visual_regression:
+                    visual_diff = compare_fingerprints(baseline, fingerprint, self.config.visual_block_tolerance)
+
+            if self.config.save_trace_on_error and status != MonitorStatus.HEALTHY:
+                trace_path = str(self.config.traces_dir / f"{url_digest(target.url)}_{datetime.now():%Y%m%d_%H%M%S}.zip")
+
+            return UrlMonitorResult(
+                url=target.url,
+                status=status,
+                timestamp=timestamp,
+                response_time=response_time,
+                status_code=status_code,
+                performance=performance,
+                keywords_found=keywords_found,
+                keywords_missing=keywords_missing,
+                screenshot_path=str(screenshot_path) if screenshot_path else None,
+                trace_path=trace_path,
+                screenshot_hash=fingerprint.hex if fingerprint else None,
+                visual_diff_detected=bool(visual_diff and visual_diff.score > self.config.visual_diff_threshold),
+                visual_diff_score=visual_diff.score if visual_diff else None,
+            )
+        except BaseException:
+            if self.config.save_trace_on_error:
+                trace_path = str(self.config.traces_dir / f"{url_digest(target.url)}_{datetime.now():%Y%m%d_%H%M%S}.zip")
+            raise
+        finally:
+            if self.config.save_trace_on_error:
+                # 不传 path 时 Trace 直接丢弃，健康的检查不产生磁盘开销
+                try:
+                    await context.tracing.stop(path=trace_path)
+                except Exception:
+                    pass
+            await context.close()
+
+    async def check(self, target: MonitorTarget) -> UrlMonitorResult:
+        """执行一次检查，套上目标自己的超时预算；任何异常都转换为 ERROR 结果
+
+        超时预算从拿到并发槽位后开始计算，排队等待槽位的时间不计入。
+        """
+        if target.full_check:
+            checker, slots = self.full_check, self._page_slots
+        else:
+            checker, slots = self.health_check, self._health_slots
+        async with slots:
+            if target.full_check:
+                await self._get_browser()  # 首次启动浏览器的耗时不计入单个目标的预算
+            timestamp = datetime.now()
+            start = time.perf_counter()
+            try:
+                return await asyncio.wait_for(checker(target), timeout=target.timeout)
+            except Exception as exc:
+                message = f"超时（预算 {target.timeout:.1f}s）" if isinstance(exc, asyncio.TimeoutError) else str(exc)
+                return UrlMonitorResult(
+                    url=target.url,
+                    status=MonitorStatus.ERROR,
+                    timestamp=timestamp,
+                    response_time=time.perf_counter() - start,
+                    error_message=message,
+                )
+
+    # -------------------------------------------------------------------------
+    # 调度
+    # -------------------------------------------------------------------------
+
+    async def run_cycle(self, targets: list[MonitorTarget]) -> list[UrlMonitorResult]:
+        """并发执行一轮检查，结果按完成顺序返回"""
+        results = []
+        for future in asyncio.as_completed([self.check(t) for t in targets]):
+            results.append(await future)
+        return results
+
+    async def run_forever(
+        self,
+        targets: list[MonitorTarget],
+        duration: float | None = None,
+        on_result: Callable[[MonitorTarget, UrlMonitorResult], None] | None = None,
+    ) -> None:
+        """按每个目标的间隔持续调度；duration 为 None 时一直运行"""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + duration if duration is not None else None
+        # 小根堆：(下次到期时间, 序号, 目标)；首轮在一个抖动窗口内错开启动
+        due: list[tuple[float, int, MonitorTarget]] = [
+            (loop.time() + random.uniform(0, t.interval * t.jitter), i, t) for i, t in enumerate(targets)
+        ]
+        heapq.heapify(due)
+        running: set[asyncio.Task[None]] = set()
+
+        async def run_one(target: MonitorTarget) -> None:
+            result = await self.check(target)
+            if on_result:
+                on_result(target, result)
+
+        try:
+            while due:
+                next_time, seq, target = due[0]
+                if deadline is not None and next_time >= deadline:
+                    break
+                delay = next_time - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                    continue
+                heapq.heappop(due)
+                task = asyncio.create_task(run_one(target))
+                running.add(task)
+                task.add_done_callback(running.discard)
+                heapq.heappush(due, (next_time + target.next_delay(), seq, target))
+            if running:
+                await asyncio.gather(*running)
+        finally:
+            for task in running:
+                task.cancel()
+
+
+async def demo_parallel_scheduler(config: MonitorConfig, target_count: int = 200) -> None:
+    """本地 http.server 充当 200 个目标：对比"一轮总耗时"和"各检查耗时之和" """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib.parse import urlsplit
+
+    class DelayHandler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:  # noqa: N802
+            # /delay/<毫秒>：模拟响应慢的目标
+            # 目标 URL 带 ?t=<序号> 查询串，先去掉查询部分再取毫秒数
+            time.sleep(int(urlsplit(self.path).path.rsplit("/", 1)[-1]) / 1000)
+            body = b"ok"
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: object) -> None:
+            return
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), DelayHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+
+    targets = [
+        MonitorTarget(url=f"{base}/delay/{random.randint(50, 800)}?t={i}", timeout=2.0)
+        for i in range(target_count)
+    ]
+    scheduler = AsyncCheckScheduler(config)
+    await scheduler.start()
+    try:
+        start = time.perf_counter()
+        results = await scheduler.run_cycle(targets)
+        elapsed = time.perf_counter() - start
+    finally:
+        await scheduler.close()
+        server.shutdown()
+
+    serial_total = sum(r.response_time for r in results)
+    print(f"并发检查 {len(results)} 个目标: 本轮耗时 {elapsed:.2f}s，各检查耗时之和 {serial_total:.2f}s")
+    counts = Counter(r.status for r in results)
+    print(f"  健康 {counts[MonitorStatus.HEALTHY]}，变慢 {counts[MonitorStatus.DEGRADED]}，"
+          f"错误 {counts[MonitorStatus.ERROR] + counts[MonitorStatus.UNHEALTHY]}")
+    # 本地目标都应成功响应（慢于阈值算 DEGRADED 仍是成功）；否则上面的耗时数字没有意义
+    succeeded = counts[MonitorStatus.HEALTHY] + counts[MonitorStatus.DEGRADED]
+    assert len(results) == target_count and succeeded == target_count, (
+        f"expected {target_count} successful checks, got {dict(counts)}"
+    )
+
+
 # =============================================================================
 # 模拟监控目标
 # =============================================================================
@@ -749,8 +1716,14 @@ def main() -> None:
             if result.screenshot_path and result.status == MonitorStatus.HEALTHY:
                 monitor.save_baseline(result.url, Path(result.screenshot_path))
 
+        # 时序指标库：几十天历史的分位数 / 错误率 / SLO 查询
+        print("\n[时序指标库]")
+        print("-"*60)
+        demo_metrics_store(config.metrics_dir / "demo")
+
     except KeyboardInterrupt:
         print("\n监控被用户中断")
+        return
     except Exception as exc:
         print(f"\n发生错误: {exc}")
         import traceback
@@ -758,6 +1731,13 @@ def main() -> None:
     finally:
         monitor.close()
 
+    # 并发调度器：一轮检查的耗时约等于最慢的几个检查
+    # 必须在 monitor.close() 之后运行：sync_playwright 存活期间线程里已有事件循环，
+    # asyncio.run() 会直接报错；这里也不再吞异常，调度器出错就让它暴露出来
+    print("\n[并发调度器]")
+    print("-"*60)
+    asyncio.run(demo_parallel_scheduler(config))
+
 
 if __name__ == "__main__":
     main()